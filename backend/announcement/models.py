@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -20,3 +21,60 @@ class Announcement(models.Model):
 
     def __str__(self):
         return f"{self.title} ({self.announcement_date if self.announcement_date else 'No date'})"
+
+    @property
+    def cohort_keys(self):
+        return [cohort.key for cohort in self.cohorts.all()]
+
+    @classmethod
+    def visible_to(cls, user, cohort_keys):
+        """
+        Announcements addressed to `user`, either directly through `targets` or
+        through one of their cohorts.
+        """
+        return cls.objects.filter(
+            Q(targets=user) | Q(cohorts__key__in=cohort_keys)
+        ).distinct()
+
+
+class AnnouncementCohort(models.Model):
+    """
+    A cohort (see realtime.cohorts) an announcement is addressed to. Cohort
+    members are resolved when they read, so an announcement to a whole grade
+    costs one row here instead of one target and notification per student.
+    """
+
+    announcement = models.ForeignKey(
+        Announcement, on_delete=models.CASCADE, related_name="cohorts"
+    )
+    key = models.CharField(max_length=50)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["announcement", "key"], name="unique_announcement_cohort"
+            )
+        ]
+        indexes = [models.Index(fields=["key", "announcement"])]
+
+    def __str__(self):
+        return f"{self.announcement_id} -> {self.key}"
+
+
+class AnnouncementRead(models.Model):
+    """Set of (announcement, user) pairs that have been read."""
+
+    announcement = models.ForeignKey(
+        Announcement, on_delete=models.CASCADE, related_name="reads"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="announcement_reads"
+    )
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "announcement"], name="unique_announcement_read"
+            )
+        ]
@@ -1,11 +1,18 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Announcement
+from .models import Announcement, AnnouncementCohort
+from realtime.cohorts import parse_cohort
 from users.serializers import UserInverseSerializer
 
 
 class AnnouncementSerializer(serializers.ModelSerializer):
     created_by = UserInverseSerializer(read_only=True)
     users = UserInverseSerializer(many=True, read_only=True, source="targets")
+    cohorts = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        source="cohort_keys",
+        required=False,
+    )
 
     class Meta:
         model = Announcement
@@ -15,6 +22,7 @@ class AnnouncementSerializer(serializers.ModelSerializer):
             "announcement_date",
             "targets",
             "users",
+            "cohorts",
             "created_by",
             "content",
             "created_at",
@@ -22,9 +30,42 @@ class AnnouncementSerializer(serializers.ModelSerializer):
             "is_important",
         ]
 
+    def validate_cohorts(self, value):
+        try:
+            return sorted({parse_cohort(key) for key in value})
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+    def create(self, validated_data):
+        cohort_keys = validated_data.pop("cohort_keys", [])
+        with transaction.atomic():
+            announcement = super().create(validated_data)
+            self._set_cohorts(announcement, cohort_keys)
+        return announcement
+
+    def update(self, instance, validated_data):
+        cohort_keys = validated_data.pop("cohort_keys", None)
+        with transaction.atomic():
+            announcement = super().update(instance, validated_data)
+            if cohort_keys is not None:
+                announcement.cohorts.all().delete()
+                self._set_cohorts(announcement, cohort_keys)
+        return announcement
+
+    @staticmethod
+    def _set_cohorts(announcement, cohort_keys):
+        AnnouncementCohort.objects.bulk_create(
+            [
+                AnnouncementCohort(announcement=announcement, key=key)
+                for key in cohort_keys
+            ]
+        )
+
 
 class AnnouncementMinimalSerializer(serializers.ModelSerializer):
     created_by = UserInverseSerializer(read_only=True)
+    # Annotated by UserAnnouncementView
+    is_read = serializers.BooleanField(read_only=True, default=False)
 
     class Meta:
         model = Announcement
@@ -37,4 +78,5 @@ class AnnouncementMinimalSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
             "is_important",
+            "is_read",
         ]
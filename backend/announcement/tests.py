@@ -1,3 +1,88 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from realtime.models import Notification
+from realtime.testing import RecordingChannelLayer
+from users.models import Profile
+from .models import Announcement, AnnouncementCohort
+
+User = get_user_model()
+
+
+class CohortAnnouncementTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "admin@example.com", "Admin", "pw", role="admin", is_staff=True
+        )
+        cls.students = {}
+        for grade, section in [(11, "A"), (11, "B"), (12, "A")]:
+            student = User.objects.create_user(
+                f"s{grade}{section}@example.com", f"Student {grade}{section}", "pw"
+            )
+            Profile.objects.create(
+                user=student,
+                grade=grade,
+                section=section,
+                field="backend",
+                phone_number="0900000000",
+            )
+            cls.students[f"{grade}{section}"] = student
+
+    def login(self, user):
+        self.client.cookies["access"] = str(AccessToken.for_user(user))
+
+    def post_announcement(self, **data):
+        self.login(self.admin)
+        layer = RecordingChannelLayer()
+        with mock.patch("utils.notif.CHANNEL_LAYER", layer):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    "/api/announcement/",
+                    {"title": "Trip", "content": "Friday", **data},
+                    content_type="application/json",
+                    secure=True,
+                )
+        return response, layer
+
+    def test_cohort_announcement_publishes_once_per_cohort(self):
+        outsider = self.students["12A"]
+        response, layer = self.post_announcement(
+            cohorts=["grade:11", "class:12a"], targets=[outsider.id]
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["cohorts"], ["class:12A", "grade:11"])
+        self.assertCountEqual(layer.groups, ["cohort.grade.11", "cohort.class.12A"])
+        # The target is already covered by class:12A
+        self.assertFalse(Notification.objects.exists())
+
+    def test_rejects_unknown_cohorts(self):
+        response, _ = self.post_announcement(cohorts=["grade:eleven"])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Announcement.objects.exists())
+
+    def test_members_see_and_read_cohort_announcements(self):
+        announcement = Announcement.objects.create(
+            title="Trip", content="Friday", created_by=self.admin
+        )
+        AnnouncementCohort.objects.create(announcement=announcement, key="grade:11")
+
+        self.login(self.students["12A"])
+        response = self.client.get("/api/announcement/user/", secure=True)
+        self.assertEqual(response.status_code, 404)
+
+        self.login(self.students["11B"])
+        response = self.client.get("/api/announcement/user/", secure=True)
+        self.assertEqual(response.data["unread_count"], 1)
+
+        detail = f"/api/announcement/user/{announcement.id}/"
+        self.assertEqual(self.client.get(detail, secure=True).status_code, 200)
+        self.assertEqual(self.client.get(detail, secure=True).status_code, 200)
 
-# Create your tests here.
+        response = self.client.get("/api/announcement/user/", secure=True)
+        self.assertEqual(response.data["unread_count"], 0)
+        self.assertTrue(response.data["announcements"][0]["is_read"])
@@ -5,11 +5,14 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.db import transaction
-from .models import Announcement
+from django.db.models import Exists, OuterRef
+from .models import Announcement, AnnouncementRead
 from .serializers import AnnouncementSerializer, AnnouncementMinimalSerializer
 from utils.auth import JWTCookieAuthentication
+from utils.pagination import KeysetPaginator, InvalidCursor
 from asgiref.sync import async_to_sync
-from utils.notif import notify_users_bulk
+from utils.notif import broadcast_to_cohorts, notify_users_bulk
+from realtime.cohorts import cohorts_of, members_filter
 
 
 @method_decorator(csrf_protect, name="dispatch")
@@ -31,9 +34,28 @@ class AnnouncementView(APIView):
             return Response(serializer.data)
 
         # list all announcements
-        announcements = Announcement.objects.all().order_by(
-            "-announcement_date", "-created_at"
-        )
+        announcements = Announcement.objects.select_related(
+            "created_by__profile"
+        ).prefetch_related("targets__profile", "cohorts")
+
+        if KeysetPaginator.requested(request):
+            # announcement_date is nullable, so cursor pages follow creation order
+            paginator = KeysetPaginator.from_request(
+                request, announcements, sort_field="created_at", descending=True
+            )
+            try:
+                page = paginator.paginate()
+            except InvalidCursor as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            serializer = AnnouncementSerializer(page, many=True)
+            return Response(
+                {
+                    "announcements": serializer.data,
+                    "pagination": paginator.pagination_data(),
+                }
+            )
+
+        announcements = announcements.order_by("-announcement_date", "-created_at")
         serializer = AnnouncementSerializer(announcements, many=True)
         return Response(serializer.data)
 
@@ -43,16 +65,11 @@ class AnnouncementView(APIView):
         if serializer.is_valid():
             with transaction.atomic():
                 announcement = serializer.save(created_by=request.user)
-                users = list(announcement.targets.all())
-
-                async_to_sync(notify_users_bulk)(
-                    recipients=users,
-                    actor=request.user,
+                self.notify(
+                    announcement,
+                    request.user,
                     title="Annoucement",
                     description="You have a new annoucement.",
-                    code="info",
-                    url=f"/user/announcement/{announcement.id}",
-                    is_push_notif=True,
                 )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -84,6 +101,7 @@ class AnnouncementView(APIView):
                     "announcement_date": announcement.announcement_date,
                     "is_important": announcement.is_important,
                     "targets": list(announcement.targets.values_list("id", flat=True)),
+                    "cohorts": announcement.cohort_keys,
                 }
 
                 # Save updated instance
@@ -96,6 +114,7 @@ class AnnouncementView(APIView):
                     "announcement_date": announcement.announcement_date,
                     "is_important": announcement.is_important,
                     "targets": list(announcement.targets.values_list("id", flat=True)),
+                    "cohorts": announcement.cohort_keys,
                 }
 
                 # Check if anything changed
@@ -106,15 +125,13 @@ class AnnouncementView(APIView):
                     )
 
                 # Notify users because something changed
-                users = list(announcement.targets.all())
-                async_to_sync(notify_users_bulk)(
-                    recipients=users,
-                    actor=request.user,
+                self.notify(
+                    announcement,
+                    request.user,
                     title="Announcement updated",
-                    description=f"The announcement '{announcement.title}' has been updated.",
-                    code="info",
-                    url=f"/user/announcement/{announcement.id}",
-                    is_push_notif=True,
+                    description=(
+                        f"The announcement '{announcement.title}' has been updated."
+                    ),
                 )
 
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -142,6 +159,39 @@ class AnnouncementView(APIView):
         )
 
 
+    @staticmethod
+    def notify(announcement, actor, title, description):
+        """
+        One broadcast per cohort, plus a notification for each hand-picked
+        target who isn't already in one of those cohorts.
+        """
+        cohort_keys = announcement.cohort_keys
+        url = f"/user/announcement/{announcement.id}"
+
+        recipients = announcement.targets.all()
+        if cohort_keys:
+            recipients = recipients.exclude(members_filter(cohort_keys))
+        async_to_sync(notify_users_bulk)(
+            recipients=list(recipients),
+            actor=actor,
+            title=title,
+            description=description,
+            code="info",
+            url=url,
+            is_push_notif=True,
+        )
+        broadcast_to_cohorts(
+            cohort_keys,
+            announcement_id=announcement.id,
+            actor=actor,
+            title=title,
+            description=description,
+            code="info",
+            url=url,
+            is_push_notif=True,
+        )
+
+
 class UserAnnouncementView(APIView):
     authentication_classes = [JWTCookieAuthentication]
     permission_classes = [IsAuthenticated]
@@ -149,21 +199,38 @@ class UserAnnouncementView(APIView):
     def get(self, request, pk=None):
 
         user = request.user
+        announcements = Announcement.visible_to(user, cohorts_of(user))
         if pk:
             try:
-                announcement = Announcement.objects.get(pk=pk, targets=user)
+                announcement = announcements.get(pk=pk)
             except Announcement.DoesNotExist:
                 return Response(
                     {"error": f"Announcement with id {pk} not found."},
                     status=status.HTTP_404_NOT_FOUND,
                 )
+            AnnouncementRead.objects.bulk_create(
+                [AnnouncementRead(announcement=announcement, user=user)],
+                ignore_conflicts=True,
+            )
             serializer = AnnouncementSerializer(announcement)
             return Response(serializer.data)
 
-        announcements = user.announcements.all()
+        announcements = announcements.annotate(
+            is_read=Exists(
+                AnnouncementRead.objects.filter(announcement=OuterRef("pk"), user=user)
+            )
+        ).order_by("-created_at")
         serializer = AnnouncementMinimalSerializer(announcements, many=True)
-        if not announcements.exists():
+        if not serializer.data:
             return Response(
                 {"error": "No announcements yet"}, status=status.HTTP_404_NOT_FOUND
             )
-        return Response({"announcements": serializer.data}, status=status.HTTP_200_OK)
+        return Response(
+            {
+                "announcements": serializer.data,
+                "unread_count": sum(
+                    not announcement["is_read"] for announcement in serializer.data
+                ),
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -0,0 +1,323 @@
+import random
+import time
+import tracemalloc
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from rest_framework_simplejwt.tokens import AccessToken
+
+from attendance.models import Attendance, AttendanceSession, AttendanceSummary
+from learning_task import search
+from learning_task.models import (
+    LearningTask,
+    LearningTaskLimit,
+    StudentScore,
+    TaskBonus,
+    TaskReview,
+)
+from management.models import Framework, Language
+from realtime.models import Notification
+from users.models import Profile
+
+User = get_user_model()
+
+# Timings this close to the baseline are noise whatever the tolerance
+TIME_SLACK_MS = 20
+
+TASKS_PER_STUDENT = 3
+NOTIFICATIONS_PER_STUDENT = 5
+STUDENTS_PER_SESSION = 40
+SESSIONS = 10
+
+# name -> (who calls it, path). Every scenario runs against a cold cache so
+# the numbers cover the full cost of building the response.
+SCENARIOS = {
+    "students": ("admin", "/api/management/students/?page=1&page_size=20"),
+    "admin_dashboard": ("admin", "/api/management/dashboard/"),
+    "tasks_all": ("student", "/api/learning-task/all/"),
+    "tasks_feed": ("student", "/api/learning-task/feed/"),
+    "notifications": ("student", "/api/realtime/notif/"),
+    "user_dashboard": ("student", "/api/users/data/"),
+    "students_export_xlsx": (
+        "admin",
+        "/api/management/students/export/?file_format=xlsx",
+    ),
+    "students_export_csv": (
+        "admin",
+        "/api/management/students/export/?file_format=csv",
+    ),
+    "grades_pdf": ("admin", "/api/management/students/grade/export/"),
+}
+
+
+def seed_dataset(students, seed=0):
+    """
+    Fills the (empty) database with `students` students and the tasks,
+    reviews, bonuses, attendance and notifications that hang off them.
+    Returns (admin, student) users to run the scenarios as.
+    """
+    rng = random.Random(seed)
+    password = make_password(None)
+
+    admins = User.objects.bulk_create(
+        [
+            User(
+                email=f"bench-admin{i}@example.com",
+                full_name=f"Bench Admin {i}",
+                role="admin",
+                is_staff=True,
+                password=password,
+            )
+            for i in range(3)
+        ]
+    )
+    users = User.objects.bulk_create(
+        [
+            User(
+                email=f"bench{i}@example.com",
+                full_name=f"Bench Student {i}",
+                gender=rng.choice(["male", "female"]),
+                password=password,
+            )
+            for i in range(students)
+        ],
+        batch_size=1000,
+    )
+    Profile.objects.bulk_create(
+        [
+            Profile(
+                user=user,
+                grade=rng.randint(9, 12),
+                section=rng.choice("ABCD"),
+                field=rng.choice(["frontend", "backend", "ai"]),
+                phone_number="0900000000",
+            )
+            for user in users
+        ],
+        batch_size=1000,
+    )
+    LearningTaskLimit.objects.bulk_create(
+        [LearningTaskLimit(user=user, limit=5) for user in users], batch_size=1000
+    )
+
+    languages = [
+        Language.objects.create(name=name, code=name[:2].lower(), color="#4f46e5")
+        for name in ["Python", "JavaScript", "Go"]
+    ]
+    frameworks = [
+        Framework.objects.create(language=language, name=f"{language.name} Kit")
+        for language in languages
+    ]
+
+    tasks = LearningTask.objects.bulk_create(
+        [
+            LearningTask(
+                user=user,
+                title=f"Task {n} of {user.full_name}",
+                description="Synthetic benchmark task " * 5,
+                status=rng.choice(["draft", "under_review", "rated", "rated"]),
+            )
+            for user in users
+            for n in range(TASKS_PER_STUDENT)
+        ],
+        batch_size=1000,
+    )
+    LearningTask.languages.through.objects.bulk_create(
+        [
+            LearningTask.languages.through(
+                learningtask_id=task.id, language_id=rng.choice(languages).id
+            )
+            for task in tasks
+        ],
+        batch_size=1000,
+    )
+    LearningTask.frameworks.through.objects.bulk_create(
+        [
+            LearningTask.frameworks.through(
+                learningtask_id=task.id, framework_id=rng.choice(frameworks).id
+            )
+            for task in tasks
+        ],
+        batch_size=1000,
+    )
+
+    rated = [task for task in tasks if task.status == "rated"]
+    TaskReview.objects.bulk_create(
+        [
+            TaskReview(
+                task=task,
+                user=admin,
+                rating=rng.randint(1, 5),
+                feedback="Looks good",
+                is_admin=True,
+            )
+            for task in rated
+            for admin in rng.sample(admins, 2)
+        ],
+        batch_size=1000,
+    )
+    TaskBonus.objects.bulk_create(
+        [
+            TaskBonus(task=task, admin=admins[0], score=rng.randint(0, 20))
+            for task in rated[::3]
+        ],
+        batch_size=1000,
+    )
+
+    for n in range(SESSIONS):
+        session = AttendanceSession.objects.create(title=f"Session {n}", is_ended=True)
+        attendees = rng.sample(users, min(STUDENTS_PER_SESSION, len(users)))
+        session.targets.set(attendees)
+        Attendance.objects.bulk_create(
+            [
+                Attendance(
+                    session=session,
+                    user=user,
+                    status=rng.choice(["present", "late", "absent", "special_case"]),
+                )
+                for user in attendees
+            ]
+        )
+
+    Notification.objects.bulk_create(
+        [
+            Notification(
+                recipient=user,
+                actor=admins[0],
+                title=f"Notice {n}",
+                description="Synthetic benchmark notification",
+                is_read=rng.random() < 0.5,
+            )
+            for user in users
+            for n in range(NOTIFICATIONS_PER_STUDENT)
+        ],
+        batch_size=1000,
+    )
+
+    # bulk_create skips the signals that keep the materialised data current
+    StudentScore.rebuild()
+    AttendanceSummary.refresh_for_users([user.id for user in users])
+    LearningTask.refresh_admin_ratings()
+    search.rebuild()
+
+    return admins[0], users[0]
+
+
+async def _drain(streaming_content):
+    async for _ in streaming_content:
+        pass
+
+
+def _consume(response):
+    if getattr(response, "is_async", False):
+        async_to_sync(_drain)(response.streaming_content)
+    elif getattr(response, "streaming", False):
+        for _ in response.streaming_content:
+            pass
+    elif hasattr(response, "close"):
+        response.content
+    response.close()
+
+
+class QueryCounter:
+    # Counted through an execute wrapper rather than CaptureQueriesContext:
+    # the request_started signal empties connection.queries_log mid-capture.
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _get(client, path):
+    cache.clear()
+    response = client.get(path, secure=True)
+    _consume(response)
+    return response
+
+
+def measure(client, path, repeat):
+    """
+    Runs one GET `repeat` times and returns the status code, query count,
+    best wall time (ms) and peak traced memory (KiB). Memory is traced on a
+    separate run, since tracing slows the request down several times over.
+    An untraced request goes first, so that one-off costs (lazy imports,
+    the first connection, template compilation) are not charged to
+    whichever scenario happens to run first.
+    """
+    _get(client, path)
+
+    tracemalloc.start()
+    try:
+        _get(client, path)
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = _get(client, path)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "status": response.status_code,
+        "queries": counter.count,
+        "time_ms": round(min(timings), 1),
+        "peak_kib": round(peak),
+    }
+
+
+def run_scenarios(admin, student, names, repeat):
+    clients = {}
+    for role, user in (("admin", admin), ("student", student)):
+        client = Client()
+        client.cookies["access"] = str(AccessToken.for_user(user))
+        clients[role] = client
+
+    results = {}
+    for name in names:
+        role, path = SCENARIOS[name]
+        results[name] = measure(clients[role], path, repeat)
+    return results
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """
+    Regressions of `results` against `baseline`, as readable strings. The
+    query count must match exactly, so a drop fails too until the baseline
+    is updated; time and memory get a relative tolerance (plus TIME_SLACK_MS
+    for time).
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result["status"] != expected["status"]:
+            regressions.append(
+                f"{name}: status {result['status']} (baseline {expected['status']})"
+            )
+        if result["queries"] != expected["queries"]:
+            regressions.append(
+                f"{name}: {result['queries']} queries "
+                f"(baseline {expected['queries']})"
+            )
+        allowed_ms = expected["time_ms"] * (1 + time_tolerance) + TIME_SLACK_MS
+        if result["time_ms"] > allowed_ms:
+            regressions.append(
+                f"{name}: {result['time_ms']} ms (baseline {expected['time_ms']} ms)"
+            )
+        if result["peak_kib"] > expected["peak_kib"] * (1 + memory_tolerance):
+            regressions.append(
+                f"{name}: {result['peak_kib']} KiB peak "
+                f"(baseline {expected['peak_kib']} KiB)"
+            )
+    return regressions
@@ -0,0 +1,93 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.bench import SCENARIOS, compare, run_scenarios, seed_dataset
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / "bench_baseline.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database with a synthetic club and measure the "
+        "query count, wall time and peak memory of the hot API endpoints "
+        "against a stored baseline. Fails when any of them regresses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=300)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=sorted(SCENARIOS),
+            help="Only run this scenario (may be repeated).",
+        )
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+        parser.add_argument(
+            "--update-baseline",
+            action="store_true",
+            help="Write the measured numbers as the new baseline.",
+        )
+        parser.add_argument(
+            "--time-tolerance",
+            type=float,
+            default=0.5,
+            help="Allowed relative slowdown before a scenario counts as regressed.",
+        )
+        parser.add_argument("--memory-tolerance", type=float, default=0.25)
+
+    def handle(self, *args, **options):
+        names = options["scenario"] or list(SCENARIOS)
+        baseline_path = Path(options["baseline"])
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            admin, student = seed_dataset(options["students"])
+            results = run_scenarios(admin, student, names, options["repeat"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self._report(results)
+
+        if options["update_baseline"]:
+            baseline = {"students": options["students"], "scenarios": results}
+            baseline_path.write_text(json.dumps(baseline, indent=2) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}"))
+            return
+
+        if not baseline_path.exists():
+            raise CommandError(
+                f"No baseline at {baseline_path}; run with --update-baseline first."
+            )
+        baseline = json.loads(baseline_path.read_text())
+        if baseline["students"] != options["students"]:
+            raise CommandError(
+                f"The baseline was recorded with {baseline['students']} students; "
+                f"rerun with --students {baseline['students']}."
+            )
+
+        regressions = compare(
+            results,
+            baseline["scenarios"],
+            options["time_tolerance"],
+            options["memory_tolerance"],
+        )
+        if regressions:
+            raise CommandError("Regressions:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def _report(self, results):
+        self.stdout.write(
+            f"{'scenario':<24}{'status':>8}{'queries':>10}{'ms':>10}{'peak KiB':>10}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<24}{result['status']:>8}{result['queries']:>10}"
+                f"{result['time_ms']:>10}{result['peak_kib']:>10}"
+            )
@@ -9,4 +9,5 @@ urlpatterns = [
     path("learning-task/", include("learning_task.urls")),
     path("attendance/", include("attendance.urls")),
     path("announcement/", include("announcement.urls")),
+    path("jobs/", include("jobs.urls")),
 ]
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from attendance.models import Attendance, AttendanceSummary
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute attendance summaries for every user with attendance records, "
+        "e.g. after rows were changed behind the ORM's back."
+    )
+
+    def handle(self, *args, **options):
+        user_ids = (
+            Attendance.objects.order_by()
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+        user_ids = list(user_ids)
+        AttendanceSummary.refresh_for_users(user_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed {len(user_ids)} attendance summaries.")
+        )
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:08
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.utils import timezone
+
+
+def backfill_summaries(apps, schema_editor):
+    Attendance = apps.get_model("attendance", "Attendance")
+    AttendanceSummary = apps.get_model("attendance", "AttendanceSummary")
+
+    since = timezone.now() - timedelta(days=30)
+    last_status = (
+        Attendance.objects.filter(user_id=OuterRef("user_id"))
+        .order_by("-attended_at", "-id")
+        .values("status")[:1]
+    )
+    rows = (
+        Attendance.objects.values("user_id")
+        .annotate(
+            total_count=Count("id"),
+            present_count=Count("id", filter=Q(status="present")),
+            late_count=Count("id", filter=Q(status="late")),
+            absent_count=Count("id", filter=Q(status="absent")),
+            special_case_count=Count("id", filter=Q(status="special_case")),
+            recent_total=Count("id", filter=Q(attended_at__gte=since)),
+            recent_present_late=Count(
+                "id", filter=Q(attended_at__gte=since, status__in=["present", "late"])
+            ),
+            last_attended_at=Max("attended_at"),
+            last_status=Subquery(last_status),
+        )
+        .order_by()
+    )
+    AttendanceSummary.objects.bulk_create(
+        (AttendanceSummary(**row) for row in rows), batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_attendance_note_alter_attendance_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('special_case_count', models.PositiveIntegerField(default=0)),
+                ('last_attended_at', models.DateTimeField(blank=True, null=True)),
+                ('last_status', models.CharField(blank=True, choices=[('present', 'Present'), ('late', 'Late'), ('absent', 'Absent'), ('special_case', 'Speical Case')], max_length=20, null=True)),
+                ('recent_total', models.PositiveIntegerField(default=0)),
+                ('recent_present_late', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-17 13:27
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_attendancesummary'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='attendancesummary',
+            name='recent_present_late',
+        ),
+        migrations.RemoveField(
+            model_name='attendancesummary',
+            name='recent_total',
+        ),
+    ]
@@ -1,5 +1,10 @@
+from datetime import timedelta
 from django.db import models
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from .signals import attendance_changed
 
 User = get_user_model()
 
@@ -40,3 +45,107 @@ class Attendance(models.Model):
 
     def __str__(self):
         return f"{self.user} — {self.session}"
+
+
+class AttendanceSummary(models.Model):
+    RECENT_WINDOW_DAYS = 30
+    REFRESH_BATCH_SIZE = 500
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="attendance_summary"
+    )
+    total_count = models.PositiveIntegerField(default=0)
+    present_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    special_case_count = models.PositiveIntegerField(default=0)
+    last_attended_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(
+        max_length=20, choices=Attendance.STATUS_CHOICES, null=True, blank=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} — {self.total_count} records"
+
+    @classmethod
+    def refresh_for_users(cls, user_ids):
+        """
+        Recompute the summaries of the given users from their attendance rows
+        and upsert them. Only the touched users are aggregated, so the cost
+        follows the size of the write, not the size of the attendance table.
+        """
+        user_ids = list(set(user_ids))
+        for start in range(0, len(user_ids), cls.REFRESH_BATCH_SIZE):
+            cls._refresh_batch(user_ids[start : start + cls.REFRESH_BATCH_SIZE])
+
+        if user_ids:
+            attendance_changed.send(sender=cls, user_ids=user_ids)
+
+    @classmethod
+    def annotate_recent(cls, queryset, user_field="user_id"):
+        """
+        Annotates `recent_total` and `recent_present_late`: the attendance of
+        the row's user over the last RECENT_WINDOW_DAYS. They are counted when
+        the query runs, so the window never lags behind the calendar.
+        """
+        since = timezone.now() - timedelta(days=cls.RECENT_WINDOW_DAYS)
+        recent = (
+            Attendance.objects.filter(
+                user_id=OuterRef(user_field), attended_at__gte=since
+            )
+            .order_by()
+            .values("user_id")
+        )
+
+        def count(rows):
+            return Coalesce(Subquery(rows.annotate(n=Count("id")).values("n")), 0)
+
+        return queryset.annotate(
+            recent_total=count(recent),
+            recent_present_late=count(recent.filter(status__in=["present", "late"])),
+        )
+
+    @classmethod
+    def _refresh_batch(cls, user_ids):
+        last_status = (
+            Attendance.objects.filter(user_id=OuterRef("user_id"))
+            .order_by("-attended_at", "-id")
+            .values("status")[:1]
+        )
+        rows = (
+            Attendance.objects.filter(user_id__in=user_ids)
+            .values("user_id")
+            .annotate(
+                total_count=Count("id"),
+                present_count=Count("id", filter=Q(status="present")),
+                late_count=Count("id", filter=Q(status="late")),
+                absent_count=Count("id", filter=Q(status="absent")),
+                special_case_count=Count("id", filter=Q(status="special_case")),
+                last_attended_at=Max("attended_at"),
+                last_status=Subquery(last_status),
+            )
+        )
+        rows_by_user = {row.pop("user_id"): row for row in rows}
+
+        # Users without any attendance left (e.g. their session was deleted)
+        # are reset to an empty summary instead of keeping stale counts.
+        summaries = [
+            cls(user_id=user_id, **rows_by_user.get(user_id, {}))
+            for user_id in user_ids
+        ]
+        cls.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=[
+                "total_count",
+                "present_count",
+                "late_count",
+                "absent_count",
+                "special_case_count",
+                "last_attended_at",
+                "last_status",
+                "updated_at",
+            ],
+        )
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with `user_ids` whenever attendance rows are written in bulk, where the
+# model save/delete signals are not fired (bulk_create, cascades on sessions).
+attendance_changed = Signal()
@@ -1,3 +1,214 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import Profile
+from utils.reports import ROWS_PER_TABLE, _cell, render_table_report
+from .models import Attendance, AttendanceSession, AttendanceSummary
+from .signals import attendance_changed
+from .views import SessionExportPdfView
+
+User = get_user_model()
+
+
+class AttendanceSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "admin@example.com", "Admin", "pw", role="admin", is_staff=True
+        )
+        cls.student = User.objects.create_user("s@example.com", "Student", "pw")
+        Profile.objects.create(
+            user=cls.student,
+            grade=11,
+            section="A",
+            field="backend",
+            phone_number="0900000000",
+        )
+
+    def attend(self, status, days_ago=0):
+        session = AttendanceSession.objects.create(title=f"Session {status}")
+        attendance = Attendance.objects.create(
+            session=session, user=self.student, status=status
+        )
+        # attended_at is auto_now_add; backdate it behind the ORM's back
+        Attendance.objects.filter(id=attendance.id).update(
+            attended_at=timezone.now() - timedelta(days=days_ago)
+        )
+        return attendance
+
+    def summary(self):
+        return AttendanceSummary.objects.get(user=self.student)
+
+    def test_refresh_counts_each_status(self):
+        for status in ["present", "present", "late", "absent", "special_case"]:
+            self.attend(status, days_ago=2)
+        latest = self.attend("late")
+
+        AttendanceSummary.refresh_for_users([self.student.id])
+
+        summary = self.summary()
+        self.assertEqual(
+            (
+                summary.total_count,
+                summary.present_count,
+                summary.late_count,
+                summary.absent_count,
+                summary.special_case_count,
+            ),
+            (6, 2, 2, 1, 1),
+        )
+        latest.refresh_from_db()
+        self.assertEqual(summary.last_attended_at, latest.attended_at)
+        self.assertEqual(summary.last_status, "late")
+
+    def test_refresh_resets_users_without_attendance(self):
+        self.attend("present")
+        AttendanceSummary.refresh_for_users([self.student.id])
+        Attendance.objects.all().delete()
+
+        AttendanceSummary.refresh_for_users([self.student.id])
+
+        summary = self.summary()
+        self.assertEqual((summary.total_count, summary.last_status), (0, None))
+
+    def test_refresh_announces_the_changed_users(self):
+        receiver = mock.Mock()
+        attendance_changed.connect(receiver)
+        self.addCleanup(attendance_changed.disconnect, receiver)
+
+        AttendanceSummary.refresh_for_users([self.student.id, self.student.id])
+
+        receiver.assert_called_once()
+        self.assertEqual(receiver.call_args.kwargs["user_ids"], [self.student.id])
+
+    def test_recent_window_is_counted_at_read_time(self):
+        self.attend("present", days_ago=1)
+        self.attend("absent", days_ago=2)
+        self.attend("present", days_ago=AttendanceSummary.RECENT_WINDOW_DAYS + 5)
+        AttendanceSummary.refresh_for_users([self.student.id])
+
+        profile = AttendanceSummary.annotate_recent(Profile.objects.all()).get()
+        self.assertEqual((profile.recent_total, profile.recent_present_late), (2, 1))
+
+        self.client.cookies["access"] = str(AccessToken.for_user(self.admin))
+        response = self.client.get("/api/management/students/", secure=True)
+        self.assertEqual(response.status_code, 200)
+        attendance = response.json()["students"][0]["attendance"]
+        self.assertEqual(attendance["recent_percentage"], 50)
+        self.assertEqual(attendance["total_sessions"], 3)
+
+
+class SessionPdfExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "admin@example.com", "Admin", "pw", role="admin", is_staff=True
+        )
+        cls.student = User.objects.create_user("s@example.com", "Student", "pw")
+        cls.profile = Profile.objects.create(
+            user=cls.student,
+            grade=11,
+            section="A",
+            field="backend",
+            phone_number="0900000000",
+        )
+        cls.session = AttendanceSession.objects.create(title="Club", is_ended=True)
+        cls.session.targets.add(cls.student)
+        cls.attendance = Attendance.objects.create(
+            session=cls.session, user=cls.student, status="present"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.cookies["access"] = str(AccessToken.for_user(self.admin))
+
+    def export(self):
+        response = self.client.get(
+            f"/api/attendance/session/export/{self.session.id}/", secure=True
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def renders_after(self, change):
+        with mock.patch.object(
+            SessionExportPdfView,
+            "render_pdf",
+            autospec=True,
+            side_effect=SessionExportPdfView.render_pdf,
+        ) as render_pdf:
+            self.export()
+            change()
+            self.export()
+        return render_pdf.call_count
+
+    def test_unchanged_report_is_served_from_the_cache(self):
+        self.assertEqual(self.renders_after(lambda: None), 1)
+
+    def test_renamed_students_get_a_new_report(self):
+        def rename():
+            self.student.full_name = "Renamed Student"
+            self.student.save()
+
+        self.assertEqual(self.renders_after(rename), 2)
+
+    def test_profile_edits_get_a_new_report(self):
+        def move_section():
+            self.profile.section = "B"
+            self.profile.save()
+
+        self.assertEqual(self.renders_after(move_section), 2)
+
+    def test_target_changes_get_a_new_report(self):
+        other = User.objects.create_user("o@example.com", "Other", "pw")
+
+        self.assertEqual(
+            self.renders_after(lambda: self.session.targets.add(other)), 2
+        )
+
+    def test_attendance_corrections_get_a_new_report(self):
+        def correct_attendance():
+            self.attendance.status = "late"
+            self.attendance.save()
+
+        self.assertEqual(self.renders_after(correct_attendance), 2)
+
+
+class TableReportTests(TestCase):
+    def render(self, rows, **kwargs):
+        return render_table_report(
+            "Report <1>",
+            ["Generated today"],
+            ["#", "Name"],
+            rows,
+            [0.2, 0.8],
+            **kwargs,
+        )
+
+    def test_renders_a_pdf(self):
+        pdf = self.render([[1, "Abebe"], [2, None]])
+
+        self.assertTrue(pdf.startswith(b"%PDF"))
+
+    def test_empty_reports_still_have_a_header_table(self):
+        self.assertTrue(self.render([]).startswith(b"%PDF"))
+
+    def test_long_reports_span_several_pages(self):
+        short = self.render([[i, "Name"] for i in range(ROWS_PER_TABLE // 2)])
+        long = self.render([[i, "Name"] for i in range(ROWS_PER_TABLE * 3)])
+
+        self.assertEqual(short.count(b"/Type /Page\n"), 1)
+        self.assertGreater(long.count(b"/Type /Page\n"), 2)
+
+    def test_overflowing_cells_are_wrapped(self):
+        self.assertEqual(_cell("Short", 200), "Short")
+        self.assertEqual(_cell(None, 200), "")
 
-# Create your tests here.
+        wrapped = _cell("word " * 40, 100)
+        self.assertGreater(len(wrapped.splitlines()), 1)
+        self.assertEqual(wrapped.split(), ["word"] * 40)
@@ -1,9 +1,13 @@
+import hashlib
+import json
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAdminUser
 from utils.auth import JWTCookieAuthentication
-from .models import Attendance, AttendanceSession
+from utils.pagination import KeysetPaginator, InvalidCursor
+from .models import Attendance, AttendanceSession, AttendanceSummary
 from django.contrib.auth import get_user_model
 from .serializers import (
     AttendanceSessionSerializer,
@@ -11,21 +15,9 @@ from .serializers import (
     AttendanceSerializer,
 )
 from django.db import transaction
-import io
-from django.utils import timezone
+from django.core.cache import cache
 from django.http import HttpResponse
-
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.platypus import (
-    SimpleDocTemplate,
-    Table,
-    TableStyle,
-    Paragraph,
-    Spacer,
-)
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
+from utils.reports import render_table_report
 
 User = get_user_model()
 
@@ -36,7 +28,25 @@ class AttendanceSessionAllView(APIView):
 
     def get(self, request):
 
-        sessions = AttendanceSession.objects.all()
+        sessions = AttendanceSession.objects.prefetch_related("targets__profile")
+
+        if KeysetPaginator.requested(request):
+            paginator = KeysetPaginator.from_request(
+                request, sessions, sort_field="created_at", descending=True
+            )
+            try:
+                page = paginator.paginate()
+            except InvalidCursor as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            serializer = AttendanceSessionSerializer(page, many=True)
+            return Response(
+                {
+                    "sessions": serializer.data,
+                    "pagination": paginator.pagination_data(),
+                },
+                status=status.HTTP_200_OK,
+            )
+
         serializer = AttendanceSessionSerializer(sessions, many=True)
         return Response({"sessions": serializer.data}, status=status.HTTP_200_OK)
 
@@ -156,7 +166,10 @@ class AttendanceSessionVeiw(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        session.delete()
+        with transaction.atomic():
+            user_ids = list(session.attendances.values_list("user_id", flat=True))
+            session.delete()
+            AttendanceSummary.refresh_for_users(user_ids)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -230,6 +243,8 @@ class AttendanceAPIView(APIView):
                     created_attendances.append(user_id)
             else:
                 errors.append({"user": user_id, "errors": serializer.errors})
+        AttendanceSummary.refresh_for_users(created_attendances + updated_attendances)
+
         if len(errors) > 0:
             return Response({"error": errors}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -271,16 +286,18 @@ class CloseAttendanceSessionAPIView(APIView):
 
         absent_user_ids = target_user_ids - attended_user_ids
 
-        if absent_user_ids:
-            Attendance.objects.bulk_create(
-                [
-                    Attendance(session=session, user_id=user_id, status="absent")
-                    for user_id in absent_user_ids
-                ]
-            )
+        with transaction.atomic():
+            if absent_user_ids:
+                Attendance.objects.bulk_create(
+                    [
+                        Attendance(session=session, user_id=user_id, status="absent")
+                        for user_id in absent_user_ids
+                    ]
+                )
+                AttendanceSummary.refresh_for_users(absent_user_ids)
 
-        session.is_ended = True
-        session.save(update_fields=["is_ended"])
+            session.is_ended = True
+            session.save(update_fields=["is_ended"])
 
         return Response(
             {
@@ -319,6 +336,7 @@ class SessionExportPdfView(APIView):
     permission_classes = [IsAdminUser]
 
     MAX_TEXT_LENGTH = 30  # max chars for name and notes
+    PDF_CACHE_TIMEOUT = 60 * 60 * 24
 
     def truncate(self, text):
         if not text:
@@ -329,42 +347,22 @@ class SessionExportPdfView(APIView):
             else text[: self.MAX_TEXT_LENGTH - 3] + "..."
         )
 
-    def get(self, request, session_id):
-        if not session_id:
-            return Response({"detail": "session_id is required"}, status=400)
-
-        try:
-            session = AttendanceSession.objects.get(pk=session_id)
-        except AttendanceSession.DoesNotExist:
-            return Response({"detail": "AttendanceSession not found"}, status=404)
-
-        if not session.is_ended:
-            return Response(
-                {
-                    "detail": "Session is not ended/closed yet. Export allowed only for ended sessions."
-                },
-                status=400,
-            )
-
-        # Query data
+    def report_data(self, session):
+        """
+        The report's rows and status counts: everything in the PDF that
+        comes from the database.
+        """
         students_qs = session.targets.select_related("profile").all()
-        total_students = students_qs.count()
-        attendance_qs = Attendance.objects.filter(session=session).select_related(
-            "user", "user__profile"
-        )
-        attendance_map = {att.user_id: att for att in attendance_qs}
-
-        status_counts = {
-            "present": attendance_qs.filter(status="present").count(),
-            "late": attendance_qs.filter(status="late").count(),
-            "absent": attendance_qs.filter(status="absent").count(),
-            "special_case": attendance_qs.filter(status="special_case").count(),
+        attendance_map = {
+            att.user_id: att for att in Attendance.objects.filter(session=session)
         }
 
-        # Build attendance rows with index
-        table_data = [
-            ["#", "Full Name", "Grade", "Section", "Status", "Attended At", "Note"]
-        ]
+        status_counts = {"present": 0, "late": 0, "absent": 0, "special_case": 0}
+        for att in attendance_map.values():
+            if att.status in status_counts:
+                status_counts[att.status] += 1
+
+        rows = []
         for i, user in enumerate(students_qs, start=1):
             att = attendance_map.get(user.id)
             profile = getattr(user, "profile", None)
@@ -379,95 +377,64 @@ class SessionExportPdfView(APIView):
             )
             note = self.truncate(att.note if att and att.note else "")
 
-            table_data.append(
+            rows.append(
                 [str(i), full_name, grade, section, status_val, attended_at, note]
             )
-
-        # Create PDF buffer
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=A4,  # Portrait
-            rightMargin=30,
-            leftMargin=30,
-            topMargin=30,
-            bottomMargin=30,
+        return rows, status_counts
+
+    def render_pdf(self, session, rows, status_counts):
+        return render_table_report(
+            f"Attendance Report: {session.title}",
+            [
+                f"Session ID: {session.id}",
+                f"Created At: {session.created_at.strftime('%Y-%m-%d %H:%M:%S')}",
+                f"Total Students: {len(rows)}",
+                f"Present: {status_counts['present']}",
+                f"Late: {status_counts['late']}",
+                f"Absent: {status_counts['absent']}",
+                f"Special Case: {status_counts['special_case']}",
+            ],
+            ["#", "Full Name", "Grade", "Section", "Status", "Attended At", "Note"],
+            rows,
+            [0.05, 0.25, 0.12, 0.12, 0.12, 0.18, 0.16],
+            table_style=[
+                ("ALIGN", (0, 1), (0, -1), "CENTER"),  # index center
+                ("ALIGN", (4, 1), (4, -1), "CENTER"),  # Status center
+            ],
         )
 
-        elements = []
-        styles = getSampleStyleSheet()
-
-        # Title
-        elements.append(
-            Paragraph(f"<b>Attendance Report: {session.title}</b>", styles["Title"])
-        )
-        elements.append(Spacer(1, 0.2 * inch))
-
-        # Metadata Section
-        metadata_lines = [
-            f"Session ID: {session.id}",
-            f"Created At: {session.created_at.strftime('%Y-%m-%d %H:%M:%S')}",
-            f"Total Students: {total_students}",
-            f"Present: {status_counts['present']}",
-            f"Late: {status_counts['late']}",
-            f"Absent: {status_counts['absent']}",
-            f"Special Case: {status_counts['special_case']}",
-            f"Exported At: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        ]
-
-        for line in metadata_lines:
-            elements.append(Paragraph(line, styles["Normal"]))
-        elements.append(Spacer(1, 0.4 * inch))
-
-        # Table width: 90% of page width
-        available_width = doc.width
-        table_width = available_width * 0.9
-        col_widths = [
-            table_width * 0.05,  # Index
-            table_width * 0.25,  # Full Name
-            table_width * 0.12,  # Grade
-            table_width * 0.12,  # Section
-            table_width * 0.12,  # Status
-            table_width * 0.18,  # Attended At
-            table_width * 0.16,  # Note
-        ]
+    def get(self, request, session_id):
+        if not session_id:
+            return Response({"detail": "session_id is required"}, status=400)
 
-        # Wrap strings in Paragraphs
-        table_data_wrapped = []
-        normal_style = styles["Normal"]
-        for row in table_data:
-            table_data_wrapped.append(
-                [Paragraph(str(cell), normal_style) for cell in row]
-            )
+        try:
+            session = AttendanceSession.objects.get(pk=session_id)
+        except AttendanceSession.DoesNotExist:
+            return Response({"detail": "AttendanceSession not found"}, status=404)
 
-        attendance_table = Table(table_data_wrapped, repeatRows=1, colWidths=col_widths)
-        attendance_table.hAlign = "CENTER"
-
-        # Table style
-        attendance_table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e0e0e0")),
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                    ("ALIGN", (0, 1), (0, -1), "CENTER"),  # index center
-                    ("ALIGN", (4, 1), (4, -1), "CENTER"),  # Status center
-                    ("LEFTPADDING", (0, 0), (-1, -1), 4),
-                    ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-                    ("TOPPADDING", (0, 0), (-1, -1), 3),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-                ]
+        if not session.is_ended:
+            return Response(
+                {
+                    "detail": "Session is not ended/closed yet. Export allowed only for ended sessions."
+                },
+                status=400,
             )
-        )
-
-        elements.append(attendance_table)
 
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
+        # Rendering is the expensive part, so the PDF is cached under a digest
+        # of what it shows: renamed students, profile edits and attendance
+        # corrections all produce a new report. Nothing else goes into the
+        # PDF (no export time), so a cached copy is never out of date.
+        rows, status_counts = self.report_data(session)
+        content = json.dumps([session.title, rows, status_counts], default=str)
+        digest = hashlib.sha256(content.encode()).hexdigest()
+        cache_key = f"attendance:session_pdf:{session.id}:{digest}"
+        pdf = cache.get(cache_key)
+        if pdf is None:
+            pdf = self.render_pdf(session, rows, status_counts)
+            cache.set(cache_key, pdf, self.PDF_CACHE_TIMEOUT)
 
         filename = f"{session.title.replace(' ', '_')}_attendance_{session.id}.pdf"
-        response = HttpResponse(buffer.read(), content_type="application/pdf")
+        response = HttpResponse(pdf, content_type="application/pdf")
         response["Content-Disposition"] = f'attachment; filename="{filename}"'
 
         return response
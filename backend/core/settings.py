@@ -69,6 +69,7 @@ INSTALLED_APPS = [
     "learning_task",
     "attendance",
     "announcement",
+    "jobs",
 ]
 
 ASGI_APPLICATION = "core.asgi.application"
@@ -108,33 +109,27 @@ WSGI_APPLICATION = "core.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# The web server, the run_jobs workers and the notification relay run as
+# separate containers (docker-compose.yml), so outside of development they
+# must share a database server.
+if DEBUG:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": env("POSTGRES_DB", default="itclub_db"),
+            "USER": env("POSTGRES_USER", default="itclub_user"),
+            "PASSWORD": env("POSTGRES_PASSWORD", default="SuperSecret123"),
+            "HOST": env("POSTGRES_HOST", default="db"),
+            "PORT": env.int("POSTGRES_PORT", default=5432),
+        }
     }
-}
-
-# if DEBUG:
-
-#     DATABASES = {
-#         "default": {
-#             "ENGINE": "django.db.backends.sqlite3",
-#             "NAME": BASE_DIR / "db.sqlite3",
-#         }
-#     }
-# else:
-
-#     DATABASES = {
-#         "default": {
-#             "ENGINE": "django.db.backends.postgresql",
-#             "NAME": env("POSTGRES_DB", default="itclub_db"),
-#             "USER": env("POSTGRES_USER", default="itclub_user"),
-#             "PASSWORD": env("POSTGRES_PASSWORD", default="SuperSecret123"),
-#             "HOST": env("POSTGRES_HOST", default="db"),
-#             "PORT": env.int("POSTGRES_PORT", default=5432),
-#         }
-    # }
 
 
 # Password validation
@@ -197,9 +192,18 @@ if IS_CLOUDINARY:
         # "SIGN_URL": True,
     }
     cloudinary.config(**CLOUDINARY_STORAGE)
+    # Token based delivery auth (hex key) lets signed image URLs expire
+    CLOUD_AUTH_TOKEN_KEY = env("CLOUD_AUTH_TOKEN_KEY", default="")
+    if CLOUD_AUTH_TOKEN_KEY:
+        cloudinary.config(auth_token={"key": CLOUD_AUTH_TOKEN_KEY})
     CLOUDINARY_STORAGE_DEFAULT_TYPE = "authenticated"
     DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
 
+# Uploads waiting for a background job and the files jobs produce. Must be
+# shared by the web server and the run_jobs workers (the `job_files` volume
+# in docker-compose.yml).
+JOB_FILES_ROOT = env("JOB_FILES_ROOT", default=str(BASE_DIR / "job_files"))
+
 
 # Redis
 if DEBUG:
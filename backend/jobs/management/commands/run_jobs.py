@@ -0,0 +1,61 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.models import Job
+from jobs.registry import run_job
+
+# How often each worker deletes jobs older than Job.RETENTION
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (exports, bulk uploads, reports). "
+        "Start one or more of these next to the web server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs that are currently queued, then exit.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(f"Job worker {worker} started.")
+        next_purge = 0
+
+        while True:
+            close_old_connections()
+            if time.monotonic() >= next_purge:
+                purged = Job.purge_finished()
+                if purged:
+                    self.stdout.write(f"Purged {purged} finished jobs.")
+                next_purge = time.monotonic() + PURGE_INTERVAL
+            requeued, failed = Job.recover_stale()
+            if requeued or failed:
+                self.stdout.write(
+                    f"Recovered stale jobs: {requeued} requeued, {failed} failed."
+                )
+            job = Job.claim_next(worker)
+
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            self.stdout.write(f"Running {job}")
+            job = run_job(job)
+            self.stdout.write(f"Finished {job}")
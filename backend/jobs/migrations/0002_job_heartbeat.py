@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-17 13:18
+
+from django.db import migrations, models
+
+
+def backfill_running_jobs(apps, schema_editor):
+    # Jobs already running count as claimed once, last heard of at start
+    Job = apps.get_model("jobs", "Job")
+    Job.objects.filter(status="running").update(
+        attempts=1, heartbeat_at=models.F("started_at")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_running_jobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-17 13:20
+
+import jobs.models
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+
+def move_inputs_to_files(apps, schema_editor):
+    # Queued uploads still held in the row are written out for the workers
+    Job = apps.get_model("jobs", "Job")
+    waiting = Job.objects.filter(
+        status__in=["pending", "running"], input_data__isnull=False
+    )
+    for job in waiting.iterator():
+        job.input_file.save(
+            job.input_name or f"job-{job.id}", ContentFile(bytes(job.input_data))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='input_file',
+            field=models.FileField(blank=True, storage=jobs.models.job_files_storage, upload_to='inputs/%Y/%m/'),
+        ),
+        migrations.RunPython(move_inputs_to_files, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='job',
+            name='input_data',
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 13:54
+
+import jobs.models
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+
+def move_results_to_files(apps, schema_editor):
+    # Results still downloadable are written out; the rest are dropped
+    Job = apps.get_model("jobs", "Job")
+    stored = Job.objects.filter(status="succeeded", result_data__isnull=False)
+    for job in stored.iterator():
+        job.result_file.save(
+            job.result_name or f"job-{job.id}", ContentFile(bytes(job.result_data))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_job_input_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='result_file',
+            field=models.FileField(blank=True, storage=jobs.models.job_files_storage, upload_to='results/%Y/%m/'),
+        ),
+        migrations.RunPython(move_results_to_files, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='job',
+            name='result_data',
+        ),
+    ]
@@ -0,0 +1,221 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.db.models import F
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class JobFilesStorage(FileSystemStorage):
+    """Reads settings.JOB_FILES_ROOT on use, rather than once at import."""
+
+    @property
+    def base_location(self):
+        return settings.JOB_FILES_ROOT
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+def job_files_storage():
+    """Local storage for job uploads and results; see settings.JOB_FILES_ROOT."""
+    return JobFilesStorage()
+
+
+class Job(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    # Workers touch heartbeat_at while they run a job. A running job not
+    # heard from for STALE_AFTER lost its worker; it goes back to the queue
+    # until it has been claimed MAX_ATTEMPTS times.
+    HEARTBEAT_INTERVAL = timedelta(seconds=30)
+    STALE_AFTER = timedelta(minutes=5)
+    MAX_ATTEMPTS = 3
+    # Finished jobs, and the files they produced, are purged after this long
+    RETENTION = timedelta(days=7)
+
+    kind = models.CharField(max_length=50)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    created_by = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="jobs"
+    )
+
+    params = models.JSONField(default=dict, blank=True)
+    input_name = models.CharField(max_length=255, blank=True)
+    # Uploads are kept on disk until the job finishes, not in the row
+    input_file = models.FileField(
+        storage=job_files_storage, upload_to="inputs/%Y/%m/", blank=True
+    )
+
+    progress = models.PositiveSmallIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    result_name = models.CharField(max_length=255, blank=True)
+    result_content_type = models.CharField(max_length=100, blank=True)
+    result_file = models.FileField(
+        storage=job_files_storage, upload_to="results/%Y/%m/", blank=True
+    )
+
+    worker = models.CharField(max_length=100, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["created_by", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @classmethod
+    def enqueue(cls, kind, user, params=None, input_file=None):
+        """
+        Queues a job. `input_file` (an uploaded file) is copied to the job
+        files storage, streamed in chunks, and handed to the handler as
+        `job.input_file`.
+        """
+        job = cls(kind=kind, created_by=user, params=params or {})
+        if input_file is not None:
+            job.input_name = input_file.name
+            job.input_file.save(input_file.name, input_file, save=False)
+        job.save()
+        return job
+
+    @classmethod
+    def claim_next(cls, worker):
+        """
+        Moves the oldest pending job to running and returns it, or None.
+        The status check in the UPDATE makes the claim safe when several
+        workers poll the same table.
+        """
+        candidates = cls.objects.filter(status=cls.STATUS_PENDING).order_by(
+            "created_at", "id"
+        )
+        for job_id in candidates.values_list("id", flat=True)[:10]:
+            claimed = cls.objects.filter(
+                id=job_id, status=cls.STATUS_PENDING
+            ).update(
+                status=cls.STATUS_RUNNING,
+                worker=worker,
+                attempts=F("attempts") + 1,
+                started_at=timezone.now(),
+                heartbeat_at=timezone.now(),
+            )
+            if claimed:
+                return cls.objects.select_related("created_by").get(id=job_id)
+        return None
+
+    @classmethod
+    def recover_stale(cls):
+        """
+        Requeues the running jobs whose worker stopped sending heartbeats,
+        or fails those already claimed MAX_ATTEMPTS times. Returns
+        (requeued, failed).
+        """
+        now = timezone.now()
+        stale = cls.objects.filter(
+            status=cls.STATUS_RUNNING, heartbeat_at__lt=now - cls.STALE_AFTER
+        )
+        exhausted = stale.filter(attempts__gte=cls.MAX_ATTEMPTS)
+        inputs = list(
+            exhausted.exclude(input_file="").values_list("input_file", flat=True)
+        )
+        failed = exhausted.update(
+            status=cls.STATUS_FAILED,
+            error="The worker running this job stopped responding.",
+            input_file="",
+            finished_at=now,
+        )
+        storage = job_files_storage()
+        for name in inputs:
+            storage.delete(name)
+        requeued = stale.update(
+            status=cls.STATUS_PENDING,
+            worker="",
+            progress=0,
+            message="",
+            started_at=None,
+            heartbeat_at=None,
+        )
+        return requeued, failed
+
+    @classmethod
+    def purge_finished(cls):
+        """
+        Deletes the jobs that finished more than RETENTION ago; their files
+        go with them (jobs.signals). Returns the number of jobs deleted.
+        """
+        expired = cls.objects.filter(
+            status__in=[cls.STATUS_SUCCEEDED, cls.STATUS_FAILED],
+            finished_at__lt=timezone.now() - cls.RETENTION,
+        )
+        _, deleted = expired.delete()
+        return deleted.get(cls._meta.label, 0)
+
+    def beat(self):
+        """Records that this job's worker is still alive."""
+        return Job.objects.filter(
+            id=self.id, status=self.STATUS_RUNNING, worker=self.worker
+        ).update(heartbeat_at=timezone.now())
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+    @property
+    def has_file(self):
+        return bool(self.result_file)
+
+    def attach_file(self, name, content_type, data):
+        """
+        Stores the job's downloadable result. `data` is bytes or a File,
+        which is copied to the job files storage in chunks.
+        """
+        if isinstance(data, bytes):
+            data = ContentFile(data)
+        self.result_name = name
+        self.result_content_type = content_type
+        self.result_file.save(name, data, save=False)
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "has_file": self.has_file,
+            "result_name": self.result_name,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
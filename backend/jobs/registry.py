@@ -0,0 +1,130 @@
+import threading
+import traceback
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from utils.notif import live_update
+from .models import Job
+
+HANDLERS = {}
+
+
+def register(kind):
+    """
+    Registers a job handler: `handler(job, progress)` returning a JSON
+    serialisable result. Handlers may call `job.attach_file(...)` to leave a
+    downloadable file and `progress(percent, message)` to report progress.
+    """
+
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+
+    return decorator
+
+
+def wants_async(request):
+    value = request.query_params.get("async")
+    if value is None and hasattr(request.data, "get"):
+        value = request.data.get("async")
+    return str(value).lower() in ("1", "true")
+
+
+def accepted_response(job):
+    return Response(
+        {"job_id": job.id, "status": job.status, "kind": job.kind},
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+def _push(job):
+    try:
+        async_to_sync(live_update)(job.created_by, type="job", job=job.as_dict())
+    except Exception as e:
+        print(f"Job {job.id} live update failed: {e}")
+
+
+class ProgressReporter:
+    def __init__(self, job):
+        self.job = job
+
+    def __call__(self, percent, message=""):
+        percent = max(0, min(int(percent), 99))
+        message = message[:255]
+        if percent == self.job.progress and message == self.job.message:
+            return
+        self.job.progress = percent
+        self.job.message = message
+        Job.objects.filter(id=self.job.id).update(
+            progress=percent, message=message, heartbeat_at=timezone.now()
+        )
+        _push(self.job)
+
+
+class Heartbeat(threading.Thread):
+    """
+    Keeps a running job's heartbeat fresh from a side thread, so handlers
+    that report no progress for a while aren't mistaken for lost jobs.
+    """
+
+    def __init__(self, job):
+        super().__init__(name=f"job-{job.id}-heartbeat", daemon=True)
+        self.job = job
+        self.stopped = threading.Event()
+
+    def run(self):
+        interval = Job.HEARTBEAT_INTERVAL.total_seconds()
+        try:
+            while not self.stopped.wait(interval):
+                self.job.beat()
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(job):
+    _push(job)
+    heartbeat = Heartbeat(job)
+    heartbeat.start()
+    try:
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            raise ValueError(f"No handler registered for job kind '{job.kind}'")
+
+        job.result = handler(job, ProgressReporter(job))
+        job.status = Job.STATUS_SUCCEEDED
+        job.progress = 100
+        job.message = "Done"
+    except Exception as e:
+        traceback.print_exc()
+        job.status = Job.STATUS_FAILED
+        job.error = str(e)
+    finally:
+        heartbeat.stop()
+
+    job.finished_at = timezone.now()
+    if job.input_file:
+        job.input_file.delete(save=False)
+    job.save(
+        update_fields=[
+            "status",
+            "progress",
+            "message",
+            "result",
+            "error",
+            "result_name",
+            "result_content_type",
+            "result_file",
+            "input_file",
+            "finished_at",
+        ]
+    )
+    _push(job)
+    return job
@@ -0,0 +1,15 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Job
+
+
+@receiver(post_delete, sender=Job)
+def job_deleted(sender, instance, **kwargs):
+    # After commit, so a rolled back delete still finds its files
+    for file in (instance.input_file, instance.result_file):
+        if file:
+            transaction.on_commit(partial(file.storage.delete, file.name))
@@ -0,0 +1,365 @@
+import io
+import os
+import tempfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from openpyxl import load_workbook
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import Profile
+from .models import Job
+from .registry import HANDLERS, run_job
+
+User = get_user_model()
+
+
+async def _read_async(response):
+    return b"".join([chunk async for chunk in response.streaming_content])
+
+
+def failing_handler(job, progress):
+    progress(40, "Half way")
+    raise RuntimeError("boom")
+
+
+def file_handler(job, progress):
+    job.attach_file("report.txt", "text/plain", b"report body")
+    return {"filename": "report.txt"}
+
+
+class JobRunTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner@example.com", "Owner", "pw")
+        cls.other = User.objects.create_user("other@example.com", "Other", "pw")
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(JOB_FILES_ROOT=root.name))
+        self.enterContext(mock.patch("jobs.registry.live_update", mock.AsyncMock()))
+        self.enterContext(mock.patch("jobs.registry.traceback.print_exc"))
+        self.enterContext(
+            mock.patch.dict(
+                HANDLERS, {"fails": failing_handler, "makes_file": file_handler}
+            )
+        )
+
+    def download(self, job, user):
+        self.client.cookies["access"] = str(AccessToken.for_user(user))
+        return self.client.get(f"/api/jobs/{job.id}/download/", secure=True)
+
+    def content(self, response):
+        return async_to_sync(_read_async)(response)
+
+    def test_claims_the_oldest_pending_job_once(self):
+        first = Job.enqueue("makes_file", self.owner)
+        second = Job.enqueue("makes_file", self.owner)
+
+        claimed = Job.claim_next("worker-a")
+        self.assertEqual(
+            (claimed.id, claimed.status, claimed.worker, claimed.attempts),
+            (first.id, Job.STATUS_RUNNING, "worker-a", 1),
+        )
+        self.assertIsNotNone(claimed.started_at)
+        self.assertEqual(Job.claim_next("worker-b").id, second.id)
+        self.assertIsNone(Job.claim_next("worker-c"))
+
+    def test_success_leaves_a_downloadable_file(self):
+        job = run_job(Job.enqueue("makes_file", self.owner))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual((job.progress, job.result), (100, {"filename": "report.txt"}))
+        self.assertIsNotNone(job.finished_at)
+
+        # Kept in the job files storage, not in the row
+        self.assertTrue(os.path.exists(job.result_file.path))
+        response = self.download(job, self.owner)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        self.assertEqual(self.content(response), b"report body")
+        self.assertEqual(response["Content-Length"], "11")
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="report.txt"'
+        )
+
+    def test_only_the_owner_can_download(self):
+        job = run_job(Job.enqueue("makes_file", self.owner))
+
+        self.assertEqual(self.download(job, self.other).status_code, 404)
+
+    def test_failure_records_the_error(self):
+        job = run_job(Job.enqueue("fails", self.owner))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.error, "boom")
+        self.assertEqual((job.progress, job.message), (40, "Half way"))
+        self.assertEqual(self.download(job, self.owner).status_code, 404)
+
+    def test_unknown_kinds_fail(self):
+        job = run_job(Job.enqueue("no_such_kind", self.owner))
+
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn("no_such_kind", job.error)
+
+    def test_progress_messages_are_truncated(self):
+        def chatty(job, progress):
+            progress(10, "x" * 300)
+            return len(Job.objects.values_list("message", flat=True).get(id=job.id))
+
+        with mock.patch.dict(HANDLERS, {"chatty": chatty}):
+            job = run_job(Job.enqueue("chatty", self.owner))
+
+        self.assertEqual(job.result, 255)
+
+    def test_run_jobs_command_drains_the_queue(self):
+        jobs = [Job.enqueue(kind, self.owner) for kind in ("makes_file", "fails")]
+
+        out = io.StringIO()
+        call_command("run_jobs", once=True, stdout=out)
+
+        statuses = [Job.objects.get(id=job.id).status for job in jobs]
+        self.assertEqual(statuses, [Job.STATUS_SUCCEEDED, Job.STATUS_FAILED])
+        self.assertIn(f"Finished {Job.objects.get(id=jobs[1].id)}", out.getvalue())
+
+
+class AsyncEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            "root@example.com", "Root", "pw", role="admin"
+        )
+        for i, section in enumerate("AAB"):
+            student = User.objects.create_user(
+                f"s{i}@example.com", f"Student {i}", "pw"
+            )
+            Profile.objects.create(
+                user=student,
+                grade=11,
+                section=section,
+                field="backend",
+                phone_number="0900000000",
+            )
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(JOB_FILES_ROOT=root.name))
+        self.enterContext(mock.patch("jobs.registry.live_update", mock.AsyncMock()))
+        self.client.cookies["access"] = str(AccessToken.for_user(self.admin))
+
+    def queued_job(self, response):
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(id=response.json()["job_id"])
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        return job
+
+    def run_queue(self):
+        call_command("run_jobs", once=True, stdout=io.StringIO())
+
+    def test_async_export(self):
+        job = self.queued_job(
+            self.client.get(
+                "/api/management/students/export/?file_format=csv&async=1",
+                secure=True,
+            )
+        )
+        self.run_queue()
+
+        response = self.client.get(f"/api/jobs/{job.id}/download/", secure=True)
+        self.assertEqual(response.status_code, 200)
+        content = async_to_sync(_read_async)(response).decode()
+        self.assertEqual(len(content.splitlines()), 4)
+        self.assertTrue(content.startswith("Full Name,Email"))
+
+    def test_async_xlsx_export(self):
+        job = self.queued_job(
+            self.client.get(
+                "/api/management/students/export/?file_format=xlsx&async=1",
+                secure=True,
+            )
+        )
+        self.run_queue()
+
+        response = self.client.get(f"/api/jobs/{job.id}/download/", secure=True)
+        content = async_to_sync(_read_async)(response)
+        workbook = load_workbook(io.BytesIO(content), read_only=True)
+        self.assertEqual(len(list(workbook.active.iter_rows())), 4)
+
+    def test_async_bulk_upload(self):
+        upload = SimpleUploadedFile(
+            "students.csv",
+            b"full_name,email,grade,section,field,gender,phone_number\n"
+            b"New Student,new@example.com,10,C,frontend,female,0911111111\n",
+        )
+        job = self.queued_job(
+            self.client.post(
+                "/api/management/students/bulk-upload/",
+                {"file": upload, "async": "1"},
+                secure=True,
+            )
+        )
+        self.run_queue()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result["created_count"], 1)
+        self.assertTrue(Profile.objects.filter(user__email="new@example.com").exists())
+
+    def test_async_bulk_operation_from_a_form_post(self):
+        job = self.queued_job(
+            self.client.post(
+                "/api/management/students/bulk/",
+                {"action": "delete", "section": "B", "async": "1"},
+                secure=True,
+            )
+        )
+        self.assertEqual(job.params["action"], "delete")
+        self.run_queue()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result["deleted_count"], 1)
+        self.assertEqual(Profile.objects.count(), 2)
+
+
+class StaleJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "admin@example.com", "Admin", "pw", role="admin", is_staff=True
+        )
+
+    def claim_and_lose(self):
+        job = Job.claim_next("lost-worker")
+        Job.objects.filter(id=job.id).update(
+            heartbeat_at=timezone.now() - Job.STALE_AFTER * 2
+        )
+        return job
+
+    def test_lost_jobs_go_back_to_the_queue(self):
+        job = Job.enqueue("export", self.admin)
+        self.claim_and_lose()
+
+        self.assertEqual(Job.recover_stale(), (1, 0))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertEqual(job.worker, "")
+        self.assertEqual(Job.claim_next("next-worker").attempts, 2)
+
+    def test_jobs_fail_after_max_attempts(self):
+        job = Job.enqueue("export", self.admin)
+        for _ in range(Job.MAX_ATTEMPTS - 1):
+            self.claim_and_lose()
+            Job.recover_stale()
+        self.claim_and_lose()
+
+        self.assertEqual(Job.recover_stale(), (0, 1))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_live_jobs_are_left_alone(self):
+        Job.enqueue("export", self.admin)
+        job = Job.claim_next("live-worker")
+        Job.objects.filter(id=job.id).update(
+            heartbeat_at=timezone.now() - Job.STALE_AFTER * 2
+        )
+        job.beat()
+
+        self.assertEqual(Job.recover_stale(), (0, 0))
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.STATUS_RUNNING)
+
+
+class JobInputFileTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(JOB_FILES_ROOT=root.name))
+        self.enterContext(mock.patch("jobs.registry.live_update", mock.AsyncMock()))
+        self.admin = User.objects.create_user("files@example.com", "Files", "pw")
+        HANDLERS["echo_input"] = lambda job, progress: {
+            "name": job.input_name,
+            "data": job.input_file.read().decode(),
+        }
+        self.addCleanup(HANDLERS.pop, "echo_input")
+
+    def test_upload_is_kept_on_disk_until_the_job_ends(self):
+        upload = SimpleUploadedFile("students.csv", b"email\na@example.com\n")
+        job = Job.enqueue("echo_input", self.admin, input_file=upload)
+        path = job.input_file.path
+        self.assertTrue(os.path.exists(path))
+
+        job = run_job(Job.claim_next("worker"))
+
+        self.assertEqual(
+            job.result, {"name": "students.csv", "data": "email\na@example.com\n"}
+        )
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(Job.objects.get(id=job.id).input_file.name, "")
+
+
+class JobRetentionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner@example.com", "Owner", "pw")
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(JOB_FILES_ROOT=root.name))
+
+    def finished_job(self, age, status=Job.STATUS_SUCCEEDED):
+        job = Job.enqueue("export", self.owner)
+        job.attach_file("report.txt", "text/plain", b"report body")
+        job.status = status
+        job.finished_at = timezone.now() - age
+        job.save()
+        return job
+
+    def test_old_finished_jobs_are_purged_with_their_files(self):
+        old = self.finished_job(Job.RETENTION * 2)
+        old_failed = self.finished_job(Job.RETENTION * 2, Job.STATUS_FAILED)
+        recent = self.finished_job(Job.RETENTION / 2)
+        queued = Job.enqueue("export", self.owner)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Job.purge_finished(), 2)
+
+        self.assertEqual(
+            set(Job.objects.values_list("id", flat=True)), {recent.id, queued.id}
+        )
+        self.assertFalse(os.path.exists(old.result_file.path))
+        self.assertFalse(os.path.exists(old_failed.result_file.path))
+        self.assertTrue(os.path.exists(recent.result_file.path))
+
+    def test_files_are_kept_until_the_delete_commits(self):
+        job = self.finished_job(Job.RETENTION * 2)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Job.purge_finished()
+            self.assertTrue(os.path.exists(job.result_file.path))
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(os.path.exists(job.result_file.path))
+
+    def test_workers_purge_on_start(self):
+        self.finished_job(Job.RETENTION * 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            out = io.StringIO()
+            call_command("run_jobs", once=True, stdout=out)
+
+        self.assertIn("Purged 1 finished jobs.", out.getvalue())
+        self.assertFalse(Job.objects.exists())
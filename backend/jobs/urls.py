@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import JobListView, JobDetailView, JobDownloadView
+
+urlpatterns = [
+    path("", JobListView.as_view(), name="job-list"),
+    path("<int:job_id>/", JobDetailView.as_view(), name="job-detail"),
+    path("<int:job_id>/download/", JobDownloadView.as_view(), name="job-download"),
+]
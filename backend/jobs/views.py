@@ -0,0 +1,58 @@
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+from utils.auth import JWTCookieAuthentication
+from utils.streaming import stream_file
+from .models import Job
+
+
+def _visible_jobs(user):
+    jobs = Job.objects.all()
+    if user.is_superuser:
+        return jobs
+    return jobs.filter(created_by=user)
+
+
+class JobListView(APIView):
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        jobs = Job.objects.filter(created_by=request.user)[:20]
+        return Response(
+            {"jobs": [job.as_dict() for job in jobs]}, status=status.HTTP_200_OK
+        )
+
+
+class JobDetailView(APIView):
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(_visible_jobs(request.user), id=job_id)
+        return Response(job.as_dict(), status=status.HTTP_200_OK)
+
+
+class JobDownloadView(APIView):
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(_visible_jobs(request.user), id=job_id)
+        if job.status != Job.STATUS_SUCCEEDED or not job.has_file:
+            return Response(
+                {"error": "This job has no file to download yet."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        response = StreamingHttpResponse(
+            stream_file(job.result_file.open("rb")),
+            content_type=job.result_content_type,
+        )
+        response["Content-Length"] = job.result_file.size
+        response["Content-Disposition"] = f'attachment; filename="{job.result_name}"'
+        return response
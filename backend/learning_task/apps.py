@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LearningTaskConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'learning_task'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,67 @@
+import time
+
+from django.core.cache import cache
+
+from .models import LearningTask
+from .querysets import summary_shape
+
+TOP_TASKS_VERSION_KEY = "learning_task:top_tasks:version"
+TOP_TASKS_TIMEOUT = 60 * 60
+# How many ranked ids are kept in the cache; larger boundaries are read
+# straight from the ranking index.
+TOP_TASKS_CACHED = 50
+
+
+def _top_tasks_version():
+    version = cache.get(TOP_TASKS_VERSION_KEY)
+    if version is None:
+        cache.add(TOP_TASKS_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(TOP_TASKS_VERSION_KEY)
+    return version
+
+
+def invalidate_top_tasks():
+    """
+    Move the ranking to a new version; ids cached under the old one simply
+    stop being read and expire on their own.
+    """
+    try:
+        cache.incr(TOP_TASKS_VERSION_KEY)
+    except ValueError:
+        cache.set(TOP_TASKS_VERSION_KEY, time.time_ns(), None)
+
+
+def _ranked_ids(limit):
+    return list(
+        LearningTask.objects.order_by(*LearningTask.TOP_ORDERING).values_list(
+            "id", flat=True
+        )[:limit]
+    )
+
+
+def get_top_task_ids(boundary):
+    """
+    Ids of the `boundary` best tasks by admin rating, then likes. The ranking
+    is served from the denormalised columns and their index, so it costs the
+    same however many tasks exist.
+    """
+    boundary = max(int(boundary), 0)
+    if boundary > TOP_TASKS_CACHED:
+        return _ranked_ids(boundary)
+
+    key = f"learning_task:top_tasks:{_top_tasks_version()}"
+    ids = cache.get(key)
+    if ids is None:
+        ids = _ranked_ids(TOP_TASKS_CACHED)
+        cache.set(key, ids, TOP_TASKS_TIMEOUT)
+    return ids[:boundary]
+
+
+def get_top_tasks(boundary):
+    """
+    The top tasks themselves, in ranking order, shaped for
+    LearningTaskSummarySerializer.
+    """
+    ids = get_top_task_ids(boundary)
+    tasks = summary_shape(LearningTask.objects.filter(id__in=ids)).in_bulk()
+    return [tasks[task_id] for task_id in ids if task_id in tasks]
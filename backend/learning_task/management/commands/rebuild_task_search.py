@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from learning_task import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of every learning task."
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(
+                "This database has no full-text index; search uses substring "
+                "matching instead."
+            )
+            return
+        indexed = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} learning tasks."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from learning_task.models import LearningTask
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the likes of every learning task and fix any drift in the "
+        "denormalised likes_count column."
+    )
+
+    def handle(self, *args, **options):
+        Like = LearningTask.likes.through
+        counts = (
+            Like.objects.filter(learningtask_id=OuterRef("pk"))
+            .order_by()
+            .values("learningtask_id")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        drifted = (
+            LearningTask.objects.annotate(actual=Coalesce(Subquery(counts), 0))
+            .exclude(likes_count=F("actual"))
+            .values_list("id", "actual")
+        )
+
+        fixed = 0
+        for task_id, actual in drifted.iterator():
+            fixed += LearningTask.objects.filter(id=task_id).update(likes_count=actual)
+
+        self.stdout.write(self.style.SUCCESS(f"Fixed {fixed} like counters."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from learning_task.models import StudentScore
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the materialised score of every student from their admin "
+        "reviews and task bonuses."
+    )
+
+    def handle(self, *args, **options):
+        StudentScore.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed {StudentScore.objects.count()} student scores."
+            )
+        )
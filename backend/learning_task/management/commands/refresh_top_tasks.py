@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from learning_task.cache import invalidate_top_tasks
+from learning_task.models import LearningTask
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalised admin rating of every learning task and "
+        "drop the cached top-task ranking."
+    )
+
+    def handle(self, *args, **options):
+        refreshed = LearningTask.refresh_admin_ratings()
+        invalidate_top_tasks()
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed the admin rating of {refreshed} tasks.")
+        )
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_scores(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    TaskReview = apps.get_model("learning_task", "TaskReview")
+    TaskBonus = apps.get_model("learning_task", "TaskBonus")
+    StudentScore = apps.get_model("learning_task", "StudentScore")
+
+    review_totals = dict(
+        TaskReview.objects.filter(is_admin=True)
+        .values("task__user_id")
+        .annotate(total=Sum("rating"))
+        .values_list("task__user_id", "total")
+        .order_by()
+    )
+    bonus_totals = dict(
+        TaskBonus.objects.values("task__user_id")
+        .annotate(total=Sum("score"))
+        .values_list("task__user_id", "total")
+        .order_by()
+    )
+
+    scores = []
+    for user_id in User.objects.filter(role="user").values_list("id", flat=True):
+        review_total = review_totals.get(user_id) or 0
+        bonus_total = bonus_totals.get(user_id) or 0
+        scores.append(
+            StudentScore(
+                user_id=user_id,
+                review_total=review_total,
+                bonus_total=bonus_total,
+                score=review_total + bonus_total,
+            )
+        )
+    StudentScore.objects.bulk_create(scores, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_task', '0013_taskbonus_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('review_total', models.PositiveIntegerField(default=0)),
+                ('bonus_total', models.PositiveIntegerField(default=0)),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='score_record', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score'], name='student_score_rank_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_likes_count(apps, schema_editor):
+    LearningTask = apps.get_model("learning_task", "LearningTask")
+    Like = LearningTask.likes.through
+    counts = (
+        Like.objects.filter(learningtask_id=OuterRef("pk"))
+        .order_by()
+        .values("learningtask_id")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    LearningTask.objects.update(likes_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_task', '0014_studentscore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='learningtask',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_admin_rating(apps, schema_editor):
+    LearningTask = apps.get_model("learning_task", "LearningTask")
+    TaskReview = apps.get_model("learning_task", "TaskReview")
+    ratings = (
+        TaskReview.objects.filter(task_id=OuterRef("pk"), is_admin=True)
+        .order_by()
+        .values("task_id")
+        .annotate(average=Avg("rating"))
+        .values("average")
+    )
+    LearningTask.objects.update(
+        admin_rating=Coalesce(Subquery(ratings, output_field=models.FloatField()), 0.0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_task', '0015_learningtask_likes_count'),
+        ('management', '0005_rename_allow_proifle_pic_change_setting_allow_profile_pic_change'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='learningtask',
+            name='admin_rating',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='learningtask',
+            index=models.Index(fields=['-admin_rating', '-likes_count', '-id'], name='learning_task_top_idx'),
+        ),
+        migrations.RunPython(backfill_admin_rating, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+from django.db import migrations
+
+TAGS_SQL = """
+    COALESCE((
+        SELECT {agg}
+        FROM management_language l
+        JOIN learning_task_learningtask_languages tl ON tl.language_id = l.id
+        WHERE tl.learningtask_id = t.id
+    ), '') || ' ' || COALESCE((
+        SELECT {agg_f}
+        FROM management_framework f
+        JOIN learning_task_learningtask_frameworks tf ON tf.framework_id = f.id
+        WHERE tf.learningtask_id = t.id
+    ), '')
+"""
+
+SQLITE_FORWARDS = [
+    """
+    CREATE VIRTUAL TABLE learning_task_search USING fts5(
+        title, description, author, tags, tokenize = 'unicode61'
+    )
+    """,
+    """
+    INSERT INTO learning_task_search (rowid, title, description, author, tags)
+    SELECT t.id, t.title, t.description, u.full_name, {tags}
+    FROM learning_task_learningtask t JOIN users_user u ON u.id = t.user_id
+    """.format(
+        tags=TAGS_SQL.format(
+            agg="group_concat(l.name, ' ')", agg_f="group_concat(f.name, ' ')"
+        )
+    ),
+]
+
+POSTGRES_FORWARDS = [
+    """
+    CREATE TABLE learning_task_search (
+        task_id bigint PRIMARY KEY
+            REFERENCES learning_task_learningtask (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX learning_task_search_document_idx "
+    "ON learning_task_search USING GIN (document)",
+    """
+    INSERT INTO learning_task_search (task_id, document)
+    SELECT
+        t.id,
+        setweight(to_tsvector('simple', t.title), 'A')
+        || setweight(to_tsvector('simple', t.description), 'C')
+        || setweight(to_tsvector('simple', u.full_name || ' ' || {tags}), 'B')
+    FROM learning_task_learningtask t JOIN users_user u ON u.id = t.user_id
+    """.format(
+        tags=TAGS_SQL.format(
+            agg="string_agg(l.name, ' ')", agg_f="string_agg(f.name, ' ')"
+        )
+    ),
+]
+
+
+def create_search_table(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {"sqlite": SQLITE_FORWARDS, "postgresql": POSTGRES_FORWARDS}
+    # Other databases fall back to substring search and need no table
+    for statement in statements.get(vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute("DROP TABLE IF EXISTS learning_task_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning_task", "0016_learningtask_admin_rating"),
+        ("management", "0005_rename_allow_proifle_pic_change_setting_allow_profile_pic_change"),
+        ("users", "0013_alter_profile_account"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
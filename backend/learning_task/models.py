@@ -1,4 +1,8 @@
-from django.db import models
+from contextlib import contextmanager
+
+from django.db import models, transaction
+from django.db.models import Avg, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth import get_user_model
 from management.models import Language, Framework
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -25,9 +29,92 @@ class LearningTask(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICE, default="draft")
     likes = models.ManyToManyField(User, related_name="liked_tasks", blank=True)
+    # Denormalised count of `likes`, kept in step by toggle_like()
+    likes_count = models.PositiveIntegerField(default=0)
+    # Denormalised average of the admin review ratings (0 while unrated),
+    # kept in step by the review signals
+    admin_rating = models.FloatField(default=0)
+
+    # Ranking order of the "top learning tasks", served by learning_task_top_idx
+    TOP_ORDERING = ["-admin_rating", "-likes_count", "-id"]
+    # Only ever written with UPDATE expressions. A plain save() of a loaded
+    # task leaves them alone, so it can't put back a value read before a
+    # concurrent like or review.
+    DENORMALISED_FIELDS = {"likes_count", "admin_rating"}
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-admin_rating", "-likes_count", "-id"],
+                name="learning_task_top_idx",
+            ),
+        ]
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None and not self._state.adding:
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DENORMALISED_FIELDS
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
 
     def total_likes(self):
-        return self.likes.count()
+        return self.likes_count
+
+    @classmethod
+    def refresh_admin_ratings(cls, task_ids=None):
+        """
+        Recompute `admin_rating` for the given tasks, or for every task.
+        """
+        ratings = (
+            TaskReview.objects.filter(task_id=OuterRef("pk"), is_admin=True)
+            .order_by()
+            .values("task_id")
+            .annotate(average=Avg("rating"))
+            .values("average")
+        )
+        tasks = cls.objects.all()
+        if task_ids is not None:
+            tasks = tasks.filter(id__in=task_ids)
+        return tasks.update(
+            admin_rating=Coalesce(
+                Subquery(ratings, output_field=models.FloatField()), 0.0
+            )
+        )
+
+    def toggle_like(self, user):
+        """
+        Likes or unlikes the task for `user` and returns (liked, likes_count).
+        Works on the through table's unique (task, user) index and adjusts
+        the counter with an F() expression, so the cost doesn't grow with
+        the number of likes and concurrent toggles don't lose updates.
+        """
+        Like = LearningTask.likes.through
+        tasks = LearningTask.objects.filter(id=self.id)
+
+        with transaction.atomic():
+            removed, _ = Like.objects.filter(
+                learningtask_id=self.id, user_id=user.id
+            ).delete()
+            if removed:
+                tasks.update(likes_count=Greatest(F("likes_count") - 1, 0))
+                liked = False
+            else:
+                _, created = Like.objects.get_or_create(
+                    learningtask_id=self.id, user_id=user.id
+                )
+                if created:
+                    tasks.update(likes_count=F("likes_count") + 1)
+                liked = True
+
+            self.likes_count = tasks.values_list("likes_count", flat=True).get()
+
+        from .cache import invalidate_top_tasks
+
+        transaction.on_commit(invalidate_top_tasks)
+        return liked, self.likes_count
 
     def __str__(self):
         return f"{self.title} - {self.user.full_name}"
@@ -64,18 +151,44 @@ class LearningTaskLimit(models.Model):
     )
     limit = models.PositiveIntegerField(default=0)
 
-    def created(self):
-        if self.limit > 0:
-            self.limit -= 1
-            self.save(update_fields=["limit"])
-
-    def deleted(self):
-        self.limit += 1
-        self.save(update_fields=["limit"])
+    class QuotaExhausted(Exception):
+        pass
 
     def is_valid(self):
         return self.limit > 0
 
+    @classmethod
+    def reserve(cls, user):
+        """
+        Takes one task slot from `user` with a single conditional UPDATE, so
+        concurrent requests can never take more slots than are left. Returns
+        whether a slot was taken.
+        """
+        return bool(
+            cls.objects.filter(user=user, limit__gt=0).update(limit=F("limit") - 1)
+        )
+
+    @classmethod
+    def release(cls, user):
+        """
+        Gives one task slot back to `user`; returns False if the user has no
+        limit row.
+        """
+        return bool(cls.objects.filter(user=user).update(limit=F("limit") + 1))
+
+    @classmethod
+    @contextmanager
+    def reservation(cls, user):
+        """
+        Reserves a slot for the duration of the block, inside a transaction:
+        the slot is kept if the block completes and handed back if it raises.
+        Raises QuotaExhausted when no slot is left.
+        """
+        with transaction.atomic():
+            if not cls.reserve(user):
+                raise cls.QuotaExhausted()
+            yield
+
 
 class TaskBonus(models.Model):
     task = models.OneToOneField(
@@ -98,3 +211,77 @@ class TaskBonus(models.Model):
 
     def __str__(self):
         return f"{self.task.title} +{self.score}"
+
+
+class StudentScore(models.Model):
+    """
+    Materialised score per student: the sum of admin review ratings plus task
+    bonuses. Kept current by the review/bonus signals so leaderboards and
+    reports read one row per user instead of aggregating every task.
+    """
+
+    REFRESH_BATCH_SIZE = 500
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="score_record"
+    )
+    review_total = models.PositiveIntegerField(default=0)
+    bonus_total = models.PositiveIntegerField(default=0)
+    score = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["-score"], name="student_score_rank_idx")]
+
+    def __str__(self):
+        return f"{self.user} - {self.score}"
+
+    @classmethod
+    def for_user(cls, user):
+        score = cls.objects.filter(user=user).first()
+        if score is None:
+            cls.refresh_for_users([user.id])
+            score = cls.objects.filter(user=user).first()
+        return score
+
+    @classmethod
+    def refresh_for_users(cls, user_ids):
+        """
+        Recompute and upsert the scores of the given users. Users that no
+        longer exist (e.g. deleted in the same transaction) are skipped.
+        """
+        user_ids = list(
+            User.objects.filter(id__in=set(user_ids)).values_list("id", flat=True)
+        )
+        for start in range(0, len(user_ids), cls.REFRESH_BATCH_SIZE):
+            cls._refresh_batch(user_ids[start : start + cls.REFRESH_BATCH_SIZE])
+
+    @classmethod
+    def rebuild(cls):
+        cls.refresh_for_users(
+            User.objects.filter(role="user").values_list("id", flat=True)
+        )
+
+    @classmethod
+    def _refresh_batch(cls, user_ids):
+        from .ranking import annotate_scores
+
+        rows = annotate_scores(User.objects.filter(id__in=user_ids)).values_list(
+            "id", "review_total", "bonus_total", "score"
+        )
+        scores = [
+            cls(
+                user_id=user_id,
+                review_total=review_total,
+                bonus_total=bonus_total,
+                score=score,
+            )
+            for user_id, review_total, bonus_total, score in rows
+        ]
+
+        cls.objects.bulk_create(
+            scores,
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=["review_total", "bonus_total", "score", "updated_at"],
+        )
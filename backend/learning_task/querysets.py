@@ -0,0 +1,28 @@
+from django.db.models import Count, Prefetch
+
+from management.models import Framework
+from .models import TaskReview
+
+
+def detail_shape(queryset):
+    """
+    Loads everything LearningTaskSerializer reads, so serialising any number
+    of tasks costs a fixed number of queries.
+    """
+    return queryset.select_related("user__profile").prefetch_related(
+        Prefetch("reviews", queryset=TaskReview.objects.select_related("user")),
+        "languages",
+        Prefetch("frameworks", queryset=Framework.objects.select_related("language")),
+    )
+
+
+def summary_shape(queryset):
+    """
+    Loads what LearningTaskSummarySerializer reads: the author card, the
+    languages and the review count.
+    """
+    return (
+        queryset.select_related("user__profile")
+        .prefetch_related("languages")
+        .annotate(review_count=Count("reviews"))
+    )
@@ -0,0 +1,43 @@
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Window
+from django.db.models.functions import Coalesce, DenseRank
+
+from .models import TaskReview, TaskBonus
+
+
+def _total_subquery(queryset, value_field, user_ref):
+    # One correlated, pre-aggregated subquery per source: the outer query
+    # stays one row per user however many tasks, reviews or bonuses exist.
+    total = (
+        queryset.filter(task__user_id=OuterRef(user_ref))
+        .order_by()
+        .values("task__user_id")
+        .annotate(total=Sum(value_field))
+        .values("total")[:1]
+    )
+    return Coalesce(Subquery(total, output_field=IntegerField()), 0)
+
+
+def annotate_scores(queryset, user_ref="pk"):
+    """
+    Annotates `review_total` (admin review ratings), `bonus_total` (task
+    bonuses) and `score` on a queryset; `user_ref` names the user id column
+    of the outer model ("pk" for users, "user_id" for profiles).
+    """
+    return queryset.annotate(
+        review_total=_total_subquery(
+            TaskReview.objects.filter(is_admin=True), "rating", user_ref
+        ),
+        bonus_total=_total_subquery(TaskBonus.objects.all(), "score", user_ref),
+    ).annotate(score=F("review_total") + F("bonus_total"))
+
+
+def rank_profiles(profiles):
+    """
+    Annotates a Profile queryset with each student's materialised `score`
+    and its dense `rank` within the queryset, best first.
+    """
+    return (
+        profiles.annotate(score=Coalesce("user__score_record__score", 0))
+        .annotate(rank=Window(DenseRank(), order_by=F("score").desc()))
+        .order_by("-score", "user__full_name")
+    )
@@ -0,0 +1,187 @@
+"""
+Full-text search over learning tasks.
+
+Each task has one search document (title, description, author name and its
+language/framework names) in `learning_task_search`: an FTS5 table on SQLite
+and a weighted tsvector column with a GIN index on PostgreSQL, both created by
+migration 0017. Documents are rewritten by the signals in signals.py whenever
+any of those values change; `rebuild_task_search` rebuilds them all.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import LearningTask
+
+SEARCH_TABLE = "learning_task_search"
+INDEX_BATCH_SIZE = 500
+
+# Title matches count most, then author/language/framework names, then the
+# description.
+SQLITE_WEIGHTS = (10.0, 1.0, 5.0, 5.0)  # title, description, author, tags
+
+SQLITE_UPSERT = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, title, description, author, tags) "
+    "VALUES (%s, %s, %s, %s, %s)"
+)
+POSTGRES_UPSERT = f"""
+    INSERT INTO {SEARCH_TABLE} (task_id, document)
+    VALUES (
+        %s,
+        setweight(to_tsvector('simple', %s), 'A')
+        || setweight(to_tsvector('simple', %s), 'C')
+        || setweight(to_tsvector('simple', %s || ' ' || %s), 'B')
+    )
+    ON CONFLICT (task_id) DO UPDATE SET document = EXCLUDED.document
+"""
+
+# Only the rows a user may see in the feed: everyone's non-draft tasks plus
+# their own drafts.
+VISIBLE = "(t.user_id = %s OR t.status <> 'draft')"
+
+
+def is_supported():
+    return connection.vendor in ("sqlite", "postgresql")
+
+
+def _terms(query):
+    return re.findall(r"\w+", query.lower())
+
+
+def _documents(task_ids):
+    tasks = (
+        LearningTask.objects.filter(id__in=task_ids)
+        .select_related("user")
+        .prefetch_related("languages", "frameworks")
+    )
+    for task in tasks:
+        tags = [language.name for language in task.languages.all()]
+        tags += [framework.name for framework in task.frameworks.all()]
+        yield (
+            task.id,
+            task.title,
+            task.description,
+            task.user.full_name,
+            " ".join(tags),
+        )
+
+
+def _delete(cursor, task_ids):
+    if not task_ids:
+        return
+    column = "rowid" if connection.vendor == "sqlite" else "task_id"
+    placeholders = ", ".join(["%s"] * len(task_ids))
+    cursor.execute(
+        f"DELETE FROM {SEARCH_TABLE} WHERE {column} IN ({placeholders})", task_ids
+    )
+
+
+def index_tasks(task_ids):
+    """
+    (Re)writes the search documents of the given tasks; ids of tasks that no
+    longer exist are dropped from the index.
+    """
+    if not is_supported():
+        return
+    task_ids = list(set(task_ids))
+    for start in range(0, len(task_ids), INDEX_BATCH_SIZE):
+        batch = task_ids[start : start + INDEX_BATCH_SIZE]
+        documents = list(_documents(batch))
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                # FTS5 tables have no upsert; replace the rows instead
+                _delete(cursor, batch)
+                cursor.executemany(SQLITE_UPSERT, documents)
+            else:
+                indexed = {document[0] for document in documents}
+                gone = [task_id for task_id in batch if task_id not in indexed]
+                if gone:
+                    _delete(cursor, gone)
+                cursor.executemany(POSTGRES_UPSERT, documents)
+
+
+def remove_tasks(task_ids):
+    if not is_supported() or not task_ids:
+        return
+    with connection.cursor() as cursor:
+        _delete(cursor, list(task_ids))
+
+
+def rebuild():
+    if not is_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+    task_ids = list(LearningTask.objects.values_list("id", flat=True))
+    index_tasks(task_ids)
+    return len(task_ids)
+
+
+def _search_sqlite(terms, user, limit, offset):
+    match = " ".join(f'"{term}"*' for term in terms)
+    weights = ", ".join(str(weight) for weight in SQLITE_WEIGHTS)
+    source = (
+        f"FROM {SEARCH_TABLE} s JOIN learning_task_learningtask t ON t.id = s.rowid "
+        f"WHERE {SEARCH_TABLE} MATCH %s AND {VISIBLE}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) {source}", [match, user.id])
+        total = cursor.fetchone()[0]
+        # bm25() is lower for better matches
+        cursor.execute(
+            f"SELECT s.rowid, -bm25({SEARCH_TABLE}, {weights}) AS relevance "
+            f"{source} ORDER BY relevance DESC, s.rowid DESC LIMIT %s OFFSET %s",
+            [match, user.id, limit, offset],
+        )
+        return cursor.fetchall(), total
+
+
+def _search_postgres(terms, user, limit, offset):
+    query = " & ".join(f"{term}:*" for term in terms)
+    source = (
+        f"FROM {SEARCH_TABLE} s JOIN learning_task_learningtask t ON t.id = s.task_id "
+        f"WHERE s.document @@ to_tsquery('simple', %s) AND {VISIBLE}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) {source}", [query, user.id])
+        total = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT s.task_id, ts_rank_cd(s.document, to_tsquery('simple', %s)) "
+            f"AS relevance {source} ORDER BY relevance DESC, s.task_id DESC "
+            "LIMIT %s OFFSET %s",
+            [query, query, user.id, limit, offset],
+        )
+        return cursor.fetchall(), total
+
+
+def _search_fallback(terms, user, limit, offset):
+    # Databases without a full-text index: plain substring matching
+    tasks = LearningTask.objects.filter(Q(user=user) | ~Q(status="draft"))
+    for term in terms:
+        tasks = tasks.filter(
+            Q(title__icontains=term)
+            | Q(description__icontains=term)
+            | Q(user__full_name__icontains=term)
+            | Q(languages__name__icontains=term)
+            | Q(frameworks__name__icontains=term)
+        )
+    tasks = tasks.distinct().order_by("-created_at", "-id")
+    ids = tasks.values_list("id", flat=True)[offset : offset + limit]
+    return [(task_id, None) for task_id in ids], tasks.count()
+
+
+def search_tasks(query, user, limit=20, offset=0):
+    """
+    Tasks visible to `user` that match every word of `query` (as a prefix),
+    best match first. Returns ([(task_id, relevance), ...], total_matches).
+    """
+    terms = _terms(query)
+    if not terms:
+        return [], 0
+    if connection.vendor == "sqlite":
+        return _search_sqlite(terms, user, limit, offset)
+    if connection.vendor == "postgresql":
+        return _search_postgres(terms, user, limit, offset)
+    return _search_fallback(terms, user, limit, offset)
@@ -1,10 +1,20 @@
 from rest_framework import serializers
-from .models import LearningTask, TaskReview, LearningTaskLimit, TaskBonus
+from .models import (
+    LearningTask,
+    TaskReview,
+    LearningTaskLimit,
+    TaskBonus,
+    StudentScore,
+)
 from management.models import Language, Framework
 from django.contrib.auth import get_user_model
-from users.serializers import UserSerializer, ProfileSerializer, UserInverseSerializer
+from users.serializers import (
+    UserSerializer,
+    ProfileSerializer,
+    UserInverseSerializer,
+    UserSummarySerializer,
+)
 from management.serializers import LanguageSerializer, FrameworkSerializer
-from django.db.models import Sum
 
 
 User = get_user_model()
@@ -28,7 +38,6 @@ class TaskReviewSerializer(serializers.ModelSerializer):
 class LearningTaskSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     profile = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
     reviews = TaskReviewSerializer(many=True, read_only=True)
 
     languages = LanguageSerializer(many=True, read_only=True)
@@ -64,6 +73,7 @@ class LearningTaskSerializer(serializers.ModelSerializer):
             "reviews",
             "status",
         ]
+        read_only_fields = ["likes_count"]
 
     def get_profile(self, obj):
         try:
@@ -71,9 +81,6 @@ class LearningTaskSerializer(serializers.ModelSerializer):
         except Exception:
             return None
 
-    def get_likes_count(self, obj):
-        return obj.likes.count()
-
     def create(self, validated_data):
         validated_data.pop("status", None)
 
@@ -128,7 +135,7 @@ class LearningTaskSerializer(serializers.ModelSerializer):
         else:
             instance.status = "under_review"
 
-        instance.save()
+        instance.save(update_fields=[*validated_data, "status", "updated_at"])
 
         if languages is not None:
             instance.languages.set(languages)
@@ -139,7 +146,6 @@ class LearningTaskSerializer(serializers.ModelSerializer):
 
 
 class LearningTaskNonExtraSerializer(serializers.ModelSerializer):
-    likes_count = serializers.SerializerMethodField()
     reviews = TaskReviewSerializer(many=True, read_only=True)
 
     languages = LanguageSerializer(many=True, read_only=True)
@@ -162,9 +168,7 @@ class LearningTaskNonExtraSerializer(serializers.ModelSerializer):
             "reviews",
             "status",
         ]
-
-    def get_likes_count(self, obj):
-        return obj.likes.count()
+        read_only_fields = ["likes_count"]
 
 
 class LearningTaskLimitSerializer(serializers.ModelSerializer):
@@ -224,9 +228,42 @@ class LearningTaskLimitSerializer(serializers.ModelSerializer):
         return instance
 
 
+class LearningTaskSummarySerializer(serializers.ModelSerializer):
+    """
+    Compact read-only task card for rankings and nested payloads; pair it
+    with querysets.summary_shape().
+    """
+
+    author = UserSummarySerializer(source="user", read_only=True)
+    languages = LanguageSerializer(many=True, read_only=True)
+    review_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LearningTask
+        fields = [
+            "id",
+            "title",
+            "status",
+            "is_public",
+            "created_at",
+            "author",
+            "likes_count",
+            "admin_rating",
+            "review_count",
+            "languages",
+        ]
+        read_only_fields = fields
+
+    def get_review_count(self, obj):
+        review_count = getattr(obj, "review_count", None)
+        if review_count is not None:
+            return review_count
+        return obj.reviews.count()
+
+
 class TaskBonusSerializer(serializers.ModelSerializer):
     admin = UserInverseSerializer(read_only=True)
-    task = LearningTaskSerializer(read_only=True)
+    task = LearningTaskSummarySerializer(read_only=True)
 
     class Meta:
         model = TaskBonus
@@ -254,18 +291,5 @@ class UserGradeSerializer(serializers.ModelSerializer):
         fields = ["id", "full_name", "grade"]
 
     def get_grade(self, obj):
-        # Sum all admin task reviews
-        admin_reviews_sum = (
-            TaskReview.objects.filter(task__user=obj, is_admin=True).aggregate(
-                total=Sum("rating")
-            )["total"]
-            or 0
-        )
-        # Sum all bonuses
-        bonus_sum = (
-            TaskBonus.objects.filter(task__user=obj).aggregate(total=Sum("score"))[
-                "total"
-            ]
-            or 0
-        )
-        return admin_reviews_sum + bonus_sum
+        # Sum of admin task reviews + bonuses, kept materialised per student
+        return StudentScore.for_user(obj).score
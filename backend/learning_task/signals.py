@@ -0,0 +1,115 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from management.models import Language, Framework
+from . import search
+from .cache import invalidate_top_tasks
+from .models import LearningTask, TaskReview, TaskBonus, StudentScore
+
+User = get_user_model()
+
+
+def _schedule_refresh(user_id):
+    if user_id:
+        # After commit, so a user deleted in the same transaction is skipped
+        transaction.on_commit(partial(StudentScore.refresh_for_users, [user_id]))
+
+
+@receiver(post_save, sender=TaskReview)
+@receiver(post_save, sender=TaskBonus)
+def score_source_saved(sender, instance, **kwargs):
+    _schedule_refresh(instance.task.user_id)
+
+
+@receiver(post_delete, sender=TaskReview)
+@receiver(post_delete, sender=TaskBonus)
+def score_source_deleted(sender, instance, **kwargs):
+    # If the task row is already gone, its own post_delete covers the refresh
+    user_id = (
+        LearningTask.objects.filter(id=instance.task_id)
+        .values_list("user_id", flat=True)
+        .first()
+    )
+    _schedule_refresh(user_id)
+
+
+@receiver(post_delete, sender=LearningTask)
+def task_deleted(sender, instance, **kwargs):
+    _schedule_refresh(instance.user_id)
+    transaction.on_commit(invalidate_top_tasks)
+
+
+@receiver(post_save, sender=TaskReview)
+@receiver(post_delete, sender=TaskReview)
+def review_changed(sender, instance, **kwargs):
+    if instance.is_admin:
+        LearningTask.refresh_admin_ratings([instance.task_id])
+        transaction.on_commit(invalidate_top_tasks)
+
+
+@receiver(post_save, sender=LearningTask)
+def task_saved(sender, instance, created, **kwargs):
+    # Edits don't move a task in the ranking; only new and removed tasks can
+    if created:
+        transaction.on_commit(invalidate_top_tasks)
+
+
+def _schedule_index(task_ids):
+    task_ids = list(task_ids)
+    if task_ids:
+        transaction.on_commit(partial(search.index_tasks, task_ids))
+
+
+@receiver(post_save, sender=LearningTask)
+def task_search_saved(sender, instance, **kwargs):
+    _schedule_index([instance.id])
+
+
+@receiver(post_delete, sender=LearningTask)
+def task_search_deleted(sender, instance, **kwargs):
+    # Like indexing, only once the delete has committed
+    transaction.on_commit(partial(search.remove_tasks, [instance.id]))
+
+
+@receiver(m2m_changed, sender=LearningTask.languages.through)
+@receiver(m2m_changed, sender=LearningTask.frameworks.through)
+def task_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        _schedule_index([instance.id])
+    elif pk_set:
+        _schedule_index(pk_set)
+
+
+@receiver(post_init, sender=User)
+def author_search_loaded(sender, instance, **kwargs):
+    # The name as loaded (None when deferred), to tell renames from other saves
+    instance._indexed_full_name = instance.__dict__.get("full_name")
+
+
+@receiver(post_save, sender=User)
+def author_search_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Only the author's name is indexed; logins and new users change nothing
+    if created or (update_fields and "full_name" not in update_fields):
+        return
+    if instance.full_name == instance._indexed_full_name:
+        return
+    instance._indexed_full_name = instance.full_name
+    _schedule_index(instance.learningtask_set.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Language)
+def language_search_saved(sender, instance, created, **kwargs):
+    if not created:
+        _schedule_index(instance.learningtask_set.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Framework)
+def framework_search_saved(sender, instance, created, **kwargs):
+    if not created:
+        _schedule_index(instance.learningtask_set.values_list("id", flat=True))
@@ -1,3 +1,678 @@
-from django.test import TestCase
+import io
+import random
+import threading
+import unittest
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from management.models import Language, Framework
+from users.models import Profile
+from .cache import TOP_TASKS_CACHED, get_top_task_ids
+from .models import (
+    LearningTask,
+    LearningTaskLimit,
+    TaskReview,
+    TaskBonus,
+    StudentScore,
+)
+from .ranking import annotate_scores, rank_profiles
+from .search import SEARCH_TABLE, search_tasks
+
+User = get_user_model()
+
+
+class RankingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(8)
+        cls.admins = [
+            User.objects.create_user(
+                f"admin{i}@example.com", f"Admin {i}", "pw", role="admin", is_staff=True
+            )
+            for i in range(3)
+        ]
+        cls.students = []
+        for i in range(15):
+            student = User.objects.create_user(
+                f"student{i}@example.com", f"Student {i:02d}", "pw"
+            )
+            Profile.objects.create(
+                user=student,
+                grade=9 + i % 3,
+                section="AB"[i % 2],
+                field="backend",
+                phone_number="0900000000",
+            )
+            cls.students.append(student)
+
+        # Several admin reviews and a bonus on the same task is exactly the
+        # shape that inflates sums when both relations are joined at once.
+        for student in cls.students[:-2]:
+            for n in range(rng.randint(1, 4)):
+                task = LearningTask.objects.create(
+                    user=student, title=f"Task {n}", description="-", status="rated"
+                )
+                for admin in rng.sample(cls.admins, rng.randint(0, 3)):
+                    TaskReview.objects.create(
+                        task=task,
+                        user=admin,
+                        rating=rng.randint(0, 5),
+                        feedback="-",
+                        is_admin=True,
+                    )
+                peer = cls.students[-1]
+                TaskReview.objects.create(
+                    task=task, user=peer, rating=5, feedback="-", is_admin=False
+                )
+                if rng.random() < 0.6:
+                    TaskBonus.objects.create(
+                        task=task, admin=cls.admins[0], score=rng.randint(0, 30)
+                    )
+
+    def reference_scores(self):
+        scores = {student.id: 0 for student in self.students}
+        for review in TaskReview.objects.select_related("task"):
+            if review.is_admin:
+                scores[review.task.user_id] += review.rating
+        for bonus in TaskBonus.objects.select_related("task"):
+            scores[bonus.task.user_id] += bonus.score
+        return scores
+
+    def test_annotate_scores_matches_reference(self):
+        expected = self.reference_scores()
+
+        with self.assertNumQueries(1):
+            rows = list(
+                annotate_scores(User.objects.filter(role="user")).values_list(
+                    "id", "score"
+                )
+            )
+
+        self.assertEqual(dict(rows), expected)
+
+    def test_refresh_materialises_reference_scores(self):
+        StudentScore.rebuild()
+
+        stored = dict(StudentScore.objects.values_list("user_id", "score"))
+        self.assertEqual(stored, self.reference_scores())
+
+    def test_rank_profiles_is_dense(self):
+        StudentScore.rebuild()
+        expected = self.reference_scores()
+        distinct_scores = sorted(set(expected.values()), reverse=True)
+
+        rows = list(
+            rank_profiles(Profile.objects.all()).values_list("user_id", "score", "rank")
+        )
+
+        self.assertEqual(len(rows), len(self.students))
+        for user_id, score, rank in rows:
+            self.assertEqual(score, expected[user_id])
+            self.assertEqual(rank, distinct_scores.index(score) + 1)
+
+    def test_scores_follow_review_and_bonus_changes(self):
+        student = self.students[-2]
+        task = LearningTask.objects.create(
+            user=student, title="Late task", description="-", status="rated"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review = TaskReview.objects.create(
+                task=task, user=self.admins[1], rating=4, feedback="-", is_admin=True
+            )
+            TaskBonus.objects.create(task=task, admin=self.admins[0], score=7)
+        self.assertEqual(StudentScore.objects.get(user=student).score, 11)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review.delete()
+        self.assertEqual(StudentScore.objects.get(user=student).score, 7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.delete()
+        self.assertEqual(StudentScore.objects.get(user=student).score, 0)
+
+
+class TaskListQueryBudgetTests(TestCase):
+    """
+    List endpoints must cost the same number of queries whatever the number
+    of tasks, reviews, languages and frameworks on the page.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "admin@example.com", "Admin", "pw", role="admin", is_staff=True
+        )
+        cls.student = cls.make_student(0)
+        cls.languages = [
+            Language.objects.create(name=f"Lang {i}", code=f"l{i}", color="#000")
+            for i in range(3)
+        ]
+        cls.frameworks = [
+            Framework.objects.create(language=language, name=f"Fw {i}")
+            for i, language in enumerate(cls.languages)
+        ]
+
+    @classmethod
+    def make_student(cls, n):
+        student = User.objects.create_user(
+            f"student{n}@example.com", f"Student {n}", "pw"
+        )
+        Profile.objects.create(
+            user=student, grade=10, section="A", field="backend", phone_number="09"
+        )
+        return student
+
+    def add_tasks(self, count, owner=None):
+        for n in range(count):
+            author = owner or self.make_student(LearningTask.objects.count() + 1)
+            task = LearningTask.objects.create(
+                user=author, title=f"Task {n}", description="-", status="rated"
+            )
+            task.languages.set(self.languages)
+            task.frameworks.set(self.frameworks)
+            TaskReview.objects.create(
+                task=task, user=self.admin, rating=4, feedback="-", is_admin=True
+            )
+            TaskBonus.objects.create(task=task, admin=self.admin, score=3)
+
+    def get(self, user, path):
+        self.client.cookies["access"] = str(AccessToken.for_user(user))
+        response = self.client.get(path, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertBudget(self, queries, user, path, grow, owner=None):
+        self.add_tasks(2, owner)
+        with self.assertNumQueries(queries):
+            self.get(user, path)
+        self.add_tasks(grow, owner)
+        cache.clear()
+        with self.assertNumQueries(queries):
+            self.get(user, path)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_all_tasks(self):
+        self.assertBudget(5, self.student, "/api/learning-task/all/", grow=8)
+
+    def test_feed(self):
+        self.assertBudget(5, self.student, "/api/learning-task/feed/?cursor=", grow=8)
+
+    def test_my_tasks(self):
+        LearningTaskLimit.objects.create(user=self.student, limit=20)
+        self.assertBudget(
+            7, self.student, "/api/learning-task/my-task/", grow=8, owner=self.student
+        )
+
+    def test_student_tasks(self):
+        self.assertBudget(
+            7,
+            self.admin,
+            f"/api/learning-task/student/{self.student.id}/",
+            grow=8,
+            owner=self.student,
+        )
+
+    def test_top_tasks_use_summary_payload(self):
+        self.assertBudget(4, self.admin, "/api/management/top-learning-tasks/5/", grow=8)
+
+        task = self.get(self.admin, "/api/management/top-learning-tasks/5/").json()[
+            "top_learning_tasks"
+        ][0]
+        self.assertEqual(
+            set(task),
+            {
+                "id",
+                "title",
+                "status",
+                "is_public",
+                "created_at",
+                "author",
+                "likes_count",
+                "admin_rating",
+                "review_count",
+                "languages",
+            },
+        )
+        self.assertEqual(task["admin_rating"], 4)
+        self.assertEqual(task["review_count"], 1)
+        self.assertEqual(task["author"]["grade"], 10)
+
+
+class LikeCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner@example.com", "Owner", "pw")
+        cls.fans = [
+            User.objects.create_user(f"fan{i}@example.com", f"Fan {i}", "pw")
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.task = LearningTask.objects.create(
+            user=self.owner, title="Liked", description="-", status="rated"
+        )
+
+    def stored_count(self):
+        return LearningTask.objects.values_list("likes_count", flat=True).get(
+            id=self.task.id
+        )
+
+    def test_toggle_like_counts_up_and_down(self):
+        for count, fan in enumerate(self.fans, start=1):
+            self.assertEqual(self.task.toggle_like(fan), (True, count))
+
+        self.assertEqual(self.task.toggle_like(self.fans[0]), (False, 2))
+        self.assertEqual(self.stored_count(), 2)
+        self.assertEqual(self.task.likes.count(), 2)
+
+    def test_like_endpoint_reports_the_count(self):
+        self.client.cookies["access"] = str(AccessToken.for_user(self.fans[0]))
+        path = f"/api/learning-task/like/{self.task.id}/"
+
+        liked = self.client.post(path, secure=True).json()
+        unliked = self.client.post(path, secure=True).json()
+
+        self.assertEqual((liked["action"], liked["total_likes"]), ("liked", 1))
+        self.assertEqual((unliked["action"], unliked["total_likes"]), ("unliked", 0))
+
+    def test_saving_a_stale_task_keeps_the_count(self):
+        stale = LearningTask.objects.get(id=self.task.id)
+        self.task.toggle_like(self.fans[0])
+
+        stale.status = "redo"
+        stale.save()
+
+        self.assertEqual(self.stored_count(), 1)
+
+    def test_reconcile_fixes_drifted_counts(self):
+        self.task.toggle_like(self.fans[0])
+        self.task.toggle_like(self.fans[1])
+        LearningTask.objects.filter(id=self.task.id).update(likes_count=7)
+
+        out = io.StringIO()
+        call_command("reconcile_like_counts", stdout=out)
+
+        self.assertEqual(self.stored_count(), 2)
+        self.assertIn("Fixed 1 like counters.", out.getvalue())
+
+
+class AdminRatingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins = [
+            User.objects.create_user(
+                f"admin{i}@example.com", f"Admin {i}", "pw", role="admin", is_staff=True
+            )
+            for i in range(2)
+        ]
+        cls.owner = User.objects.create_user("owner@example.com", "Owner", "pw")
+
+    def setUp(self):
+        cache.clear()
+
+    def make_task(self, title, likes_count=0):
+        return LearningTask.objects.create(
+            user=self.owner,
+            title=title,
+            description="-",
+            status="rated",
+            likes_count=likes_count,
+        )
+
+    def review(self, task, admin, rating, is_admin=True):
+        return TaskReview.objects.create(
+            task=task, user=admin, rating=rating, feedback="-", is_admin=is_admin
+        )
+
+    def rating(self, task):
+        return LearningTask.objects.values_list("admin_rating", flat=True).get(
+            id=task.id
+        )
+
+    def test_refresh_averages_admin_reviews_only(self):
+        task = self.make_task("Reviewed")
+        unrated = self.make_task("Unrated")
+        self.review(task, self.admins[0], 3)
+        self.review(task, self.admins[1], 4)
+        self.review(task, self.owner, 0, is_admin=False)
+        LearningTask.objects.update(admin_rating=1)
+
+        self.assertEqual(LearningTask.refresh_admin_ratings([task.id]), 1)
+        self.assertEqual(self.rating(task), 3.5)
+        self.assertEqual(self.rating(unrated), 1)
+
+        LearningTask.refresh_admin_ratings()
+        self.assertEqual(self.rating(unrated), 0)
+
+    def test_refresh_top_tasks_command(self):
+        task = self.make_task("Reviewed")
+        self.review(task, self.admins[0], 5)
+        LearningTask.objects.update(admin_rating=0)
+
+        call_command("refresh_top_tasks", stdout=io.StringIO())
+
+        self.assertEqual(self.rating(task), 5)
+
+    def test_saving_a_stale_task_keeps_the_rating(self):
+        task = self.make_task("Reviewed")
+        stale = LearningTask.objects.get(id=task.id)
+        self.review(task, self.admins[0], 4)
+
+        stale.status = "redo"
+        stale.save()
+
+        self.assertEqual(self.rating(task), 4)
+
+    def test_top_task_ids_are_cached_until_a_review_changes(self):
+        low = self.make_task("Low", likes_count=9)
+        high = self.make_task("High")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review(low, self.admins[0], 2)
+            self.review(high, self.admins[0], 3)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_top_task_ids(2), [high.id, low.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_top_task_ids(1), [high.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review(low, self.admins[1], 5)
+        # (2 + 5) / 2 now beats 3
+        self.assertEqual(get_top_task_ids(2), [low.id, high.id])
+
+    def test_likes_break_rating_ties(self):
+        quiet = self.make_task("Quiet")
+        liked = self.make_task("Liked", likes_count=3)
+
+        self.assertEqual(get_top_task_ids(2), [liked.id, quiet.id])
+
+    def test_boundaries_past_the_cache_read_the_index(self):
+        tasks = [self.make_task(f"Task {n}") for n in range(TOP_TASKS_CACHED + 2)]
+        get_top_task_ids(1)
+
+        with self.assertNumQueries(1):
+            ids = get_top_task_ids(TOP_TASKS_CACHED + 1)
+
+        self.assertEqual(ids, [task.id for task in reversed(tasks)][:-1])
+
+
+@unittest.skipUnless(
+    connection.vendor in ("sqlite", "postgresql"), "Needs the full-text index"
+)
+class TaskSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner@example.com", "Ada Owner", "pw")
+        cls.reader = User.objects.create_user("reader@example.com", "Reader", "pw")
+        cls.language = Language.objects.create(name="Elixir", code="ex", color="#000")
+
+    def make_task(self, title, status="rated"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return LearningTask.objects.create(
+                user=self.owner, title=title, description="Weekly", status=status
+            )
+
+    def found(self, query, user=None):
+        matches, _ = search_tasks(query, user or self.reader)
+        return [task_id for task_id, _ in matches]
+
+    def indexed(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")
+            return cursor.fetchone()[0]
+
+    def test_new_tasks_are_indexed_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            task = LearningTask.objects.create(
+                user=self.owner, title="Quantum widgets", description="-"
+            )
+            self.assertEqual(self.found("quantum", self.owner), [])
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(self.found("quantum", self.owner), [task.id])
+        self.assertEqual(self.found("quan wid", self.owner), [task.id])
+
+    def test_edits_are_reindexed(self):
+        task = self.make_task("Quantum widgets")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.title = "Robot arms"
+            task.save(update_fields=["title", "updated_at"])
+
+        self.assertEqual(self.found("quantum"), [])
+        self.assertEqual(self.found("robot"), [task.id])
+
+    def test_tags_are_indexed(self):
+        task = self.make_task("Chat server")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.languages.add(self.language)
+        self.assertEqual(self.found("elixir"), [task.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.language.name = "Erlang"
+            self.language.save()
+        self.assertEqual(self.found("erlang"), [task.id])
+
+    def test_only_author_renames_are_reindexed(self):
+        task = self.make_task("Chat server")
+        author = User.objects.get(id=self.owner.id)
+
+        with mock.patch("learning_task.search.index_tasks") as index_tasks:
+            with self.captureOnCommitCallbacks(execute=True):
+                author.is_active = False
+                author.save()
+        index_tasks.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            author.full_name = "Ada Lovelace"
+            author.save()
+        self.assertEqual(self.found("lovelace"), [task.id])
+
+    def test_deletes_leave_the_index_on_commit(self):
+        task = self.make_task("Quantum widgets")
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            LearningTask.objects.filter(id=task.id).delete()
+        self.assertEqual(self.indexed(), 1)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.indexed(), 0)
+
+    def test_search_endpoint_ranks_and_hides_other_drafts(self):
+        best = self.make_task("Widget widget factory")
+        other = self.make_task("Tools")
+        with self.captureOnCommitCallbacks(execute=True):
+            other.description = "A widget"
+            other.save(update_fields=["description", "updated_at"])
+        self.make_task("Widget draft", status="draft")
+
+        self.client.cookies["access"] = str(AccessToken.for_user(self.reader))
+        response = self.client.get(
+            "/api/learning-task/search/?q=widget", secure=True
+        ).json()
+
+        ids = [task["id"] for task in response["tasks"]]
+        self.assertEqual(ids, [best.id, other.id])
+        self.assertEqual(response["pagination"]["total_count"], 2)
+        self.assertEqual(len(self.found("widget", self.owner)), 3)
+
+    def test_rebuild_command_restores_the_index(self):
+        task = self.make_task("Quantum widgets")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        self.assertEqual(self.found("quantum"), [])
+
+        out = io.StringIO()
+        call_command("rebuild_task_search", stdout=out)
+
+        self.assertEqual(self.found("quantum"), [task.id])
+        self.assertIn("Indexed 1 learning tasks.", out.getvalue())
+
+
+def task_payload(language, title="Quota task"):
+    return {
+        "title": title,
+        "description": "-",
+        "language_ids": [language.id],
+        "framework_ids": [],
+    }
+
+
+class TaskQuotaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user("quota@example.com", "Quota", "pw")
+        cls.language = Language.objects.create(name="Python", code="py", color="#000")
+
+    def setUp(self):
+        self.client.cookies["access"] = str(AccessToken.for_user(self.student))
+
+    def create_task(self, payload=None):
+        return self.client.post(
+            "/api/learning-task/create/",
+            payload or task_payload(self.language),
+            content_type="application/json",
+            secure=True,
+        )
+
+    def remaining(self):
+        return LearningTaskLimit.objects.get(user=self.student).limit
+
+    def test_creation_stops_at_the_limit(self):
+        LearningTaskLimit.objects.create(user=self.student, limit=2)
+
+        statuses = [self.create_task().status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [201, 201, 400])
+        self.assertEqual(self.remaining(), 0)
+        self.assertEqual(LearningTask.objects.filter(user=self.student).count(), 2)
+
+    def test_invalid_submission_keeps_the_slot(self):
+        LearningTaskLimit.objects.create(user=self.student, limit=1)
+
+        response = self.create_task({"title": "", "language_ids": []})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.remaining(), 1)
+
+    def test_failed_block_hands_the_slot_back(self):
+        LearningTaskLimit.objects.create(user=self.student, limit=1)
+
+        with self.assertRaises(ValueError):
+            with LearningTaskLimit.reservation(self.student):
+                raise ValueError
+
+        self.assertEqual(self.remaining(), 1)
+
+    def test_delete_releases_a_slot(self):
+        LearningTaskLimit.objects.create(user=self.student, limit=1)
+        task_id = self.create_task().json()["id"]
+
+        response = self.client.delete(
+            f"/api/learning-task/delete/{task_id}/", secure=True
+        )
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.remaining(), 1)
+
+    def test_delete_that_removes_nothing_keeps_the_limit(self):
+        LearningTaskLimit.objects.create(user=self.student, limit=1)
+        task = LearningTask.objects.get(id=self.create_task().json()["id"])
+        # Another request deleted the row after this one loaded it
+        LearningTask.objects.filter(id=task.id).delete()
+
+        with mock.patch.object(LearningTask.objects, "get", return_value=task):
+            response = self.client.delete(
+                f"/api/learning-task/delete/{task.id}/", secure=True
+            )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.remaining(), 0)
+
+    def test_delete_after_rating_keeps_the_limit(self):
+        LearningTaskLimit.objects.create(user=self.student, limit=1)
+        task = LearningTask.objects.get(id=self.create_task().json()["id"])
+        # Rated after this request checked the status
+        LearningTask.objects.filter(id=task.id).update(status="rated")
+
+        with mock.patch.object(LearningTask.objects, "get", return_value=task):
+            response = self.client.delete(
+                f"/api/learning-task/delete/{task.id}/", secure=True
+            )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(LearningTask.objects.filter(id=task.id).exists())
+        self.assertEqual(self.remaining(), 0)
+
+    def test_admin_delete_releases_a_slot_once(self):
+        admin = User.objects.create_user(
+            "staff@example.com", "Staff", "pw", role="admin", is_staff=True
+        )
+        LearningTaskLimit.objects.create(user=self.student, limit=1)
+        task = LearningTask.objects.get(id=self.create_task().json()["id"])
+        self.client.cookies["access"] = str(AccessToken.for_user(admin))
+        path = f"/api/management/task/delete/{task.id}/"
+
+        # Both requests load the task before either deletes it
+        with mock.patch.object(LearningTask.objects, "get", return_value=task):
+            statuses = [self.client.delete(path, secure=True).status_code]
+            statuses.append(self.client.delete(path, secure=True).status_code)
+
+        self.assertEqual(statuses, [204, 404])
+        self.assertEqual(self.remaining(), 1)
+
+
+@unittest.skipIf(
+    connection.vendor == "sqlite", "SQLite serialises writers; needs a server DB"
+)
+class ConcurrentTaskQuotaTests(TransactionTestCase):
+    CLIENTS = 16
+    LIMIT = 5
+
+    def test_concurrent_creation_never_exceeds_the_limit(self):
+        student = User.objects.create_user("burst@example.com", "Burst", "pw")
+        language = Language.objects.create(name="Go", code="go", color="#000")
+        LearningTaskLimit.objects.create(user=student, limit=self.LIMIT)
+        token = str(AccessToken.for_user(student))
+        barrier = threading.Barrier(self.CLIENTS)
+        statuses = []
+
+        def submit(n):
+            client = Client()
+            client.cookies["access"] = token
+            barrier.wait()
+            try:
+                response = client.post(
+                    "/api/learning-task/create/",
+                    task_payload(language, f"Burst {n}"),
+                    content_type="application/json",
+                    secure=True,
+                )
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=submit, args=(n,)) for n in range(self.CLIENTS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses.count(201), self.LIMIT)
+        self.assertEqual(statuses.count(400), self.CLIENTS - self.LIMIT)
+        self.assertEqual(LearningTask.objects.filter(user=student).count(), self.LIMIT)
+        self.assertEqual(LearningTaskLimit.objects.get(user=student).limit, 0)
@@ -9,11 +9,16 @@ from .views import (
     TaskBonusAPIView,
     StudentLearningTaskView,
     TaskToRedoView,
+    LeaderboardView,
+    LearningTaskFeedView,
+    LearningTaskSearchView,
 )
 
 urlpatterns = [
     path("", LearningTaskAPIView.as_view(), name="tasks-list"),
     path("all/", LearningTaskAllView.as_view(), name="tasks-list"),
+    path("feed/", LearningTaskFeedView.as_view(), name="tasks-feed"),
+    path("search/", LearningTaskSearchView.as_view(), name="tasks-search"),
     path("create/", LearningTaskAPIView.as_view(), name="task-create"),
     path("<int:task_id>/", LearningTaskAPIView.as_view(), name="task-detail"),
     path("my-task/", MyLearningTaskView.as_view(), name="my-task"),
@@ -47,4 +52,5 @@ urlpatterns = [
         TaskToRedoView.as_view(),
         name="redo-task",
     ),
+    path("leaderboard/", LeaderboardView.as_view(), name="leaderboard"),
 ]
@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from utils.auth import JWTCookieAuthentication
+from utils.pagination import KeysetPaginator, InvalidCursor
 from .models import LearningTask, TaskReview, LearningTaskLimit, TaskBonus
 from .serializers import (
     LearningTaskSerializer,
@@ -10,14 +11,19 @@ from .serializers import (
     LearningTaskLimitSerializer,
     TaskBonusSerializer,
     LearningTaskNonExtraSerializer,
+    LearningTaskSummarySerializer,
 )
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_protect
 from django.db import transaction
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db.models import Q, Count
 from asgiref.sync import async_to_sync
 from utils.notif import notify_user
+from users.models import Profile
+from .ranking import rank_profiles
+from .querysets import detail_shape, summary_shape
+from .search import search_tasks
 
 
 User = get_user_model()
@@ -31,13 +37,13 @@ class MyLearningTaskView(APIView):
         user = request.user
         tasks = LearningTask.objects.filter(user=user)
         task_limit, created = LearningTaskLimit.objects.get_or_create(user=user)
-        task_rated = LearningTask.objects.filter(user=user, status="rated").count()
-        task_under_review = LearningTask.objects.filter(
-            user=user, status="under_review"
-        ).count()
-        task_draft = LearningTask.objects.filter(user=user, status="draft").count()
-        task_count = tasks.count()
-        if not tasks:
+        counts = tasks.aggregate(
+            task_count=Count("id"),
+            task_rated=Count("id", filter=Q(status="rated")),
+            task_under_review=Count("id", filter=Q(status="under_review")),
+            task_draft=Count("id", filter=Q(status="draft")),
+        )
+        if not counts["task_count"]:
             return Response(
                 {
                     "message": "You have no learning tasks yet.",
@@ -45,26 +51,35 @@ class MyLearningTaskView(APIView):
                 },
                 status=status.HTTP_200_OK,
             )
+        tasks = detail_shape(tasks)
         serializer = LearningTaskSerializer(tasks, many=True)
         return Response(
             {
-                "task_count": task_count,
-                "task_rated": task_rated,
-                "task_draft": task_draft,
+                "task_count": counts["task_count"],
+                "task_rated": counts["task_rated"],
+                "task_draft": counts["task_draft"],
                 "task_limit": task_limit.limit,
-                "task_under_review": task_under_review,
+                "task_under_review": counts["task_under_review"],
                 "tasks": serializer.data,
             },
             status=status.HTTP_200_OK,
         )
 
 
+def feed_queryset(user):
+    """
+    Tasks visible in the feed (everyone's non-draft tasks plus the user's own
+    drafts), loaded so serialising a page costs a fixed number of queries.
+    """
+    return detail_shape(LearningTask.objects.filter(Q(user=user) | ~Q(status="draft")))
+
+
 class LearningTaskAllView(APIView):
     authentication_classes = [JWTCookieAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        tasks = LearningTask.objects.filter(Q(user=request.user) | ~Q(status="draft"))
+        tasks = feed_queryset(request.user)
 
         if not tasks:
             return Response({"message": "No learning yet."}, status=status.HTTP_200_OK)
@@ -73,6 +88,75 @@ class LearningTaskAllView(APIView):
         return Response({"tasks": serializer.data}, status=status.HTTP_200_OK)
 
 
+class LearningTaskFeedView(APIView):
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        paginator = KeysetPaginator.from_request(
+            request,
+            feed_queryset(request.user),
+            sort_field="created_at",
+            descending=True,
+            default_page_size=20,
+        )
+        try:
+            page = paginator.paginate()
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = LearningTaskSerializer(page, many=True)
+        return Response(
+            {"tasks": serializer.data, "pagination": paginator.pagination_data()},
+            status=status.HTTP_200_OK,
+        )
+
+
+class LearningTaskSearchView(APIView):
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response(
+                {"error": "Search query is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            page = max(1, int(request.query_params.get("page", 1)))
+            page_size = int(request.query_params.get("page_size", 20))
+            page_size = min(100, max(1, page_size))
+        except ValueError:
+            return Response(
+                {"error": "page and page_size must be numbers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        matches, total_count = search_tasks(
+            query, request.user, limit=page_size, offset=(page - 1) * page_size
+        )
+        ids = [task_id for task_id, _ in matches]
+        tasks = summary_shape(LearningTask.objects.filter(id__in=ids)).in_bulk()
+        serializer = LearningTaskSummarySerializer(
+            [tasks[task_id] for task_id in ids if task_id in tasks], many=True
+        )
+
+        return Response(
+            {
+                "tasks": serializer.data,
+                "pagination": {
+                    "current_page": page,
+                    "page_size": page_size,
+                    "total_count": total_count,
+                    "total_pages": (total_count + page_size - 1) // page_size,
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 @method_decorator(csrf_protect, name="dispatch")
 class LearningTaskAPIView(APIView):
     authentication_classes = [JWTCookieAuthentication]
@@ -84,7 +168,9 @@ class LearningTaskAPIView(APIView):
         try:
 
             task = LearningTask.objects.get(id=task_id)
-            user_liked = task.likes.filter(id=user.id).exists()
+            user_liked = LearningTask.likes.through.objects.filter(
+                learningtask_id=task.id, user_id=user.id
+            ).exists()
             serializer = LearningTaskSerializer(task)
             task_bonus = TaskBonus.objects.filter(task=task).first()
             bonus_serializer = None
@@ -124,25 +210,17 @@ class LearningTaskAPIView(APIView):
             serializer = LearningTaskSerializer(
                 data=request.data, context={"request": request}
             )
+            # Validate first: an invalid submission must not use up a slot
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            task_limit, created = LearningTaskLimit.objects.get_or_create(
-                user=request.user
-            )
-            if not task_limit.is_valid():
-                return Response(
-                    {"error": "You have reached your task creation limit."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            with transaction.atomic():
-                task_limit.created()
-                if serializer.is_valid():
-                    serializer.save(user=request.user)
+            with LearningTaskLimit.reservation(request.user):
+                serializer.save(user=request.user)
 
-                    return Response(serializer.data, status=status.HTTP_201_CREATED)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        except LearningTaskLimit.DoesNotExist:
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        except LearningTaskLimit.QuotaExhausted:
             return Response(
-                {"error": "Your task limit is not set. Contact the admin."},
+                {"error": "You have reached your task creation limit."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
         except Exception as e:
@@ -172,7 +250,6 @@ class LearningTaskAPIView(APIView):
     def delete(self, request, task_id):
         try:
             task = LearningTask.objects.get(id=task_id, user=request.user)
-            task_limit = LearningTaskLimit.objects.get(user=request.user)
 
             if task.status in ["rated", "redo"]:
                 return Response(
@@ -182,8 +259,17 @@ class LearningTaskAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
             with transaction.atomic():
-                task.delete()
-                task_limit.deleted()
+                # The slot is only handed back for the request that actually
+                # removed the row, so racing deletes can't release it twice
+                _, deleted = (
+                    LearningTask.objects.filter(id=task.id, user=request.user)
+                    .exclude(status__in=["rated", "redo"])
+                    .delete()
+                )
+                if not deleted.get(LearningTask._meta.label):
+                    raise LearningTask.DoesNotExist
+                if not LearningTaskLimit.release(request.user):
+                    raise LearningTaskLimit.DoesNotExist
             return Response(
                 {"message": "Task deleted successfully."},
                 status=status.HTTP_204_NO_CONTENT,
@@ -234,7 +320,7 @@ class TaskReviewAPIView(APIView):
                 if request.user.is_staff:
 
                     task.status = "rated"
-                    task.save()
+                    task.save(update_fields=["status", "updated_at"])
 
                 serializer = TaskReviewSerializer(data=request.data)
                 if serializer.is_valid():
@@ -287,7 +373,7 @@ class TaskReviewAPIView(APIView):
             with transaction.atomic():
                 if serializer.is_valid():
                     task.status = "rated"
-                    task.save()
+                    task.save(update_fields=["status", "updated_at"])
                     print(task.status)
                     print("Hey")
                     async_to_sync(notify_user)(
@@ -343,7 +429,7 @@ class TaskToRedoView(APIView):
             with transaction.atomic():
 
                 task.status = "redo"
-                task.save()
+                task.save(update_fields=["status", "updated_at"])
                 print("successfully set to redo")
 
                 async_to_sync(notify_user)(
@@ -378,20 +464,13 @@ class LikeLearningTaskAPIView(APIView):
         user = request.user
         try:
             task = LearningTask.objects.get(id=task_id)
-
-            if user in task.likes.all():
-                task.likes.remove(user)
-                action = "unliked"
-
-            else:
-                task.likes.add(user)
-                action = "liked"
+            liked, total_likes = task.toggle_like(user)
 
             return Response(
                 {
                     "task_id": task.id,
-                    "action": action,
-                    "total_likes": task.likes.count(),
+                    "action": "liked" if liked else "unliked",
+                    "total_likes": total_likes,
                 },
                 status=status.HTTP_200_OK,
             )
@@ -570,5 +649,77 @@ class StudentLearningTaskView(APIView):
         if not tasks.exists():
             return Response({"error": "No tasks yet"}, status=status.HTTP_404_NOT_FOUND)
 
-        serialzier = LearningTaskNonExtraSerializer(tasks, many=True)
+        serialzier = LearningTaskNonExtraSerializer(detail_shape(tasks), many=True)
         return Response({"tasks": serialzier.data}, status=status.HTTP_200_OK)
+
+
+class LeaderboardView(APIView):
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        grade = request.query_params.get("grade", "").strip()
+        section = request.query_params.get("section", "").strip()
+        field = request.query_params.get("field", "").strip()
+
+        try:
+            page = max(1, int(request.query_params.get("page", 1)))
+            page_size = int(request.query_params.get("page_size", 20))
+            page_size = min(100, max(1, page_size))
+        except ValueError:
+            return Response(
+                {"error": "page and page_size must be numbers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        profiles = Profile.objects.filter(user__role="user", user__is_deleted=False)
+
+        if grade:
+            try:
+                profiles = profiles.filter(grade=int(grade))
+            except ValueError:
+                pass
+
+        if section:
+            profiles = profiles.filter(section__iexact=section)
+
+        if field:
+            profiles = profiles.filter(field__iexact=field)
+
+        total_count = profiles.count()
+        start = (page - 1) * page_size
+        rows = rank_profiles(profiles).values(
+            "user_id",
+            "user__full_name",
+            "grade",
+            "section",
+            "field",
+            "score",
+            "rank",
+        )[start : start + page_size]
+
+        leaderboard = [
+            {
+                "rank": row["rank"],
+                "user_id": row["user_id"],
+                "full_name": row["user__full_name"],
+                "grade": row["grade"],
+                "section": row["section"],
+                "field": row["field"],
+                "score": row["score"],
+            }
+            for row in rows
+        ]
+
+        return Response(
+            {
+                "leaderboard": leaderboard,
+                "pagination": {
+                    "current_page": page,
+                    "page_size": page_size,
+                    "total_count": total_count,
+                    "total_pages": (total_count + page_size - 1) // page_size,
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
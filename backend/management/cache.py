@@ -0,0 +1,98 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from attendance.models import Attendance
+from users.models import Profile
+
+User = get_user_model()
+
+STUDENTS_OVERVIEW_VERSION_KEY = "management:students_overview:version"
+STUDENTS_OVERVIEW_TIMEOUT = 60 * 60
+
+
+def _students_overview_version():
+    version = cache.get(STUDENTS_OVERVIEW_VERSION_KEY)
+    if version is None:
+        cache.add(STUDENTS_OVERVIEW_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(STUDENTS_OVERVIEW_VERSION_KEY)
+    return version
+
+
+def invalidate_students_overview():
+    """
+    Move the overview to a new version; entries cached under the old one
+    simply stop being read and expire on their own.
+    """
+    try:
+        cache.incr(STUDENTS_OVERVIEW_VERSION_KEY)
+    except ValueError:
+        cache.set(STUDENTS_OVERVIEW_VERSION_KEY, time.time_ns(), None)
+
+
+def _build_students_overview():
+    base_profiles = Profile.objects.filter(user__role="user")
+
+    filter_options = {
+        "grades": list(
+            base_profiles.exclude(grade__isnull=True)
+            .values_list("grade", flat=True)
+            .distinct()
+            .order_by("grade")
+        ),
+        "sections": list(
+            base_profiles.exclude(section__isnull=True)
+            .exclude(section="")
+            .values_list("section", flat=True)
+            .distinct()
+            .order_by("section")
+        ),
+        "fields": list(
+            base_profiles.exclude(field__isnull=True)
+            .exclude(field="")
+            .values_list("field", flat=True)
+            .distinct()
+            .order_by("field")
+        ),
+    }
+
+    attendance_counts = Attendance.objects.aggregate(
+        total_present=Count("id", filter=Q(status="present")),
+        total_late=Count("id", filter=Q(status="late")),
+        total_absent=Count("id", filter=Q(status="absent")),
+        total_special_case=Count("id", filter=Q(status="special_case")),
+    )
+    total_records = sum(attendance_counts.values())
+    average_attendance = (
+        (attendance_counts["total_present"] + attendance_counts["total_late"])
+        / total_records
+        * 100
+        if total_records > 0
+        else 0
+    )
+
+    student_counts = base_profiles.aggregate(
+        active=Count("id", filter=Q(user__is_active=True)),
+        inactive=Count("id", filter=Q(user__is_active=False)),
+    )
+
+    return {
+        "filter_options": filter_options,
+        "stats": {
+            "attendance_avg": average_attendance,
+            "total": User.objects.filter(role="user").count(),
+            "active": student_counts["active"],
+            "inactive": student_counts["inactive"],
+        },
+    }
+
+
+def get_students_overview():
+    key = f"management:students_overview:{_students_overview_version()}"
+    overview = cache.get(key)
+    if overview is None:
+        overview = _build_students_overview()
+        cache.set(key, overview, STUDENTS_OVERVIEW_TIMEOUT)
+    return overview
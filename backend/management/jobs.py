@@ -0,0 +1,44 @@
+import tempfile
+
+from django.core.files import File
+
+from jobs.registry import register
+from .views import (
+    StudentsExportView,
+    StudentsBulkUploadView,
+    GradesRankExportPdfView,
+    StudentsBulkOperationView,
+)
+
+
+@register("students_export")
+def students_export(job, progress):
+    # Spooled to disk, then copied to the job files storage in chunks
+    with tempfile.TemporaryFile() as output:
+        filename, content_type = StudentsExportView().export_file(
+            job.params, output, progress
+        )
+        output.seek(0)
+        job.attach_file(filename, content_type, File(output))
+    return {"filename": filename}
+
+
+@register("students_bulk_upload")
+def students_bulk_upload(job, progress):
+    with open(job.input_file.path, "rb") as raw:
+        file = File(raw, name=job.input_name)
+        response = StudentsBulkUploadView().import_file(file, progress)
+    return {"status_code": response.status_code, **response.data}
+
+
+@register("grades_rank_pdf")
+def grades_rank_pdf(job, progress):
+    filename, pdf = GradesRankExportPdfView().build_pdf(job.params, progress)
+    job.attach_file(filename, "application/pdf", pdf)
+    return {"filename": filename}
+
+
+@register("students_bulk_operation")
+def students_bulk_operation(job, progress):
+    response = StudentsBulkOperationView().perform(job.params, progress)
+    return {"status_code": response.status_code, **response.data}
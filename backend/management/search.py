@@ -0,0 +1,275 @@
+import threading
+import time
+from array import array
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+from users.models import Profile
+
+STUDENT_SEARCH_VERSION_KEY = "management:student_search:version"
+# Each version bump records the users it changed, so a process whose index is
+# a few versions behind can reindex just those students. Past this many
+# versions, or once an entry has expired, the index is rebuilt instead.
+STUDENT_SEARCH_CHANGES_TIMEOUT = 60 * 60
+MAX_PENDING_VERSIONS = 100
+# Terms shorter than a trigram, and terms matching more students than this,
+# are left to the database: the index would not narrow them down.
+MIN_INDEXED_TERM = 3
+MAX_INDEXED_MATCHES = 2000
+# Separates the searchable fields of one student, so a match can't straddle two
+FIELD_SEPARATOR = "\x00"
+
+
+def _search_version():
+    version = cache.get(STUDENT_SEARCH_VERSION_KEY)
+    if version is None:
+        cache.add(STUDENT_SEARCH_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(STUDENT_SEARCH_VERSION_KEY)
+    return version
+
+
+def _changes_key(version):
+    return f"management:student_search:changes:{version}"
+
+
+def invalidate_student_search(user_ids=None):
+    """
+    Marks the search index stale. With `user_ids`, processes reindex only
+    those students; without, they rebuild the whole index.
+    """
+    # PostgreSQL searches the tables directly (users/0014)
+    if connection.vendor == "postgresql":
+        return
+    try:
+        version = cache.incr(STUDENT_SEARCH_VERSION_KEY)
+    except ValueError:
+        cache.set(STUDENT_SEARCH_VERSION_KEY, time.time_ns(), None)
+        return
+    if user_ids is not None:
+        cache.set(
+            _changes_key(version), list(user_ids), STUDENT_SEARCH_CHANGES_TIMEOUT
+        )
+
+
+def _changed_users(since, until):
+    """
+    Users changed by the versions after `since` up to `until`, or None when
+    some of them are unknown.
+    """
+    if not 0 < until - since <= MAX_PENDING_VERSIONS:
+        return None
+    keys = [_changes_key(version) for version in range(since + 1, until + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys):
+        return None
+    return {user_id for user_ids in changes.values() for user_id in user_ids}
+
+
+def _trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class StudentTrigramIndex:
+    """
+    In-process trigram index over the students' name, email, section and
+    field, for databases without pg_trgm. A term is looked up by intersecting
+    the posting lists of its trigrams and confirming the candidates with a
+    substring check, instead of scanning and joining every profile.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.texts = {}
+        self.grades = {}
+        self.by_grade = {}
+        self.profile_of_user = {}
+        # Posting entries left behind by updates; see update()
+        self.stale_postings = 0
+        postings = {}
+
+        for profile_id, user_id, grade, text in self._rows(Profile.objects.all()):
+            self._add(profile_id, user_id, grade, text)
+            for trigram in _trigrams(text):
+                postings.setdefault(trigram, []).append(profile_id)
+
+        # Compact arrays keep the index small for tens of thousands of students
+        self.postings = {key: array("q", ids) for key, ids in postings.items()}
+
+    @staticmethod
+    def _rows(profiles):
+        rows = (
+            profiles.filter(user__role="user")
+            .order_by("id")
+            .values_list(
+                "id",
+                "user_id",
+                "user__full_name",
+                "user__email",
+                "grade",
+                "section",
+                "field",
+            )
+        )
+        for profile_id, user_id, full_name, email, grade, section, field in (
+            rows.iterator()
+        ):
+            text = FIELD_SEPARATOR.join(
+                (value or "").lower() for value in (full_name, email, section, field)
+            )
+            yield profile_id, user_id, grade, text
+
+    def _add(self, profile_id, user_id, grade, text):
+        self.texts[profile_id] = text
+        self.grades[profile_id] = grade
+        self.by_grade.setdefault(grade, set()).add(profile_id)
+        self.profile_of_user[user_id] = profile_id
+
+    def _remove(self, profile_id):
+        self.texts.pop(profile_id, None)
+        grade = self.grades.pop(profile_id, None)
+        self.by_grade.get(grade, set()).discard(profile_id)
+
+    @property
+    def worth_rebuilding(self):
+        return self.stale_postings > max(len(self.texts), 1000)
+
+    def update(self, user_ids, version):
+        """
+        Reindexes the students of `user_ids` with one query. Postings are
+        append-only: entries for trigrams a student no longer has stay behind
+        and are weeded out by the substring check in search().
+        """
+        old_texts = {}
+        for user_id in user_ids:
+            profile_id = self.profile_of_user.pop(user_id, None)
+            if profile_id is not None:
+                old_texts[profile_id] = self.texts.get(profile_id, "")
+                self._remove(profile_id)
+
+        rows = self._rows(Profile.objects.filter(user_id__in=user_ids))
+        for profile_id, user_id, grade, text in rows:
+            old = old_texts.pop(profile_id, None)
+            if old is None:
+                # Moved to this user from another
+                old = self.texts.get(profile_id, "")
+                self._remove(profile_id)
+            self._add(profile_id, user_id, grade, text)
+            old_trigrams = _trigrams(old)
+            for trigram in _trigrams(text):
+                if trigram in old_trigrams:
+                    old_trigrams.discard(trigram)
+                    continue
+                self.postings.setdefault(trigram, array("q")).append(profile_id)
+            self.stale_postings += len(old_trigrams)
+
+        for old in old_texts.values():
+            self.stale_postings += len(_trigrams(old))
+        self.version = version
+
+    def search(self, term):
+        """
+        Ids of the profiles whose fields contain `term`, or None when the
+        term is too short or too broad for the index to help.
+        """
+        if len(term) < MIN_INDEXED_TERM or FIELD_SEPARATOR in term:
+            return None
+
+        lists = []
+        for trigram in _trigrams(term):
+            ids = self.postings.get(trigram)
+            if ids is None:
+                return self._with_grade(set(), term)
+            lists.append(ids)
+        lists.sort(key=len)
+        if len(lists[0]) > MAX_INDEXED_MATCHES * 4:
+            return None
+
+        candidates = set(lists[0])
+        for ids in lists[1:]:
+            candidates.intersection_update(ids)
+            if not candidates:
+                break
+
+        matches = {pid for pid in candidates if term in self.texts.get(pid, "")}
+        if len(matches) > MAX_INDEXED_MATCHES:
+            return None
+        return self._with_grade(matches, term)
+
+    def _with_grade(self, matches, term):
+        if term.isdigit():
+            matches.update(self.by_grade.get(int(term), []))
+        return matches
+
+
+_index = None
+# Guards _index while it is searched and updated, which is quick
+_index_lock = threading.Lock()
+# Held by the one thread rebuilding the index
+_rebuild_lock = threading.Lock()
+
+
+def _search_index(term):
+    """
+    Ids matching `term` from this process's index, brought up to date first.
+    None sends the search to the database: the term doesn't suit the index,
+    or the index is being rebuilt by another thread.
+    """
+    global _index
+    version = _search_version()
+    with _index_lock:
+        index = _index
+        if index is not None and index.version != version:
+            changed = _changed_users(index.version, version)
+            if changed is not None and not index.worth_rebuilding:
+                index.update(changed, version)
+        if index is not None and index.version == version:
+            return index.search(term)
+
+    # Rebuilding takes a pass over every student: other searches don't wait
+    # for it
+    if not _rebuild_lock.acquire(blocking=False):
+        return None
+    try:
+        index = StudentTrigramIndex(version)
+    finally:
+        _rebuild_lock.release()
+    with _index_lock:
+        if _index is None or _index.version < index.version:
+            _index = index
+        return index.search(term)
+
+
+def _term_filter(term):
+    match = (
+        Q(user__full_name__icontains=term)
+        | Q(user__email__icontains=term)
+        | Q(section__icontains=term)
+        | Q(field__icontains=term)
+    )
+    # Grades are whole numbers: compare them as such rather than casting the
+    # column to text
+    if term.isdigit():
+        match |= Q(grade=int(term))
+    return match
+
+
+def search_profiles(profiles, query):
+    """
+    Narrows a Profile queryset to the students whose name, email, section or
+    field contains `query`, or whose grade equals it.
+
+    On PostgreSQL the filter runs against the trigram indexes from
+    users/0014; elsewhere it goes through the in-process StudentTrigramIndex.
+    """
+    term = (query or "").strip().lower()
+    if not term:
+        return profiles
+    if connection.vendor == "postgresql":
+        return profiles.filter(_term_filter(term))
+
+    ids = _search_index(term)
+    if ids is None:
+        return profiles.filter(_term_filter(term))
+    return profiles.filter(id__in=ids)
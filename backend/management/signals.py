@@ -0,0 +1,61 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from attendance.models import Attendance
+from attendance.signals import attendance_changed
+from users.models import Profile
+from .cache import invalidate_students_overview
+from .search import invalidate_student_search
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_delete, sender=User)
+def students_overview_changed(sender, **kwargs):
+    # After commit, so an overview rebuilt mid-transaction isn't cached stale
+    transaction.on_commit(invalidate_students_overview)
+
+
+@receiver(post_save, sender=User)
+def student_user_saved(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which the overview doesn't use.
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    transaction.on_commit(invalidate_students_overview)
+
+
+@receiver(attendance_changed)
+def attendance_rows_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_students_overview)
+
+
+def _schedule_search_update(user_id):
+    # After commit, so the index isn't updated from uncommitted rows
+    transaction.on_commit(partial(invalidate_student_search, [user_id]))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def student_search_profile_changed(sender, instance, **kwargs):
+    _schedule_search_update(instance.user_id)
+
+
+@receiver(post_delete, sender=User)
+def student_search_user_deleted(sender, instance, **kwargs):
+    _schedule_search_update(instance.id)
+
+
+@receiver(post_save, sender=User)
+def student_search_user_saved(sender, instance, update_fields=None, **kwargs):
+    # Only students' names and emails are indexed
+    if update_fields and not {"full_name", "email", "role"} & set(update_fields):
+        return
+    _schedule_search_update(instance.id)
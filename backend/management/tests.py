@@ -1,3 +1,653 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+from rest_framework_simplejwt.tokens import AccessToken
+
+from attendance.models import AttendanceSummary
+from learning_task.models import LearningTaskLimit
+from users.models import Profile
+from utils.pagination import (
+    CURSOR_SALT,
+    CursorSerializer,
+    InvalidCursor,
+    KeysetPaginator,
+)
+from .cache import get_students_overview
+from . import search
+from .search import StudentTrigramIndex, search_profiles
+from .views import StudentsBulkUploadView
+
+User = get_user_model()
+
+
+async def _read_async(response):
+    return b"".join([chunk async for chunk in response.streaming_content])
+
+
+class StudentsExportStreamingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "admin@example.com", "Admin", "pw", role="admin", is_staff=True
+        )
+        for i in range(3):
+            student = User.objects.create_user(
+                f"s{i}@example.com", f"Student {i}", "pw"
+            )
+            Profile.objects.create(
+                user=student,
+                grade=11,
+                section="A",
+                field="backend",
+                phone_number="0900000000",
+            )
+
+    def export(self, file_format):
+        self.client.cookies["access"] = str(AccessToken.for_user(self.admin))
+        response = self.client.get(
+            f"/api/management/students/export/?file_format={file_format}",
+            secure=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        # An async iterator is what lets Daphne send the export as it is built
+        self.assertTrue(response.streaming)
+        self.assertTrue(response.is_async)
+        return async_to_sync(_read_async)(response)
+
+    def test_csv_export_streams_from_an_async_iterator(self):
+        lines = self.export("csv").decode().splitlines()
+        self.assertTrue(lines[0].startswith("Full Name,Email"))
+        self.assertEqual(len(lines), 4)
+
+    def test_xlsx_export_streams_from_an_async_iterator(self):
+        workbook = load_workbook(io.BytesIO(self.export("xlsx")), read_only=True)
+        rows = list(workbook.active.iter_rows(values_only=True))
+        self.assertEqual(rows[0][0], "Full Name")
+        self.assertEqual(len(rows), 4)
+
+
+class StudentsOverviewCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def add_student(self, grade):
+        student = User.objects.create_user(
+            f"g{grade}@example.com", f"Grade {grade}", "pw"
+        )
+        return Profile.objects.create(
+            user=student,
+            grade=grade,
+            section="A",
+            field="backend",
+            phone_number="0900000000",
+        )
+
+    def test_invalidated_only_once_the_change_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_student(10)
+        self.assertEqual(get_students_overview()["filter_options"]["grades"], [10])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.add_student(11)
+            # A request racing the transaction keeps reading the old entry
+            self.assertEqual(get_students_overview()["stats"]["total"], 1)
+
+        for callback in callbacks:
+            callback()
+        overview = get_students_overview()
+        self.assertEqual(overview["filter_options"]["grades"], [10, 11])
+        self.assertEqual(overview["stats"]["total"], 2)
+
+
+class StudentSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        students = [
+            ("Abebe Kebede", "abebe@example.com", 9, "A", "backend"),
+            ("Sara Tesfaye", "sara@example.com", 10, "B", "frontend"),
+            ("Kebede Alemu", "alemu@school.org", 12, "C", "cyber"),
+        ]
+        cls.profiles = {}
+        for full_name, email, grade, section, field in students:
+            user = User.objects.create_user(email, full_name, "pw")
+            cls.profiles[full_name.split()[0]] = Profile.objects.create(
+                user=user,
+                grade=grade,
+                section=section,
+                field=field,
+                phone_number="0900000000",
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        profiles = search_profiles(Profile.objects.all(), query)
+        return {profile.user.full_name.split()[0] for profile in profiles}
+
+    def test_trigram_index_matches_substrings_of_every_field(self):
+        index = StudentTrigramIndex(version=1)
+        ids = {name: profile.id for name, profile in self.profiles.items()}
+
+        self.assertEqual(index.search("kebede"), {ids["Abebe"], ids["Kebede"]})
+        self.assertEqual(index.search("school.org"), {ids["Kebede"]})
+        self.assertEqual(index.search("frontend"), {ids["Sara"]})
+        self.assertEqual(index.search("zzz"), set())
+        # Too short for a trigram: left to the database
+        self.assertIsNone(index.search("ab"))
+
+    def test_matches_never_straddle_two_fields(self):
+        # "example.comb" would join Sara's email to her section
+        self.assertEqual(self.search("example.comb"), set())
+
+    def test_grades_match_exactly(self):
+        self.assertEqual(self.search("10"), {"Sara"})
+        self.assertEqual(self.search("1"), set())
+        self.assertEqual(self.search("12"), {"Kebede"})
+
+    def test_search_sees_committed_changes(self):
+        self.assertEqual(self.search("kebede"), {"Abebe", "Kebede"})
+
+        profile = self.profiles["Sara"]
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.user.full_name = "Sara Kebede"
+            profile.user.save()
+
+        self.assertEqual(self.search("kebede"), {"Abebe", "Kebede", "Sara"})
+
+
+class StudentSearchIndexUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profiles = []
+        for i, name in enumerate(["Abebe Kebede", "Sara Tesfaye", "Hana Girma"]):
+            user = User.objects.create_user(f"u{i}@example.com", name, "pw")
+            cls.profiles.append(
+                Profile.objects.create(
+                    user=user,
+                    grade=10 + i,
+                    section="A",
+                    field="backend",
+                    phone_number="0900000000",
+                )
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(mock.patch.object(search, "_index", None))
+
+    def search(self, query):
+        profiles = search.search_profiles(Profile.objects.all(), query)
+        return {profile.user.full_name for profile in profiles}
+
+    def committed(self, change):
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+
+    def test_saves_update_the_index_in_place(self):
+        self.assertEqual(self.search("kebede"), {"Abebe Kebede"})
+        index = search._index
+        sara, hana = self.profiles[1], self.profiles[2]
+
+        def edit():
+            sara.user.full_name = "Sara Kebede"
+            sara.user.save()
+            hana.grade = 9
+            hana.save()
+
+        self.committed(edit)
+
+        self.assertEqual(self.search("kebede"), {"Abebe Kebede", "Sara Kebede"})
+        self.assertEqual(self.search("tesfaye"), set())
+        self.assertEqual(self.search("9"), {"Hana Girma"})
+        self.assertEqual(self.search("12"), set())
+        self.assertIs(search._index, index)
+
+    def test_removed_students_leave_the_index(self):
+        self.assertEqual(
+            self.search("example.com"), {"Abebe Kebede", "Sara Tesfaye", "Hana Girma"}
+        )
+        index = search._index
+        abebe, sara = self.profiles[0].user, self.profiles[1].user
+
+        def remove():
+            abebe.delete()
+            sara.role = "admin"
+            sara.save(update_fields=["role"])
+
+        self.committed(remove)
+
+        self.assertEqual(self.search("example.com"), {"Hana Girma"})
+        self.assertIs(search._index, index)
+
+    def test_unknown_changes_rebuild_the_index(self):
+        self.search("kebede")
+        index = search._index
+
+        # Behind the ORM's back: only a full rebuild can pick this up
+        User.objects.filter(id=self.profiles[1].user_id).update(full_name="Sara Kebede")
+        search.invalidate_student_search()
+
+        self.assertEqual(self.search("kebede"), {"Abebe Kebede", "Sara Kebede"})
+        self.assertIsNot(search._index, index)
+
+    def test_searches_use_the_database_while_the_index_is_rebuilt(self):
+        self.search("kebede")
+        index = search._index
+        search.invalidate_student_search()
+
+        with search._rebuild_lock:
+            self.assertEqual(self.search("kebede"), {"Abebe Kebede"})
+            self.assertIs(search._index, index)
+
+        self.search("kebede")
+        self.assertIsNot(search._index, index)
+
+
+class KeysetPaginationTests(TestCase):
+    # (present, absent) per student: several tie on 2/3, which is not exact in
+    # floating point, and on 0.0 for students with no attendance at all
+    ATTENDANCE = [(2, 1), (0, 0), (4, 2), (1, 0), (0, 0), (2, 1), (0, 3), (6, 3)]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "admin@example.com", "Admin", "pw", role="admin", is_staff=True
+        )
+        cls.percentages = {}
+        for i, (present, absent) in enumerate(cls.ATTENDANCE):
+            # Names tie in pairs so the pk tie breaker is exercised there too
+            student = User.objects.create_user(
+                f"k{i}@example.com", f"Student {i // 2}", "pw"
+            )
+            Profile.objects.create(
+                user=student,
+                grade=11,
+                section="A",
+                field="backend",
+                phone_number="0900000000",
+            )
+            AttendanceSummary.objects.create(
+                user=student,
+                total_count=present + absent,
+                present_count=present,
+                absent_count=absent,
+            )
+            total = present + absent
+            cls.percentages[student.id] = 100.0 * present / total if total else 0.0
+
+    def setUp(self):
+        cache.clear()
+        self.client.cookies["access"] = str(AccessToken.for_user(self.admin))
+
+    def get(self, **params):
+        return self.client.get("/api/management/students/", params, secure=True)
+
+    def walk(self, **params):
+        ids, cursor = [], ""
+        # Bounded, so a cursor that stops advancing fails instead of hanging
+        for _ in range(len(self.ATTENDANCE)):
+            response = self.get(cursor=cursor, page_size=3, **params)
+            self.assertEqual(response.status_code, 200)
+            ids += [student["id"] for student in response.json()["students"]]
+            cursor = response.json()["pagination"]["next_cursor"]
+            if cursor is None:
+                return ids
+        self.fail(f"Cursor pagination did not finish: {ids}")
+
+    def test_pages_cover_every_row_once_in_order(self):
+        ids = self.walk(sort_by="full_name")
+
+        expected = sorted(
+            User.objects.filter(role="user").values_list("full_name", "id")
+        )
+        self.assertEqual(ids, [user_id for _, user_id in expected])
+
+    def test_ties_on_a_float_column_are_broken_by_pk(self):
+        ids = self.walk(sort_by="attendance_percentage")
+
+        expected = sorted(self.percentages, key=lambda i: (self.percentages[i], i))
+        self.assertEqual(ids, expected)
+
+    def test_descending_order(self):
+        ids = self.walk(sort_by="-attendance_percentage")
+
+        expected = sorted(self.percentages, key=lambda i: (self.percentages[i], i))
+        self.assertEqual(ids, expected[::-1])
+
+    def test_bad_cursors_are_rejected(self):
+        response = self.get(cursor="", page_size=3)
+        cursor = response.json()["pagination"]["next_cursor"]
+        tampered = cursor[:-1] + ("A" if cursor[-1] != "A" else "B")
+
+        for bad in ["garbage", tampered, "e30:1abc:xyz"]:
+            with self.subTest(cursor=bad):
+                response = self.get(cursor=bad)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    response.json()["error"], "Invalid pagination cursor."
+                )
+
+    def test_total_is_only_counted_on_request(self):
+        pagination = self.get(cursor="").json()["pagination"]
+        self.assertNotIn("total_count", pagination)
+
+        pagination = self.get(cursor="", include_total=1).json()["pagination"]
+        self.assertEqual(pagination["total_count"], len(self.ATTENDANCE))
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        joined = timezone.now()
+        for i in range(5):
+            user = User.objects.create_user(f"u{i}@example.com", f"User {i}", "pw")
+            # All within the same millisecond
+            User.objects.filter(id=user.id).update(
+                date_joined=joined + timedelta(microseconds=100 * (i % 3))
+            )
+
+    def walk(self, **kwargs):
+        paginator = KeysetPaginator(User.objects.all(), page_size=2, **kwargs)
+        ids = [user.id for user in paginator.paginate()]
+        for _ in range(5):
+            if not paginator.next_cursor:
+                return ids
+            ids += [user.id for user in paginator.paginate(paginator.next_cursor)]
+        self.fail(f"Cursor pagination did not finish: {ids}")
+
+    def test_datetime_cursors_keep_microseconds(self):
+        users = User.objects.order_by("date_joined", "id")
+        expected = list(users.values_list("id", flat=True))
+
+        self.assertEqual(self.walk(sort_field="date_joined"), expected)
+        self.assertEqual(
+            self.walk(sort_field="date_joined", descending=True), expected[::-1]
+        )
+
+    def test_cursors_signed_for_another_shape_are_invalid(self):
+        paginator = KeysetPaginator(User.objects.all())
+        cursor = signing.dumps(
+            {"value": 1}, salt=CURSOR_SALT, serializer=CursorSerializer
+        )
+
+        with self.assertRaises(InvalidCursor):
+            paginator.paginate(cursor)
+
+
+class StudentsBulkUploadTests(TestCase):
+    HEADER = [
+        "full_name",
+        "email",
+        "grade",
+        "section",
+        "field",
+        "gender",
+        "phone_number",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "admin@example.com", "Admin", "pw", role="admin", is_staff=True
+        )
+
+    def setUp(self):
+        self.client.cookies["access"] = str(AccessToken.for_user(self.admin))
+
+    def student(self, i, **overrides):
+        row = {
+            "full_name": f"Student {i}",
+            "email": f"student{i}@example.com",
+            "grade": "10",
+            "section": "b",
+            "field": "Backend",
+            "gender": "female",
+            "phone_number": "0911111111",
+        }
+        row.update(overrides)
+        return [row[column] for column in self.HEADER]
+
+    def csv_file(self, rows):
+        lines = [",".join(self.HEADER)] + [",".join(map(str, row)) for row in rows]
+        return SimpleUploadedFile("students.csv", "\n".join(lines).encode())
+
+    def xlsx_file(self, rows):
+        workbook = Workbook()
+        workbook.active.append(self.HEADER)
+        for row in rows:
+            workbook.active.append(row)
+        content = io.BytesIO()
+        workbook.save(content)
+        return SimpleUploadedFile("students.xlsx", content.getvalue())
+
+    def upload(self, file):
+        return self.client.post(
+            "/api/management/students/bulk-upload/", {"file": file}, secure=True
+        )
+
+    def test_csv_and_xlsx_create_students(self):
+        for make_file in (self.csv_file, self.xlsx_file):
+            with self.subTest(make_file.__name__):
+                prefix = make_file.__name__[0]
+                rows = [self.student(f"{prefix}{i}") for i in range(2)]
+
+                response = self.upload(make_file(rows))
+
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(response.json()["created_count"], 2)
+                email = f"student{prefix}0@example.com"
+                profile = Profile.objects.get(user__email=email)
+                self.assertEqual(
+                    (profile.grade, profile.section, profile.field),
+                    (10, "B", "backend"),
+                )
+                self.assertEqual(profile.user.task_limit.limit, 20)
+
+    def test_invalid_rows_are_reported_by_sheet_row(self):
+        rows = [
+            self.student(1),
+            self.student(2, grade="13", section="AB"),
+            self.student(3, email="not-an-email"),
+        ]
+
+        response = self.upload(self.csv_file(rows))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()["errors"],
+            [
+                {
+                    "row": 3,
+                    "email": "student2@example.com",
+                    "errors": {
+                        "grade": ["Grade must be between 1 and 12"],
+                        "section": ["Section must be a single letter (A-Z)"],
+                    },
+                },
+                {
+                    "row": 4,
+                    "email": "not-an-email",
+                    "errors": {"email": ["Invalid email format"]},
+                },
+            ],
+        )
+        self.assertFalse(User.objects.filter(email="student1@example.com").exists())
+
+    def test_row_numbers_count_blank_rows(self):
+        rows = [self.student(1), [], [], self.student(2, field="art")]
+
+        for make_file in (self.csv_file, self.xlsx_file):
+            with self.subTest(make_file.__name__):
+                errors = self.upload(make_file(rows)).json()["errors"]
+                self.assertEqual([error["row"] for error in errors], [5])
+
+    def test_duplicate_emails_in_the_file(self):
+        rows = [self.student(1), self.student(2), self.student(1, full_name="Again")]
+
+        response = self.upload(self.csv_file(rows))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(error["row"], error["email"]) for error in response.json()["errors"]],
+            [(2, "student1@example.com"), (4, "student1@example.com")],
+        )
+        self.assertEqual(User.objects.filter(role="user").count(), 0)
+
+    def test_existing_emails_are_skipped(self):
+        User.objects.create_user("student2@example.com", "Already here", "pw")
+
+        response = self.upload(self.csv_file([self.student(i) for i in range(1, 4)]))
+
+        self.assertEqual(response.status_code, 207)
+        data = response.json()
+        self.assertEqual(data["created_count"], 2)
+        self.assertEqual(
+            data["errors"],
+            [
+                {
+                    "row": 3,
+                    "email": "student2@example.com",
+                    "error": "User with this email already exists in the database",
+                }
+            ],
+        )
+        self.assertEqual(
+            User.objects.get(email="student2@example.com").full_name, "Already here"
+        )
+
+    def test_batches_keep_profiles_with_their_users(self):
+        User.objects.create_user("student3@example.com", "Already here", "pw")
+        rows = [self.student(i, grade=str(i + 1)) for i in range(7)]
+
+        with mock.patch.object(StudentsBulkUploadView, "BATCH_SIZE", 2):
+            response = self.upload(self.csv_file(rows))
+
+        self.assertEqual(response.json()["created_count"], 6)
+        profiles = Profile.objects.filter(user__email__startswith="student")
+        self.assertEqual(
+            sorted((p.user.email, p.grade) for p in profiles),
+            [(f"student{i}@example.com", i + 1) for i in range(7) if i != 3],
+        )
+        self.assertEqual(
+            LearningTaskLimit.objects.filter(user__email__startswith="student").count(),
+            6,
+        )
+
+    def test_missing_columns(self):
+        file = SimpleUploadedFile("students.csv", b"full_name,email\nA,a@example.com\n")
+
+        response = self.upload(file)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("grade", response.json()["error"])
+
+
+class TaskLimitBulkUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "admin@example.com", "Admin", "pw", role="admin", is_staff=True
+        )
+        cls.students = {}
+        # name: (grade, field, is_active, limit or None for no row)
+        for name, (grade, field, is_active, limit) in {
+            "a": (10, "backend", True, 5),
+            "b": (10, "backend", True, 2),
+            "c": (11, "frontend", True, None),
+            "d": (11, "frontend", False, 1),
+        }.items():
+            student = User.objects.create_user(
+                f"{name}@example.com", name, "pw", is_active=is_active
+            )
+            Profile.objects.create(
+                user=student,
+                grade=grade,
+                section="A",
+                field=field,
+                phone_number="0900000000",
+            )
+            if limit is not None:
+                LearningTaskLimit.objects.create(user=student, limit=limit)
+            cls.students[name] = student
+
+    def setUp(self):
+        self.client.cookies["access"] = str(AccessToken.for_user(self.admin))
+
+    def update(self, **data):
+        return self.client.post(
+            "/api/management/task-limits/bulk-update/",
+            data,
+            content_type="application/json",
+            secure=True,
+        )
+
+    def limits(self):
+        rows = LearningTaskLimit.objects.values_list("user__full_name", "limit")
+        return dict(rows)
+
+    def test_set_upserts_missing_rows(self):
+        response = self.update(scope="all", operation="set", value=7)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total_users"], 4)
+        self.assertEqual(self.limits(), {"a": 7, "b": 7, "c": 7, "d": 7})
+
+    def test_increment_starts_missing_rows_from_zero(self):
+        response = self.update(scope="active", operation="increment", value=3)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.limits(), {"a": 8, "b": 5, "c": 3, "d": 1})
+
+    def test_decrement_stops_at_zero(self):
+        response = self.update(
+            scope="by_grade", grade=10, section="A", operation="decrement", value=3
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(response.json()["affected_users"]),
+            sorted([self.students["a"].id, self.students["b"].id]),
+        )
+        self.assertEqual(self.limits(), {"a": 2, "b": 0, "d": 1})
+
+    def test_scopes_by_field_and_inactive(self):
+        self.update(scope="by_field", field="frontend", operation="set", value=9)
+        self.update(scope="inactive", operation="increment", value=1)
+
+        self.assertEqual(self.limits(), {"a": 5, "b": 2, "c": 9, "d": 10})
+
+    def test_invalid_requests_change_nothing(self):
+        for data, field in [
+            ({"scope": "all", "operation": "multiply", "value": 2}, "operation"),
+            ({"scope": "everyone", "operation": "set", "value": 2}, "scope"),
+            ({"scope": "all", "operation": "set", "value": "many"}, "value"),
+            ({"scope": "all", "operation": "set", "value": 301}, "value"),
+            ({"scope": "all", "operation": "set", "value": -1}, "value"),
+            ({"scope": "all", "operation": "increment", "value": 0}, "value"),
+            ({"scope": "by_grade", "operation": "set", "value": 1}, "grade"),
+            ({"scope": "by_field", "operation": "set", "value": 1}, "field"),
+        ]:
+            with self.subTest(data=data):
+                response = self.update(**data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.json())
+
+        self.assertEqual(self.limits(), {"a": 5, "b": 2, "d": 1})
+
+    def test_no_matching_students(self):
+        response = self.update(
+            scope="by_grade", grade=12, section="A", operation="set", value=1
+        )
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(response.json()["no_user"])
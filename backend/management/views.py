@@ -1,5 +1,8 @@
 import csv
 import io
+import tempfile
+from functools import partial
+from itertools import chain, islice
 from openpyxl import load_workbook, Workbook
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -9,60 +12,56 @@ from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.db.models import Count, Q
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, QueryDict, StreamingHttpResponse
 from io import BytesIO
 from datetime import datetime
-from utils.auth import JWTCookieAuthentication, IsSuperUser
+from utils.auth import JWTCookieAuthentication, IsSuperUser, invalidate_cached_users
 from users.models import Profile
 from users.serializers import UserSerializer, ProfileSerializer, UserInverseSerializer
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from .serializers import LanguageSerializer, FrameworkSerializer, SettingSerializer
 from learning_task.serializers import (
-    LearningTaskSerializer,
+    LearningTaskSummarySerializer,
     LearningTaskLimitSerializer,
 )
 import io
 from learning_task.models import LearningTaskLimit
 from .models import Framework, Language, Setting
-from attendance.models import Attendance, AttendanceSession
-from learning_task.models import LearningTask, TaskReview
+from .cache import get_students_overview, invalidate_students_overview
+from .search import search_profiles, invalidate_student_search
+from attendance.models import Attendance, AttendanceSession, AttendanceSummary
+from learning_task.models import LearningTask, TaskReview, StudentScore
+from learning_task.ranking import rank_profiles
+from learning_task.cache import get_top_tasks
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_protect
 from django.db.models import (
     Count,
     Q,
     F,
-    Sum,
     When,
     Case,
     Value,
     FloatField,
-    Avg,
 )
-from django.db.models.functions import Coalesce
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
-from datetime import timedelta
 import math
 from learning_task.models import LearningTaskLimit
 import environ
 import cloudinary
 import cloudinary.utils
 from pathlib import Path
-from asgiref.sync import async_to_sync
+from asgiref.sync import async_to_sync, sync_to_async
 from utils.notif import notify_user, notify_users_bulk
-
-from reportlab.platypus import (
-    SimpleDocTemplate,
-    Paragraph,
-    Spacer,
-    Table,
-    TableStyle,
-)
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import inch
+from utils.realtimeauth import invalidate_handshake_cache
+from utils.pagination import KeysetPaginator, InvalidCursor
+from utils.get_file import get_private_image_url, get_private_image_urls
+from utils.streaming import stream_file
+from jobs.models import Job
+from jobs.registry import wants_async, accepted_response
+from utils.reports import render_table_report
 
 
 env = environ.Env()
@@ -79,23 +78,6 @@ cloudinary.config(
 User = get_user_model()
 
 
-class SimpleDataFrame:
-    def __init__(self, rows, columns):
-        """
-        rows: a list of dictionaries, one per row
-        columns: a list of column names
-        """
-        self._rows = rows
-        self.columns = columns
-
-    def iterrows(self):
-        """
-        Mimics pandas iterrows(): yields (index, row_dict)
-        """
-        for index, row in enumerate(self._rows):
-            yield index, row
-
-
 class StudentsView(APIView):
     authentication_classes = [JWTCookieAuthentication]
     permission_classes = [IsAdminUser]
@@ -112,58 +94,24 @@ class StudentsView(APIView):
             page = int(request.query_params.get("page", 1))
             page_size = int(request.query_params.get("page_size", 10))
 
-            # Base queryset for all students (used for stats and filter options)
-            base_profiles = Profile.objects.select_related("user").filter(
-                user__role="user"
-            )
-
-            # Get distinct grades and sections for filter dropdowns (from all students)
-            all_grades = (
-                base_profiles.exclude(grade__isnull=True)
-                .values_list("grade", flat=True)
-                .distinct()
-                .order_by("grade")
-            )
-            all_sections = (
-                base_profiles.exclude(section__isnull=True)
-                .exclude(section="")
-                .values_list("section", flat=True)
-                .distinct()
-                .order_by("section")
-            )
-            all_fields = (
-                base_profiles.exclude(field__isnull=True)
-                .exclude(field="")
-                .values_list("field", flat=True)
-                .distinct()
-                .order_by("field")
-            )
+            # Base queryset for all students
+            base_profiles = Profile.objects.select_related(
+                "user", "user__attendance_summary"
+            ).filter(user__role="user")
 
-            filter_options = {
-                "grades": list(all_grades),
-                "sections": list(all_sections),
-                "fields": list(all_fields),
-            }
-
-            # Now build the main queryset with annotations for the table
+            # Now build the main queryset from the precomputed attendance summary
             profiles = base_profiles.annotate(
-                total_sessions_attended=Count("user__attendances", distinct=True),
-                present_count=Count(
-                    "user__attendances",
-                    filter=Q(user__attendances__status="present"),
-                ),
-                late_count=Count(
-                    "user__attendances", filter=Q(user__attendances__status="late")
+                total_sessions_attended=Coalesce(
+                    "user__attendance_summary__total_count", 0
                 ),
-                absent_count=Count(
-                    "user__attendances",
-                    filter=Q(user__attendances__status="absent"),
-                ),
-                special_case_count=Count(
-                    "user__attendances",
-                    filter=Q(user__attendances__status="special_case"),
+                present_count=Coalesce("user__attendance_summary__present_count", 0),
+                late_count=Coalesce("user__attendance_summary__late_count", 0),
+                absent_count=Coalesce("user__attendance_summary__absent_count", 0),
+                special_case_count=Coalesce(
+                    "user__attendance_summary__special_case_count", 0
                 ),
             )
+            profiles = AttendanceSummary.annotate_recent(profiles)
 
             # Attendance percentage
             profiles = profiles.annotate(
@@ -185,14 +133,7 @@ class StudentsView(APIView):
 
             # Apply filters
             if search:
-                search_filter = (
-                    Q(user__full_name__icontains=search)
-                    | Q(user__email__icontains=search)
-                    | Q(grade__icontains=search)
-                    | Q(section__icontains=search)
-                    | Q(field__icontains=search)
-                )
-                profiles = profiles.filter(search_filter)
+                profiles = search_profiles(profiles, search)
 
             if grade:
                 try:
@@ -226,16 +167,34 @@ class StudentsView(APIView):
 
             sort_field = sort_by.lstrip("-")
             db_sort_field = sort_mapping.get(sort_field, "user__date_joined")
-            profiles = profiles.order_by(
-                f"-{db_sort_field}" if sort_by.startswith("-") else db_sort_field
-            )
 
             # Pagination
-            total_count = profiles.count()
-            total_pages = math.ceil(total_count / page_size) if page_size > 0 else 1
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-            paginated_profiles = profiles[start_index:end_index]
+            if KeysetPaginator.requested(request):
+                paginator = KeysetPaginator.from_request(
+                    request,
+                    profiles,
+                    sort_field=db_sort_field,
+                    descending=sort_by.startswith("-"),
+                )
+                paginated_profiles = paginator.paginate()
+                pagination = paginator.pagination_data()
+            else:
+                profiles = profiles.order_by(
+                    f"-{db_sort_field}" if sort_by.startswith("-") else db_sort_field
+                )
+                total_count = profiles.count()
+                total_pages = (
+                    math.ceil(total_count / page_size) if page_size > 0 else 1
+                )
+                start_index = (page - 1) * page_size
+                end_index = start_index + page_size
+                paginated_profiles = profiles[start_index:end_index]
+                pagination = {
+                    "current_page": page,
+                    "page_size": page_size,
+                    "total_count": total_count,
+                    "total_pages": total_pages,
+                }
 
             # Helper: calculate rating from percentage
             def get_attendance_rating(percentage):
@@ -249,30 +208,19 @@ class StudentsView(APIView):
                     return "poor"
                 return "No data"
 
+            profile_pic_urls = get_private_image_urls(
+                [profile.user.profile_pic_id for profile in paginated_profiles]
+            )
+
             students_data = []
             for profile in paginated_profiles:
                 user = profile.user
-                profile_pic_url, _ = cloudinary.utils.cloudinary_url(
-                    user.profile_pic_id,
-                    resource_type="image",
-                    type="authenticated",
-                    sign_url=True,
-                    secure=True,
-                )
+                profile_pic_url = profile_pic_urls.get(user.profile_pic_id)
 
-                last_attendance = user.attendances.order_by("-attended_at").first()
-                recent_attendance_30d = user.attendances.filter(
-                    attended_at__gte=timezone.now() - timedelta(days=30)
-                )
-                recent_total = recent_attendance_30d.filter(
-                    status__in=["present", "late", "absent", "special_case"]
-                ).count()
-                recent_present_late = recent_attendance_30d.filter(
-                    status__in=["present", "late"]
-                ).count()
+                summary = getattr(user, "attendance_summary", None)
                 recent_percentage = (
-                    (recent_present_late / recent_total * 100)
-                    if recent_total > 0
+                    (profile.recent_present_late / profile.recent_total * 100)
+                    if profile.recent_total > 0
                     else 0
                 )
 
@@ -299,67 +247,33 @@ class StudentsView(APIView):
                             "attendance_rating": attendance_rating,
                             "recent_percentage": round(recent_percentage, 2),
                             "last_attendance_date": (
-                                last_attendance.attended_at.isoformat()
-                                if last_attendance
+                                summary.last_attended_at.isoformat()
+                                if summary and summary.last_attended_at
                                 else None
                             ),
                             "last_attendance_status": (
-                                last_attendance.status if last_attendance else None
+                                summary.last_status if summary else None
                             ),
                         },
                     }
                 )
 
-            attendance_counts = Attendance.objects.aggregate(
-                total_present=Count("id", filter=Q(status="present")),
-                total_late=Count("id", filter=Q(status="late")),
-                total_absent=Count("id", filter=Q(status="absent")),
-                total_special_case=Count("id", filter=Q(status="special_case")),
-            )
-
-            total_records = (
-                attendance_counts["total_present"]
-                + attendance_counts["total_late"]
-                + attendance_counts["total_absent"]
-                + attendance_counts["total_special_case"]
-            )
-
-            average_attendance = (
-                (attendance_counts["total_present"] + attendance_counts["total_late"])
-                / total_records
-                * 100
-                if total_records > 0
-                else 0
-            )
-
-            active_students = Profile.objects.filter(
-                user__is_active=True, user__role="user"
-            ).count()
-            inactive_students = Profile.objects.filter(
-                user__is_active=False, user__role="user"
-            ).count()
-            total_students = User.objects.filter(role="user").count()
+            # Filter options and global stats only change on student/attendance
+            # writes, so they come from a versioned cache entry.
+            overview = get_students_overview()
 
             return Response(
                 {
                     "students": students_data,
-                    "pagination": {
-                        "current_page": page,
-                        "page_size": page_size,
-                        "total_count": total_count,
-                        "total_pages": total_pages,
-                    },
-                    "stats": {
-                        "attendance_avg": average_attendance,
-                        "total": total_students,
-                        "active": active_students,
-                        "inactive": inactive_students,
-                    },
-                    "filter_options": filter_options,
+                    "pagination": pagination,
+                    "stats": overview["stats"],
+                    "filter_options": overview["filter_options"],
                 },
                 status=status.HTTP_200_OK,
             )
 
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             import traceback
 
@@ -376,11 +290,8 @@ class TopLearningTasks(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, boundary):
-        top_tasks = LearningTask.objects.annotate(
-            admin_rating=Avg("reviews__rating", filter=Q(reviews__is_admin=True)),
-            likes_count=Count("likes", distinct=True),
-        ).order_by("-admin_rating", "-likes_count")[:boundary]
-        top_learning_tasks = LearningTaskSerializer(top_tasks, many=True)
+        top_tasks = get_top_tasks(boundary)
+        top_learning_tasks = LearningTaskSummarySerializer(top_tasks, many=True)
         return Response({"top_learning_tasks": top_learning_tasks.data})
 
 
@@ -534,13 +445,7 @@ class StudentDetailView(APIView):
             profile_pic_url = None
             if user.profile_pic_id:
                 try:
-                    profile_pic_url, _ = cloudinary.utils.cloudinary_url(
-                        user.profile_pic_id,
-                        resource_type="image",
-                        type="authenticated",
-                        sign_url=True,
-                        secure=True,
-                    )
+                    profile_pic_url = get_private_image_url(user.profile_pic_id)
                 except Exception:
                     profile_pic_url = None
 
@@ -593,22 +498,11 @@ class StudentDetailView(APIView):
             }
 
             tasks_qs = LearningTask.objects.filter(user=user).exclude(status="draft")
-            for task in tasks_qs:
-                print(task.title)
 
             total_tasks_created = tasks_qs.count()
 
-            # Admin rating only + bonus
-            total_rating = 0
-            for task in tasks_qs.prefetch_related("reviews", "bonuses"):
-                admin_review = task.reviews.filter(is_admin=True).first()
-                task_bonus = getattr(task, "bonuses", None)
-                task_score = 0
-                if admin_review:
-                    task_score += admin_review.rating
-                if task_bonus:
-                    task_score += task_bonus.score
-                total_rating += task_score
+            # Admin rating + bonus, kept materialised per student
+            total_rating = StudentScore.for_user(user).score
 
             task_limit, _ = LearningTaskLimit.objects.get_or_create(user=user)
             task_limit_data = LearningTaskLimitSerializer(task_limit).data
@@ -862,271 +756,319 @@ class StudentsBulkUploadView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
     LEARNING_TASK_LIMIT_DEFAULT = 20
     FIELD_LIST = ["ai", "other", "backend", "frontend", "embedded", "cyber"]
-
-    def post(self, request):
+    REQUIRED_COLUMNS = [
+        "full_name",
+        "email",
+        "grade",
+        "section",
+        "field",
+        "gender",
+        "phone_number",
+    ]
+    BATCH_SIZE = 1000
+
+    def _csv_rows(self, reader):
+        # DictReader skips blank lines; line_num still counts them. A quoted
+        # value spanning lines makes it the record's last line.
+        for row in reader:
+            yield reader.line_num, row
+
+    def _xlsx_rows(self, wb, rows, headers):
         try:
-            if "file" not in request.FILES:
-                return Response(
-                    {"error": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST
-                )
+            # Numbered before blank rows are dropped, to match the sheet
+            for row_number, row in enumerate(rows, start=2):
+                # read-only sheets often report trailing blank rows
+                if all(value in (None, "") for value in row):
+                    continue
+                yield row_number, dict(zip(headers, row))
+        finally:
+            wb.close()
+
+    def _read_rows(self, file, file_extension):
+        """
+        Returns (headers, rows) where rows is a lazy iterator of
+        (row_number, dict) pairs, so the upload is parsed one row at a time
+        instead of being loaded up front. Rows are numbered as in the file,
+        the header being row 1.
+        """
+        if file_extension == "csv":
+            text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+            reader = csv.DictReader(text)
+            return reader.fieldnames or [], self._csv_rows(reader)
+
+        wb = load_workbook(file, read_only=True, data_only=True)
+        rows = wb.active.iter_rows(values_only=True)
+        headers = list(next(rows, ()))
+        return headers, self._xlsx_rows(wb, rows, headers)
+
+    def _clean_row(self, row):
+        def value(key, default=""):
+            raw = row.get(key, default)
+            return "" if raw is None else str(raw).strip()
+
+        email = value("email").lower()
+        full_name = value("full_name")
+        grade_str = value("grade")
+        section = value("section").upper()
+        field = value("field").lower()
+        phone_number = value("phone_number")
+        account = value("account")
+        gender = value("gender", "male").lower()
+
+        row_errors = {}
+        grade = None
+
+        if gender not in ["male", "female"]:
+            row_errors["gender"] = ["Invalid gender"]
+
+        if not email:
+            row_errors["email"] = ["Email is required"]
+        else:
+            try:
+                validate_email(email)
+            except ValidationError:
+                row_errors["email"] = ["Invalid email format"]
 
-            file = request.FILES["file"]
-            file_extension = file.name.split(".")[-1].lower()
+        if not full_name:
+            row_errors["full_name"] = ["Full name is required"]
 
-            # ---------- READ FILE WITHOUT PANDAS ----------
+        if not grade_str:
+            row_errors["grade"] = ["Grade is required"]
+        else:
             try:
-                if file_extension == "csv":
-                    decoded = file.read().decode("utf-8")
-                    reader = csv.DictReader(io.StringIO(decoded))
-                    rows = list(reader)
-                    df = SimpleDataFrame(rows, reader.fieldnames)
-
-                elif file_extension in ["xlsx", "xls"]:
-                    wb = load_workbook(file)
-                    sheet = wb.active
+                grade = int(float(grade_str))
+                if grade < 1 or grade > 12:
+                    row_errors["grade"] = ["Grade must be between 1 and 12"]
+            except (ValueError, TypeError):
+                row_errors["grade"] = ["Grade must be a valid number"]
+
+        if not section:
+            row_errors["section"] = ["Section is required"]
+        elif len(section) != 1 or not section.isalpha():
+            row_errors["section"] = ["Section must be a single letter (A-Z)"]
+
+        if not field:
+            row_errors["field"] = ["Field is required"]
+        elif field not in self.FIELD_LIST:
+            row_errors["field"] = [f"'{field}' is invalid field name."]
+
+        if not phone_number:
+            row_errors["phone_number"] = ["Phone number is required"]
+
+        record = {
+            "email": email,
+            "full_name": full_name,
+            "grade": grade,
+            "section": section,
+            "field": field,
+            "phone_number": phone_number,
+            "account": account if account and account != "N/A" else None,
+            "gender": gender,
+        }
+        return record, row_errors
 
-                    headers = [cell.value for cell in sheet[1]]
-                    rows = []
-                    for row in sheet.iter_rows(min_row=2, values_only=True):
-                        row_dict = dict(zip(headers, row))
-                        rows.append(row_dict)
+    def import_file(self, file, progress=None):
+        """
+        Validates and imports an uploaded roster, returning the Response to
+        send back. Shared by the request handler and the background job.
+        """
+        file_extension = file.name.split(".")[-1].lower()
 
-                    df = SimpleDataFrame(rows, headers)
+        if file_extension not in ["csv", "xlsx", "xls"]:
+            return Response(
+                {"error": "Unsupported file format. Use CSV or Excel"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-                else:
-                    return Response(
-                        {"error": "Unsupported file format. Use CSV or Excel"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-            except Exception as e:
-                return Response(
-                    {"error": f"Failed to read file: {str(e)}"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        # ---------- VALIDATE (SINGLE STREAMING PASS) ----------
+        records = []
+        errors = []
+        rows_by_email = {}
 
-            # ---------- VALIDATE REQUIRED COLUMNS ----------
-            required_columns = [
-                "full_name",
-                "email",
-                "grade",
-                "section",
-                "field",
-                "gender",
-                "phone_number",
-            ]
-            missing_columns = [col for col in required_columns if col not in df.columns]
+        try:
+            headers, rows = self._read_rows(file, file_extension)
 
+            missing_columns = [col for col in self.REQUIRED_COLUMNS if col not in headers]
             if missing_columns:
                 return Response(
                     {
                         "error": f"Missing required columns: {', '.join(missing_columns)}",
-                        "required_columns": required_columns,
+                        "required_columns": self.REQUIRED_COLUMNS,
                     },
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            created_students = []
-            errors = []
-            users_to_create = []
-            profiles_to_create = []
-            learning_task_limits_to_create = []
-
-            emails_in_file = set()
-            duplicate_emails_in_file = set()
-
-            # ---------- FIRST PASS: VALIDATION ----------
-            for index, row in df.iterrows():
-                row_errors = {}
-
-                email = str(row["email"]).strip().lower()
-                full_name = str(row.get("full_name", "")).strip()
-                grade_str = str(row.get("grade", "")).strip()
-                section = str(row.get("section", "")).strip().upper()
-                field = str(row.get("field", "")).strip().lower()
-                phone_number = str(row.get("phone_number", "")).strip()
-                account = str(row.get("account", "")).strip()
-                gender = str(row.get("gender", "male")).strip().lower()
-
-                if gender not in ["male", "female"]:
-                    row_errors["gender"] = ["Invalid gender"]
-
-                if email in emails_in_file:
-                    duplicate_emails_in_file.add(email)
-                emails_in_file.add(email)
-
-                if not email:
-                    row_errors["email"] = ["Email is required"]
-                else:
-                    try:
-                        validate_email(email)
-                    except ValidationError:
-                        row_errors["email"] = ["Invalid email format"]
-
-                if not full_name:
-                    row_errors["full_name"] = ["Full name is required"]
-
-                if not grade_str:
-                    row_errors["grade"] = ["Grade is required"]
-                else:
-                    try:
-                        grade = int(float(grade_str))
-                        if grade < 1 or grade > 12:
-                            row_errors["grade"] = ["Grade must be between 1 and 12"]
-                    except (ValueError, TypeError):
-                        row_errors["grade"] = ["Grade must be a valid number"]
-
-                if not section:
-                    row_errors["section"] = ["Section is required"]
-                elif len(section) != 1 or not section.isalpha():
-                    row_errors["section"] = ["Section must be a single letter (A-Z)"]
-
-                if not field:
-                    row_errors["field"] = ["Field is required"]
-                elif field not in self.FIELD_LIST:
-                    row_errors["field"] = [f"'{field}' is invalid field name."]
-
-                if not phone_number:
-                    row_errors["phone_number"] = ["Phone number is required"]
+            for row_number, row in rows:
+                record, row_errors = self._clean_row(row)
+                rows_by_email.setdefault(record["email"], []).append(row_number)
 
                 if row_errors:
                     errors.append(
-                        {"row": index + 1, "email": email, "errors": row_errors}
+                        {
+                            "row": row_number,
+                            "email": record["email"],
+                            "errors": row_errors,
+                        }
                     )
+                elif not errors:
+                    # Once a row fails nothing gets created, so stop
+                    # keeping the cleaned records around.
+                    records.append(record)
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to read file: {str(e)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            if duplicate_emails_in_file:
-                for index, row in df.iterrows():
-                    email = str(row["email"]).strip().lower()
-                    if email in duplicate_emails_in_file:
-                        errors.append(
-                            {
-                                "row": index + 1,
-                                "email": email,
-                                "errors": {"email": ["Duplicate email in the file"]},
-                            }
-                        )
+        duplicate_rows = sorted(
+            (row_number, email)
+            for email, row_numbers in rows_by_email.items()
+            if len(row_numbers) > 1
+            for row_number in row_numbers
+        )
+        for row_number, email in duplicate_rows:
+            errors.append(
+                {
+                    "row": row_number,
+                    "email": email,
+                    "errors": {"email": ["Duplicate email in the file"]},
+                }
+            )
 
-            if errors:
-                return Response(
-                    {
-                        "error": "Validation failed for some rows",
-                        "created_count": 0,
-                        "created_students": [],
-                        "error_count": len(errors),
-                        "errors": errors,
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        if errors:
+            return Response(
+                {
+                    "error": "Validation failed for some rows",
+                    "created_count": 0,
+                    "created_students": [],
+                    "error_count": len(errors),
+                    "errors": errors,
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            # ---------- SECOND PASS: CREATE USERS ----------
-            with transaction.atomic():
-                existing_emails = set(
-                    User.objects.filter(
-                        email__in=[
-                            str(row["email"]).strip().lower()
-                            for _, row in df.iterrows()
-                        ]
-                    ).values_list("email", flat=True)
+        # ---------- CREATE USERS IN BATCHES ----------
+        if progress:
+            progress(10, f"Validated {len(records)} rows")
+
+        created_students = []
+        row_numbers = {email: numbers[0] for email, numbers in rows_by_email.items()}
+        del rows_by_email
+
+        with transaction.atomic():
+            existing_emails = set()
+            for start in range(0, len(records), self.BATCH_SIZE):
+                batch_emails = [
+                    record["email"]
+                    for record in records[start : start + self.BATCH_SIZE]
+                ]
+                existing_emails.update(
+                    User.objects.filter(email__in=batch_emails).values_list(
+                        "email", flat=True
+                    )
                 )
 
-                for index, row in df.iterrows():
-                    email = str(row["email"]).strip().lower()
-                    full_name = str(row.get("full_name", "")).strip()
-                    gender = str(row.get("gender", "male")).strip().lower()
-
-                    if email in existing_emails:
-                        errors.append(
-                            {
-                                "row": index + 1,
-                                "email": email,
-                                "error": "User with this email already exists in the database",
-                            }
-                        )
-                        continue
+            new_records = []
+            for record in records:
+                if record["email"] in existing_emails:
+                    errors.append(
+                        {
+                            "row": row_numbers[record["email"]],
+                            "email": record["email"],
+                            "error": "User with this email already exists in the database",
+                        }
+                    )
+                else:
+                    new_records.append(record)
 
-                    user = User(
-                        email=email,
-                        full_name=full_name,
-                        is_active=True,
-                        role="user",
-                        gender=gender,  # ← gender now goes to User
+            for start in range(0, len(new_records), self.BATCH_SIZE):
+                if progress:
+                    progress(
+                        10 + start * 90 / len(new_records),
+                        f"Created {start} of {len(new_records)} students",
                     )
-                    users_to_create.append(user)
-
-                if users_to_create:
-                    created_users = User.objects.bulk_create(users_to_create)
-
-                    user_dict = {user.email: user for user in created_users}
-
-                    for index, row in df.iterrows():
-                        email = str(row["email"]).strip().lower()
-                        if email in user_dict:
-                            user = user_dict[email]
-                            grade_str = str(row.get("grade", "")).strip()
-                            section = str(row.get("section", "")).strip().upper()
-                            field = str(row.get("field", "")).strip()
-                            phone_number = str(row.get("phone_number", "")).strip()
-                            account = str(row.get("account", "")).strip()
-
-                            profile = Profile(
-                                user=user,
-                                grade = int(float(grade_str)),
-                                section=section.upper(),
-                                field=field.lower(),
-                                account=(
-                                    account if account and account != "N/A" else None
-                                ),
-                                phone_number=phone_number,
-                            )
-                            profiles_to_create.append(profile)
-
-                            learning_task_limit = LearningTaskLimit(
-                                user=user, limit=self.LEARNING_TASK_LIMIT_DEFAULT
-                            )
-                            learning_task_limits_to_create.append(learning_task_limit)
-
-                    if profiles_to_create:
-                        Profile.objects.bulk_create(profiles_to_create)
-
-                    if learning_task_limits_to_create:
-                        LearningTaskLimit.objects.bulk_create(
-                            learning_task_limits_to_create
-                        )
+                batch = new_records[start : start + self.BATCH_SIZE]
 
-                    for user in created_users:
-                        profile = next(
-                            (p for p in profiles_to_create if p.user_id == user.id),
-                            None,
+                created_users = User.objects.bulk_create(
+                    [
+                        User(
+                            email=record["email"],
+                            full_name=record["full_name"],
+                            is_active=True,
+                            role="user",
+                            gender=record["gender"],
                         )
-                        created_students.append(
-                            {
-                                "id": user.id,
-                                "full_name": user.full_name,
-                                "email": user.email,
-                                "grade": profile.grade if profile else None,
-                                "section": profile.section if profile else None,
-                                "field": profile.field if profile else None,
-                                "account": profile.account if profile else "N/A",
-                                "phone_number": (
-                                    profile.phone_number if profile else None
-                                ),
-                                "gender": user.gender,  # ← from User
-                                "learning_task_limit": self.LEARNING_TASK_LIMIT_DEFAULT,
-                                "message": "Please change your password on first login",
-                            }
+                        for record in batch
+                    ]
+                )
+
+                # bulk_create returns the users in input order, so each
+                # one lines up with the record it was built from.
+                profiles = []
+                limits = []
+                for user, record in zip(created_users, batch):
+                    profiles.append(
+                        Profile(
+                            user=user,
+                            grade=record["grade"],
+                            section=record["section"],
+                            field=record["field"],
+                            account=record["account"],
+                            phone_number=record["phone_number"],
                         )
+                    )
+                    limits.append(
+                        LearningTaskLimit(user=user, limit=self.LEARNING_TASK_LIMIT_DEFAULT)
+                    )
+                    created_students.append(
+                        {
+                            "id": user.id,
+                            "full_name": user.full_name,
+                            "email": user.email,
+                            "grade": record["grade"],
+                            "section": record["section"],
+                            "field": record["field"],
+                            "account": record["account"],
+                            "phone_number": record["phone_number"],
+                            "gender": user.gender,
+                            "learning_task_limit": self.LEARNING_TASK_LIMIT_DEFAULT,
+                            "message": "Please change your password on first login",
+                        }
+                    )
 
-            response_data = {
-                "created_count": len(created_students),
-                "created_students": created_students,
-                "error_count": len(errors),
-                "errors": errors,
-                "learning_task_limit_default": self.LEARNING_TASK_LIMIT_DEFAULT,
-            }
+                Profile.objects.bulk_create(profiles)
+                LearningTaskLimit.objects.bulk_create(limits)
 
-            status_code = (
-                status.HTTP_207_MULTI_STATUS if errors else status.HTTP_201_CREATED
-            )
-            return Response(response_data, status=status_code)
+            if new_records:
+                # bulk_create bypasses the model signals
+                transaction.on_commit(invalidate_students_overview)
+                transaction.on_commit(invalidate_student_search)
+
+        response_data = {
+            "created_count": len(created_students),
+            "created_students": created_students,
+            "error_count": len(errors),
+            "errors": errors,
+            "learning_task_limit_default": self.LEARNING_TASK_LIMIT_DEFAULT,
+        }
+
+        status_code = status.HTTP_207_MULTI_STATUS if errors else status.HTTP_201_CREATED
+        return Response(response_data, status=status_code)
+
+    def post(self, request):
+        try:
+            if "file" not in request.FILES:
+                return Response(
+                    {"error": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST
+                )
+
+            file = request.FILES["file"]
+
+            if wants_async(request):
+                job = Job.enqueue("students_bulk_upload", request.user, input_file=file)
+                return accepted_response(job)
+
+            return self.import_file(file)
 
         except Exception as e:
             import traceback
@@ -1138,105 +1080,197 @@ class StudentsBulkUploadView(APIView):
             )
 
 
+class _Echo:
+    """File-like object whose write() hands the value back, for streaming csv."""
+
+    def write(self, value):
+        return value
+
+
+# Daphne reads a sync streaming iterator to the end before sending anything,
+# so exports are streamed from async generators instead.
+CSV_STREAM_ROWS = 500
+
+
+async def _stream_csv(rows):
+    """Yields `rows` as CSV text, fetching CSV_STREAM_ROWS rows at a time."""
+    writer = csv.writer(_Echo())
+    rows = iter(rows)
+    # Thread-sensitive, so the queryset iterator stays on one connection
+    next_chunk = sync_to_async(lambda: list(islice(rows, CSV_STREAM_ROWS)))
+    while chunk := await next_chunk():
+        yield "".join(writer.writerow(row) for row in chunk)
+
+
 class StudentsExportView(APIView):
 
     authentication_classes = [JWTCookieAuthentication]
     permission_classes = [IsAuthenticated, IsAdminUser]
 
-    def get(self, request):
-        try:
-            # Get query parameters for filtering
-            search = request.query_params.get("search", "").strip()
-            grade = request.query_params.get("grade", "").strip()
-            section = request.query_params.get("section", "").strip()
-            account_status = request.query_params.get("account_status", "").strip()
-
-            # Get filtered students
-            profiles = Profile.objects.select_related("user").filter(
-                user__role="user", user__is_deleted=False
-            )
+    EXPORT_CHUNK_SIZE = 2000
+    EXPORT_HEADERS = [
+        "Full Name",
+        "Email",
+        "Grade",
+        "Section",
+        "Field",
+        "Account",
+        "Phone Number",
+        "Gender",
+        "Account Status",
+        "Created At",
+        "Last Login",
+        "Date Joined",
+    ]
+
+    XLSX_CONTENT_TYPE = (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
+    def filter_profiles(self, params):
+        search = params.get("search", "").strip()
+        grade = params.get("grade", "").strip()
+        section = params.get("section", "").strip()
+        account_status = params.get("account_status", "").strip()
+
+        profiles = Profile.objects.select_related("user").filter(
+            user__role="user", user__is_deleted=False
+        )
 
-            if search:
-                profiles = profiles.filter(
-                    Q(user__full_name__icontains=search)
-                    | Q(user__email__icontains=search)
-                    | Q(grade__icontains=search)
-                    | Q(section__icontains=search)
-                )
+        if search:
+            profiles = search_profiles(profiles, search)
 
-            if grade:
-                try:
-                    grade_int = int(grade)
-                    profiles = profiles.filter(grade=grade_int)
-                except ValueError:
-                    pass
+        if grade:
+            try:
+                grade_int = int(grade)
+                profiles = profiles.filter(grade=grade_int)
+            except ValueError:
+                pass
 
-            if section:
-                profiles = profiles.filter(section=section)
+        if section:
+            profiles = profiles.filter(section=section)
 
-            if account_status:
-                if account_status == "active":
-                    profiles = profiles.filter(user__is_active=True)
-                elif account_status == "inactive":
-                    profiles = profiles.filter(user__is_active=False)
+        if account_status:
+            if account_status == "active":
+                profiles = profiles.filter(user__is_active=True)
+            elif account_status == "inactive":
+                profiles = profiles.filter(user__is_active=False)
 
-            # ---------- PREPARE EXCEL ----------
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Students"
-
-            # Column headers
-            headers = [
-                "Full Name",
-                "Email",
-                "Grade",
-                "Section",
-                "Field",
-                "Account",
-                "Phone Number",
-                "Gender",
-                "Account Status",
-                "Created At",
-                "Last Login",
-                "Date Joined",
+        return profiles
+
+    def _export_rows(self, profiles, progress=None):
+        date_format = "%Y-%m-%d %H:%M:%S"
+        total = profiles.count() if progress else 0
+        rows = profiles.values_list(
+            "user__full_name",
+            "user__email",
+            "grade",
+            "section",
+            "field",
+            "account",
+            "phone_number",
+            "user__gender",
+            "user__is_active",
+            "created_at",
+            "user__last_login",
+            "user__date_joined",
+        ).iterator(chunk_size=self.EXPORT_CHUNK_SIZE)
+
+        for index, (
+            full_name,
+            email,
+            grade,
+            section,
+            field,
+            account,
+            phone_number,
+            gender,
+            is_active,
+            created_at,
+            last_login,
+            date_joined,
+        ) in enumerate(rows):
+            if progress and index % self.EXPORT_CHUNK_SIZE == 0:
+                progress(index * 100 / total, f"Exported {index} of {total} students")
+
+            yield [
+                full_name,
+                email,
+                grade or "",
+                section or "",
+                field or "",
+                account or "",
+                phone_number or "",
+                gender or "",
+                "Active" if is_active else "Inactive",
+                created_at.strftime(date_format),
+                last_login.strftime(date_format) if last_login else "",
+                date_joined.strftime(date_format),
             ]
-            ws.append(headers)
 
-            # Data rows
-            for profile in profiles:
-                ws.append(
-                    [
-                        profile.user.full_name,
-                        profile.user.email,
-                        profile.grade or "",
-                        profile.section or "",
-                        profile.field or "",
-                        profile.account or "",
-                        profile.phone_number or "",
-                        profile.user.gender or "",
-                        "Active" if profile.user.is_active else "Inactive",
-                        profile.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                        (
-                            profile.user.last_login.strftime("%Y-%m-%d %H:%M:%S")
-                            if profile.user.last_login
-                            else ""
-                        ),
-                        profile.user.date_joined.strftime("%Y-%m-%d %H:%M:%S"),
-                    ]
+    def write_xlsx(self, profiles, output, progress=None):
+        # Write-only workbooks keep a single row in memory
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Students")
+        ws.append(self.EXPORT_HEADERS)
+        for row in self._export_rows(profiles, progress):
+            ws.append(row)
+        wb.save(output)
+
+    def export_file(self, params, output, progress=None):
+        """
+        Writes the export to the binary file `output` and returns
+        (filename, content_type); used by the background job.
+        """
+        profiles = self.filter_profiles(params)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        if params.get("file_format", "xlsx").lower() == "csv":
+            text = io.TextIOWrapper(output, encoding="utf-8", newline="")
+            writer = csv.writer(text)
+            writer.writerow(self.EXPORT_HEADERS)
+            writer.writerows(self._export_rows(profiles, progress))
+            # Leaves `output` open for the caller
+            text.detach()
+            return f"students_export_{timestamp}.csv", "text/csv; charset=utf-8"
+
+        self.write_xlsx(profiles, output, progress)
+        return f"students_export_{timestamp}.xlsx", self.XLSX_CONTENT_TYPE
+
+    def get(self, request):
+        try:
+            if wants_async(request):
+                job = Job.enqueue(
+                    "students_export", request.user, params=request.query_params.dict()
                 )
+                return accepted_response(job)
 
-            # Save to BytesIO
-            output = BytesIO()
-            wb.save(output)
-            output.seek(0)
+            profiles = self.filter_profiles(request.query_params)
 
+            export_format = request.query_params.get("file_format", "xlsx").lower()
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"students_export_{timestamp}.xlsx"
 
-            response = HttpResponse(
-                output.getvalue(),
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
+            if export_format == "csv":
+                response = StreamingHttpResponse(
+                    _stream_csv(
+                        chain([self.EXPORT_HEADERS], self._export_rows(profiles))
+                    ),
+                    content_type="text/csv; charset=utf-8",
+                )
+                filename = f"students_export_{timestamp}.csv"
+            else:
+                # The file is spooled to disk and streamed back in blocks
+                output = tempfile.TemporaryFile()
+                self.write_xlsx(profiles, output)
+                size = output.tell()
+                output.seek(0)
+
+                response = StreamingHttpResponse(
+                    stream_file(output), content_type=self.XLSX_CONTENT_TYPE
+                )
+                response["Content-Length"] = size
+                filename = f"students_export_{timestamp}.xlsx"
+
             response["Content-Disposition"] = f'attachment; filename="{filename}"'
 
             return response
@@ -1582,9 +1616,14 @@ class DeleteLearningTaskView(APIView):
         try:
             task = LearningTask.objects.get(id=task_id)
             user = task.user
-            task_limit = LearningTaskLimit.objects.get(user=user)
 
             with transaction.atomic():
+                # Only the request that removed the row hands the slot back
+                _, deleted = LearningTask.objects.filter(id=task.id, user=user).delete()
+                if not deleted.get(LearningTask._meta.label):
+                    raise LearningTask.DoesNotExist
+                if not LearningTaskLimit.release(user):
+                    raise LearningTaskLimit.DoesNotExist
                 async_to_sync(notify_user)(
                     recipient=task.user,
                     actor=user,
@@ -1593,8 +1632,6 @@ class DeleteLearningTaskView(APIView):
                     code="info",
                     is_push_notif=True,
                 )
-                task.delete()
-                task_limit.deleted()
 
             return Response(
                 {"message": "Task deleted successfully."},
@@ -1627,7 +1664,7 @@ class DeleteTaskReviewView(APIView):
             with transaction.atomic():
                 if task_review.is_admin:
                     task.status = "under_review"
-                    task.save()
+                    task.save(update_fields=["status", "updated_at"])
                 task_review.delete()
             return Response(
                 {"message": "Task review deleted successfully."},
@@ -1704,45 +1741,73 @@ class TaskLimitView(APIView):
 
         user_ids = list(users.values_list("id", flat=True))
 
-        limits = LearningTaskLimit.objects.filter(user_id__in=user_ids)
-
-        for limit_obj in limits:
-            if operation == "set":
-                limit_obj.limit = value
-            elif operation == "increment":
-                limit_obj.limit += value
-            elif operation == "decrement":
-                limit_obj.limit = max(limit_obj.limit - value, 0)
-        users_list = list(users)
-
         with transaction.atomic():
-            async_to_sync(notify_users_bulk)(
-                recipients=users_list,
-                actor=request.user,
-                title="Task limit updated",
-                description="Your task limit has been updated.",
-                code="info",
-                is_push_notif=True,
-            )
+            if operation == "set":
+                # One upsert covers both existing and missing limit rows
+                LearningTaskLimit.objects.bulk_create(
+                    [LearningTaskLimit(user_id=uid, limit=value) for uid in user_ids],
+                    update_conflicts=True,
+                    unique_fields=["user"],
+                    update_fields=["limit"],
+                )
+            else:
+                # Users without a limit row start from zero
+                missing = users.filter(task_limit__isnull=True).values_list(
+                    "id", flat=True
+                )
+                LearningTaskLimit.objects.bulk_create(
+                    [LearningTaskLimit(user_id=uid, limit=0) for uid in missing],
+                    ignore_conflicts=True,
+                )
+                if operation == "increment":
+                    new_limit = F("limit") + value
+                else:
+                    new_limit = Greatest(F("limit") - value, 0)
+                LearningTaskLimit.objects.filter(user__in=users).update(limit=new_limit)
 
-            LearningTaskLimit.objects.bulk_update(limits, ["limit"])
+            # Written in this transaction; pushed once it commits
+            self.notify_users(users, request.user)
 
         return Response(
             {
                 "message": "Task limits updated successfully.",
                 "affected_users": user_ids,
-                "total_users": len(users_list),
+                "total_users": len(user_ids),
             },
             status=status.HTTP_200_OK,
         )
 
+    @staticmethod
+    def notify_users(users, actor):
+        async_to_sync(notify_users_bulk)(
+            recipients=list(users.filter(notif_enabled=True)),
+            actor=actor,
+            title="Task limit updated",
+            description="Your task limit has been updated.",
+            code="info",
+            is_push_notif=True,
+        )
+
 
 class GetAllUsersView(APIView):
     authentication_classes = [JWTCookieAuthentication]
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        users = Profile.objects.filter(user__role="user")
+        users = Profile.objects.select_related("user").filter(user__role="user")
+
+        if KeysetPaginator.requested(request):
+            paginator = KeysetPaginator.from_request(request, users)
+            try:
+                page = paginator.paginate()
+            except InvalidCursor as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            serializer = ProfileSerializer(page, many=True)
+            return Response(
+                {"users": serializer.data, "pagination": paginator.pagination_data()},
+                status=status.HTTP_200_OK,
+            )
+
         if not users.exists():
             return Response(
                 {"warning": "No user found."}, status=status.HTTP_400_BAD_REQUEST
@@ -1791,11 +1856,8 @@ class DashboardView(APIView):
         }
 
         boundary = int(request.query_params.get("boundary", 10))
-        top_tasks = LearningTask.objects.annotate(
-            admin_rating=Avg("reviews__rating", filter=Q(reviews__is_admin=True)),
-            likes_count=Count("likes", distinct=True),
-        ).order_by("-admin_rating", "-likes_count")[:boundary]
-        top_learning_tasks = LearningTaskSerializer(top_tasks, many=True).data
+        top_tasks = get_top_tasks(boundary)
+        top_learning_tasks = LearningTaskSummarySerializer(top_tasks, many=True).data
 
         response_data = {
             "gender_counts": gender_counts,
@@ -2132,199 +2194,101 @@ class GradesRankExportPdfView(APIView):
             else text[: self.MAX_TEXT_LENGTH - 3] + "..."
         )
 
-    def get(self, request):
-        try:
-            # ----------------------------
-            # Filters
-            # ----------------------------
-            search = request.query_params.get("search", "").strip()
-            grade_q = request.query_params.get("grade", "").strip()
-            section_q = request.query_params.get("section", "").strip()
-            field_q = request.query_params.get("field", "").strip()
-            account_status = request.query_params.get("account_status", "").strip()
-
-            profiles = Profile.objects.select_related("user").filter(
-                user__role="user",
-                user__is_deleted=False,
-            )
-
-            if search:
-                profiles = profiles.filter(
-                    Q(user__full_name__icontains=search)
-                    | Q(user__email__icontains=search)
-                    | Q(grade__icontains=search)
-                    | Q(section__icontains=search)
-                    | Q(field__icontains=search)
-                )
-
-            if grade_q:
-                try:
-                    profiles = profiles.filter(grade=int(grade_q))
-                except ValueError:
-                    pass
-
-            if section_q:
-                profiles = profiles.filter(section=section_q)
-
-            if field_q:
-                profiles = profiles.filter(field=field_q)
-
-            if account_status == "active":
-                profiles = profiles.filter(user__is_active=True)
-            elif account_status == "inactive":
-                profiles = profiles.filter(user__is_active=False)
-
-            # ----------------------------
-            # Score Annotation (Fast DB Aggregation)
-            # ----------------------------
-            annotated_qs = (
-                profiles.annotate(
-                    reviews_sum=Coalesce(
-                        Sum(
-                            "user__learningtask__reviews__rating",
-                            filter=Q(user__learningtask__reviews__is_admin=True),
-                        ),
-                        0,
-                    ),
-                    bonus_sum=Coalesce(
-                        Sum("user__learningtask__bonuses__score"),
-                        0,
-                    ),
-                )
-                .annotate(score=F("reviews_sum") + F("bonus_sum"))
-                .order_by("-score", "user__full_name")
-                .values(
-                    "user__full_name",
-                    "grade",
-                    "section",
-                    "field",
-                    "score",
-                )
-            )
-
-            rows = list(annotated_qs)
-
-            # ----------------------------
-            # Dense Ranking
-            # ----------------------------
-            result_rows = []
-            prev_score = None
-            rank = 0
-
-            for idx, row in enumerate(rows, start=1):
-                score = int(row["score"]) if row["score"] else 0
-
-                if prev_score is None or score != prev_score:
-                    rank += 1
-                    prev_score = score
+    def build_pdf(self, params, progress=None):
+        # ----------------------------
+        # Filters
+        # ----------------------------
+        search = params.get("search", "").strip()
+        grade_q = params.get("grade", "").strip()
+        section_q = params.get("section", "").strip()
+        field_q = params.get("field", "").strip()
+        account_status = params.get("account_status", "").strip()
+
+        profiles = Profile.objects.select_related("user").filter(
+            user__role="user",
+            user__is_deleted=False,
+        )
 
-                result_rows.append(
-                    [
-                        str(idx),
-                        self.truncate(row["user__full_name"]),
-                        row["grade"] or "",
-                        row["section"] or "",
-                        row["field"] or "",
-                        str(score),
-                        str(rank),
-                    ]
-                )
+        if search:
+            profiles = search_profiles(profiles, search)
 
-            # ----------------------------
-            # Build PDF
-            # ----------------------------
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=A4,
-                rightMargin=30,
-                leftMargin=30,
-                topMargin=30,
-                bottomMargin=30,
-            )
+        if grade_q:
+            try:
+                profiles = profiles.filter(grade=int(grade_q))
+            except ValueError:
+                pass
+
+        if section_q:
+            profiles = profiles.filter(section=section_q)
+
+        if field_q:
+            profiles = profiles.filter(field=field_q)
+
+        if account_status == "active":
+            profiles = profiles.filter(user__is_active=True)
+        elif account_status == "inactive":
+            profiles = profiles.filter(user__is_active=False)
+
+        # ----------------------------
+        # Scores + Dense Ranking (materialised per student)
+        # ----------------------------
+        rows = rank_profiles(profiles).values(
+            "user__full_name",
+            "grade",
+            "section",
+            "field",
+            "score",
+            "rank",
+        )
 
-            elements = []
-            styles = getSampleStyleSheet()
+        result_rows = [
+            [
+                str(idx),
+                self.truncate(row["user__full_name"]),
+                row["grade"] or "",
+                row["section"] or "",
+                row["field"] or "",
+                str(row["score"]),
+                str(row["rank"]),
+            ]
+            for idx, row in enumerate(rows, start=1)
+        ]
 
-            # Title
-            elements.append(
-                Paragraph("<b>Student Score Ranking Report</b>", styles["Title"])
-            )
-            elements.append(Spacer(1, 0.2 * inch))
+        if progress:
+            progress(50, f"Rendering {len(result_rows)} rows")
 
-            # Metadata
-            metadata_lines = [
+        pdf = render_table_report(
+            "Student Score Ranking Report",
+            [
                 f"Total Students: {len(result_rows)}",
                 f"Exported At: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            ]
-
-            for line in metadata_lines:
-                elements.append(Paragraph(line, styles["Normal"]))
-
-            elements.append(Spacer(1, 0.4 * inch))
-
-            # ----------------------------
-            # Table Setup (90% Width)
-            # ----------------------------
-            table_data = [
-                ["#", "Full Name", "Grade", "Section", "Field", "Score", "Rank"]
-            ] + result_rows
-
-            wrapped_data = [
-                [Paragraph(str(cell), styles["Normal"]) for cell in row]
-                for row in table_data
-            ]
-
-            available_width = doc.width
-            table_width = available_width * 0.90  # EXACT 90%
-
-            col_widths = [
-                table_width * 0.06,  # #
-                table_width * 0.28,  # Full Name
-                table_width * 0.12,  # Grade
-                table_width * 0.12,  # Section
-                table_width * 0.12,  # Field
-                table_width * 0.15,  # Score
-                table_width * 0.15,  # Rank
-            ]
-
-            table = Table(
-                wrapped_data,
-                repeatRows=1,
-                colWidths=col_widths,
-            )
+            ],
+            ["#", "Full Name", "Grade", "Section", "Field", "Score", "Rank"],
+            result_rows,
+            [0.06, 0.28, 0.12, 0.12, 0.12, 0.15, 0.15],
+            table_style=[
+                ("ALIGN", (0, 1), (0, -1), "CENTER"),  # Index
+                ("ALIGN", (5, 1), (6, -1), "CENTER"),  # Score + Rank
+            ],
+        )
 
-            table.hAlign = "CENTER"
+        filename = (
+            f"student_score_ranking_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        )
+        return filename, pdf
 
-            table.setStyle(
-                TableStyle(
-                    [
-                        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e0e0e0")),
-                        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                        # Alignments
-                        ("ALIGN", (0, 1), (0, -1), "CENTER"),  # Index
-                        ("ALIGN", (5, 1), (6, -1), "CENTER"),  # Score + Rank
-                        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                        # Padding
-                        ("LEFTPADDING", (0, 0), (-1, -1), 4),
-                        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-                        ("TOPPADDING", (0, 0), (-1, -1), 3),
-                        ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-                    ]
+    def get(self, request):
+        try:
+            if wants_async(request):
+                job = Job.enqueue(
+                    "grades_rank_pdf", request.user, params=request.query_params.dict()
                 )
-            )
-
-            elements.append(table)
-
-            doc.build(elements)
-            buffer.seek(0)
+                return accepted_response(job)
 
-            filename = (
-                f"student_score_ranking_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            )
+            filename, pdf = self.build_pdf(request.query_params)
 
             response = HttpResponse(
-                buffer.read(),
+                pdf,
                 content_type="application/pdf",
             )
             response["Content-Disposition"] = f'attachment; filename="{filename}"'
@@ -2345,128 +2309,156 @@ class StudentsBulkOperationView(APIView):
 
     FIELD_LIST = ["ai", "other", "backend", "frontend", "embedded", "cyber"]
 
-    def post(self, request):
-        try:
-            action = request.data.get("action")
-            if action not in ["delete", "edit"]:
-                return Response(
-                    {"error": "Invalid action. Must be 'delete' or 'edit'."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+    def perform(self, data, progress=None):
+        """
+        Applies the bulk action and returns the Response to send back.
+        Shared by the request handler and the background job.
+        """
+        action = data.get("action")
+        if action not in ["delete", "edit"]:
+            return Response(
+                {"error": "Invalid action. Must be 'delete' or 'edit'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            # --- Filters ---
-            search = (request.data.get("search") or "").strip()
-            grade_q = request.data.get("grade")
-            section_q = (request.data.get("section") or "").strip().upper()
-            field_q = (request.data.get("field") or "").strip().lower()
-            account_status = (request.data.get("account_status") or "").strip().lower()
+        # --- Filters ---
+        search = (data.get("search") or "").strip()
+        grade_q = data.get("grade")
+        section_q = (data.get("section") or "").strip().upper()
+        field_q = (data.get("field") or "").strip().lower()
+        account_status = (data.get("account_status") or "").strip().lower()
 
-            profiles = Profile.objects.select_related("user").filter(
-                user__role="user", user__is_deleted=False
-            )
+        profiles = Profile.objects.select_related("user").filter(
+            user__role="user", user__is_deleted=False
+        )
 
-            if search:
-                profiles = profiles.filter(
-                    Q(user__full_name__icontains=search)
-                    | Q(user__email__icontains=search)
-                    | Q(grade__icontains=search)
-                    | Q(section__icontains=search)
-                    | Q(field__icontains=search)
-                )
+        if search:
+            profiles = search_profiles(profiles, search)
 
-            if grade_q is not None:
-                try:
-                    grade_int = int(grade_q)
-                    profiles = profiles.filter(grade=grade_int)
-                except ValueError:
-                    pass
+        if grade_q is not None:
+            try:
+                grade_int = int(grade_q)
+                profiles = profiles.filter(grade=grade_int)
+            except ValueError:
+                pass
 
-            if section_q:
-                profiles = profiles.filter(section__iexact=section_q)
+        if section_q:
+            profiles = profiles.filter(section__iexact=section_q)
 
-            if field_q:
-                profiles = profiles.filter(field__iexact=field_q)
+        if field_q:
+            profiles = profiles.filter(field__iexact=field_q)
 
-            if account_status:
-                if account_status == "active":
-                    profiles = profiles.filter(user__is_active=True)
-                elif account_status == "inactive":
-                    profiles = profiles.filter(user__is_active=False)
+        if account_status:
+            if account_status == "active":
+                profiles = profiles.filter(user__is_active=True)
+            elif account_status == "inactive":
+                profiles = profiles.filter(user__is_active=False)
+
+        affected_count = profiles.count()
+        if affected_count == 0:
+            return Response(
+                {"message": "No students match the given filters."},
+                status=status.HTTP_200_OK,
+            )
+
+        if progress:
+            progress(10, f"Applying '{action}' to {affected_count} students")
+
+        with transaction.atomic():
+            if action == "delete":
+                user_ids = list(
+                    profiles.values_list("user_id", flat=True).distinct()
+                )
+                # Count users BEFORE deletion
+                user_deleted_count = len(user_ids)
+                # Delete users (cascades will still happen, but not counted)
+                deleted_detail = User.objects.filter(id__in=user_ids).delete()
 
-            affected_count = profiles.count()
-            if affected_count == 0:
                 return Response(
-                    {"message": "No students match the given filters."},
+                    {
+                        "deleted_count": user_deleted_count,
+                        "cascaded_deletions": deleted_detail,  # optional debug info
+                    },
                     status=status.HTTP_200_OK,
                 )
 
-            with transaction.atomic():
-                if action == "delete":
-                    user_ids = list(
-                        profiles.values_list("user_id", flat=True).distinct()
-                    )
-                    # Count users BEFORE deletion
-                    user_deleted_count = len(user_ids)
-                    # Delete users (cascades will still happen, but not counted)
-                    deleted_detail = User.objects.filter(id__in=user_ids).delete()
+            elif action == "edit":
+                edit_data = data.get("edit_data", {})
+                allowed_fields = [
+                    "grade",
+                    "section",
+                    "field",
+                    "account",
+                    "phone_number",
+                    "is_active",
+                ]
 
-                    return Response(
-                        {
-                            "deleted_count": user_deleted_count,
-                            "cascaded_deletions": deleted_detail,  # optional debug info
-                        },
-                        status=status.HTTP_200_OK,
-                    )
+                update_data = {}
+                profile_update_data = {}
 
-                elif action == "edit":
-                    edit_data = request.data.get("edit_data", {})
-                    allowed_fields = [
+                for key, value in edit_data.items():
+                    if key not in allowed_fields:
+                        continue
+                    if key == "field" and value.lower() not in self.FIELD_LIST:
+                        continue
+                    if key == "section":
+                        value = value.upper() if value else value
+                    if key in [
                         "grade",
                         "section",
                         "field",
                         "account",
                         "phone_number",
-                        "is_active",
-                    ]
+                    ]:
+                        profile_update_data[key] = value
+                    if key == "is_active":
+                        update_data["is_active"] = bool(value)
+
+                # Update users
+                if update_data:
+                    user_ids = list(profiles.values_list("user_id", flat=True))
+                    User.objects.filter(id__in=user_ids).update(**update_data)
+                    invalidate_cached_users(user_ids)
+                    transaction.on_commit(
+                        partial(invalidate_handshake_cache, user_ids)
+                    )
+
+                # Update profiles
+                if profile_update_data:
+                    profiles.update(**profile_update_data)
 
-                    update_data = {}
-                    profile_update_data = {}
-
-                    for key, value in edit_data.items():
-                        if key not in allowed_fields:
-                            continue
-                        if key == "field" and value.lower() not in self.FIELD_LIST:
-                            continue
-                        if key == "section":
-                            value = value.upper() if value else value
-                        if key in [
-                            "grade",
-                            "section",
-                            "field",
-                            "account",
-                            "phone_number",
-                        ]:
-                            profile_update_data[key] = value
-                        if key == "is_active":
-                            update_data["is_active"] = bool(value)
-
-                    # Update users
-                    if update_data:
-                        user_ids = profiles.values_list("user_id", flat=True)
-                        User.objects.filter(id__in=user_ids).update(**update_data)
-
-                    # Update profiles
-                    if profile_update_data:
-                        profiles.update(**profile_update_data)
+                # queryset.update() bypasses the model signals
+                transaction.on_commit(invalidate_students_overview)
+                transaction.on_commit(invalidate_student_search)
 
+                return Response(
+                    {
+                        "message": f"{affected_count} students updated successfully",
+                        "updated_fields": list(profile_update_data.keys())
+                        + list(update_data.keys()),
+                    },
+                    status=status.HTTP_200_OK,
+                )
+
+    def post(self, request):
+        try:
+            if wants_async(request):
+                if request.data.get("action") not in ["delete", "edit"]:
                     return Response(
-                        {
-                            "message": f"{affected_count} students updated successfully",
-                            "updated_fields": list(profile_update_data.keys())
-                            + list(update_data.keys()),
-                        },
-                        status=status.HTTP_200_OK,
+                        {"error": "Invalid action. Must be 'delete' or 'edit'."},
+                        status=status.HTTP_400_BAD_REQUEST,
                     )
+                # Form posts arrive as a QueryDict; keep one value per key,
+                # as perform() reads them with get()
+                params = request.data
+                if isinstance(params, QueryDict):
+                    params = params.dict()
+                job = Job.enqueue(
+                    "students_bulk_operation", request.user, params=params
+                )
+                return accepted_response(job)
+
+            return self.perform(request.data)
 
         except Exception as e:
             import traceback
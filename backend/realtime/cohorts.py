@@ -0,0 +1,87 @@
+"""
+Cohorts are the broadcast audiences a student belongs to: their role, grade,
+class (grade + section) and field. Each has a key such as "grade:11" or
+"class:11A" and a channel-layer group that NotificationConsumer joins on
+connect, so one group_send reaches the whole cohort.
+"""
+
+import re
+
+from django.db.models import Q
+
+from users.models import Profile, User
+
+KINDS = ("role", "grade", "class", "field")
+_VALUE = re.compile(r"^[A-Za-z0-9_-]{1,40}$")
+_CLASS = re.compile(r"^(\d{1,2})([A-Za-z])$")
+
+
+def parse_cohort(key):
+    """
+    Validates a cohort key and returns it normalised; raises ValueError when
+    it doesn't name a cohort.
+    """
+    kind, _, value = str(key).strip().partition(":")
+    kind = kind.lower()
+    if kind not in KINDS or not _VALUE.match(value):
+        raise ValueError(f"'{key}' is not a cohort.")
+
+    if kind == "role":
+        if value not in dict(User.ROLE_CHOICES):
+            raise ValueError(f"Unknown role '{value}'.")
+    elif kind == "grade":
+        if not value.isdigit():
+            raise ValueError("A grade cohort needs a numeric grade.")
+        value = str(int(value))
+    elif kind == "class":
+        match = _CLASS.match(value)
+        if not match:
+            raise ValueError("A class cohort looks like 'class:11A'.")
+        value = f"{int(match.group(1))}{match.group(2).upper()}"
+    elif kind == "field":
+        if value not in dict(Profile.FIELD_CHOICE):
+            raise ValueError(f"Unknown field '{value}'.")
+    return f"{kind}:{value}"
+
+
+def group_name(key):
+    kind, _, value = key.partition(":")
+    return f"cohort.{kind}.{value}"
+
+
+def member_filter(key):
+    """Q over User matching the members of a (normalised) cohort."""
+    kind, _, value = key.partition(":")
+    if kind == "role":
+        return Q(role=value)
+    if kind == "grade":
+        return Q(profile__grade=int(value))
+    if kind == "class":
+        match = _CLASS.match(value)
+        return Q(
+            profile__grade=int(match.group(1)),
+            profile__section__iexact=match.group(2),
+        )
+    return Q(profile__field=value)
+
+
+def members_filter(keys):
+    query = Q(pk__in=[])
+    for key in keys:
+        query |= member_filter(key)
+    return query
+
+
+def cohorts_of(user):
+    """The cohort keys `user` currently belongs to."""
+    keys = [f"role:{user.role}"]
+    profile = (
+        Profile.objects.filter(user=user).values("grade", "section", "field").first()
+    )
+    if profile:
+        keys.append(f"grade:{profile['grade']}")
+        class_key = f"{profile['grade']}{(profile['section'] or '').upper()}"
+        if _CLASS.match(class_key):
+            keys.append(f"class:{class_key}")
+        keys.append(f"field:{profile['field']}")
+    return keys
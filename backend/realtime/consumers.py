@@ -1,6 +1,15 @@
+from collections import deque
+
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 import json
 
+from .cohorts import cohorts_of, group_name
+
+# How many recent cohort broadcasts each connection remembers, to drop the
+# extra copies that reach members of several targeted cohorts
+SEEN_BROADCASTS = 100
+
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -9,12 +18,37 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             await self.close()
         else:
             self.group_name = f"user_{self.user.id}"
-            await self.channel_layer.group_add(self.group_name, self.channel_name)
+            self.seen_broadcasts = deque(maxlen=SEEN_BROADCASTS)
+            # Cohort groups carry the broadcasts addressed to a whole grade,
+            # class, field or role. They are picked up on connect, so a
+            # profile change applies from the next connection.
+            cohorts = await database_sync_to_async(cohorts_of)(self.user)
+            self.joined_groups = [self.group_name]
+            self.joined_groups += [group_name(key) for key in cohorts]
+            for group in self.joined_groups:
+                await self.channel_layer.group_add(group, self.channel_name)
             await self.accept()
 
     async def disconnect(self, close_code):
-        if hasattr(self, "group_name"):
-            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        for group in getattr(self, "joined_groups", []):
+            await self.channel_layer.group_discard(group, self.channel_name)
 
     async def send_notification(self, event):
         await self.send(text_data=json.dumps(event["respond"]))
+
+    async def send_announcement(self, event):
+        # Cohort broadcasts skip the per-recipient checks notify_user does
+        # when writing rows, so they are applied here instead
+        respond = dict(event["respond"])
+        broadcast_id = respond.pop("broadcast_id", None)
+        if broadcast_id in self.seen_broadcasts:
+            return
+        self.seen_broadcasts.append(broadcast_id)
+
+        actor = respond.get("actor")
+        if not self.user.notif_enabled or (actor and actor["id"] == self.user.id):
+            return
+        respond["is_push_notif"] = (
+            respond["is_push_notif"] and self.user.push_notif_enabled
+        )
+        await self.send(text_data=json.dumps(respond))
@@ -0,0 +1,68 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from realtime.models import Notification
+from utils.notif import CHANNEL_LAYER, MAX_DELIVERY_ATTEMPTS, deliver_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Push notifications whose delivery after commit failed or never ran "
+        "(e.g. the web process died first). Start one next to the web server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Relay the notifications that are currently pending, then exit.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls when nothing is pending.",
+        )
+        parser.add_argument(
+            "--grace",
+            type=float,
+            default=30.0,
+            help=(
+                "Leave notifications younger than this many seconds to the "
+                "delivery the web process runs on commit."
+            ),
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not CHANNEL_LAYER:
+            raise CommandError("No channel layer is configured.")
+
+        while True:
+            close_old_connections()
+            cutoff = timezone.now() - timedelta(seconds=options["grace"])
+            pending = list(
+                Notification.objects.filter(
+                    delivered_at__isnull=True,
+                    delivery_attempts__lt=MAX_DELIVERY_ATTEMPTS,
+                    sent_at__lt=cutoff,
+                )
+                .order_by("sent_at", "id")
+                .values_list("id", flat=True)[: options["batch_size"]]
+            )
+
+            delivered = deliver_notifications(pending) if pending else 0
+            if pending:
+                self.stdout.write(
+                    f"Relayed {delivered} of {len(pending)} notifications."
+                )
+
+            # A full batch that went out means more may be waiting
+            if delivered < options["batch_size"]:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_existing_delivered(apps, schema_editor):
+    # Rows from before the outbox were pushed when they were created
+    Notification = apps.get_model("realtime", "Notification")
+    Notification.objects.update(delivered_at=models.F("sent_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realtime', '0004_alter_notification_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='delivery_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='is_push_notif',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('delivered_at__isnull', True)), fields=['sent_at'], name='notification_undelivered_idx'),
+        ),
+        migrations.RunPython(mark_existing_delivered, migrations.RunPython.noop),
+    ]
@@ -30,9 +30,20 @@ class Notification(models.Model):
     url = models.URLField(blank=True, null=True)
     sent_at = models.DateTimeField(auto_now_add=True)
 
+    # Outbox state: the row is written in the caller's transaction and pushed
+    # over the channel layer once that commits (see utils.notif)
+    is_push_notif = models.BooleanField(default=False)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    delivery_attempts = models.PositiveSmallIntegerField(default=0)
+
     class Meta:
         ordering = ["-sent_at"]
         indexes = [
             models.Index(fields=["recipient", "is_read"]),
             models.Index(fields=["recipient", "sent_at"]),
+            models.Index(
+                fields=["sent_at"],
+                condition=models.Q(delivered_at__isnull=True),
+                name="notification_undelivered_idx",
+            ),
         ]
@@ -0,0 +1,15 @@
+class RecordingChannelLayer:
+    """Channel layer stand-in keeping every group_send as (group, message)."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    async def group_send(self, group, message):
+        if self.fail:
+            raise ConnectionError("channel layer unavailable")
+        self.sent.append((group, message))
+
+    @property
+    def groups(self):
+        return [group for group, _ in self.sent]
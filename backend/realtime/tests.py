@@ -1,3 +1,240 @@
-from django.test import TestCase
+import asyncio
+from collections import OrderedDict
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import InMemoryChannelLayer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from realtime.consumers import NotificationConsumer
+from realtime.models import Notification
+from realtime.testing import RecordingChannelLayer
+from utils.auth import invalidate_cached_users
+from utils.notif import (
+    _fan_out,
+    broadcast_to_cohorts,
+    notify_user,
+    notify_users_bulk,
+)
+from utils.realtimeauth import get_user_from_scope, invalidate_handshake_cache
+
+User = get_user_model()
+
+
+class SlowChannelLayer:
+    """Counts how many group sends are in flight at once."""
+
+    def __init__(self, failing_group=None):
+        self.failing_group = failing_group
+        self.in_flight = 0
+        self.peak = 0
+
+    async def group_send(self, group, message):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if group == self.failing_group:
+                raise ConnectionError("channel layer unavailable")
+        finally:
+            self.in_flight -= 1
+
+
+class FanOutTests(TestCase):
+    def fan_out(self, layer, groups):
+        with mock.patch("utils.notif.CHANNEL_LAYER", layer):
+            return async_to_sync(_fan_out)([(group, {}) for group in groups])
+
+    def test_sends_overlap_up_to_the_limit(self):
+        layer = SlowChannelLayer()
+        with mock.patch("utils.notif.FANOUT_CONCURRENCY", 3):
+            results = self.fan_out(layer, [f"user_{i}" for i in range(10)])
+
+        self.assertEqual(results, [True] * 10)
+        self.assertEqual(layer.peak, 3)
+        self.assertEqual(layer.in_flight, 0)
+
+    def test_failed_sends_free_their_slot(self):
+        layer = SlowChannelLayer(failing_group="user_0")
+        with mock.patch("utils.notif.FANOUT_CONCURRENCY", 2):
+            results = self.fan_out(layer, [f"user_{i}" for i in range(5)])
+
+        self.assertEqual(results, [False, True, True, True, True])
+        self.assertEqual(layer.peak, 2)
+
+
+class NotificationOutboxTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            "admin@example.com", "Admin", "pw", role="admin"
+        )
+        self.students = [
+            User.objects.create_user(f"s{i}@example.com", f"Student {i}", "pw")
+            for i in range(3)
+        ]
+
+    def notify(self, recipient):
+        return async_to_sync(notify_user)(
+            recipient=recipient, actor=self.admin, title="Hi", description="Hello"
+        )
+
+    def test_sent_only_after_commit(self):
+        layer = RecordingChannelLayer()
+        with mock.patch("utils.notif.CHANNEL_LAYER", layer):
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    notification = self.notify(self.students[0])
+                    self.assertEqual(layer.sent, [])
+
+        [(group, message)] = layer.sent
+        self.assertEqual(group, f"user_{self.students[0].id}")
+        self.assertEqual(message["respond"]["id"], notification.id)
+        notification.refresh_from_db()
+        self.assertIsNotNone(notification.delivered_at)
+
+    def test_nothing_sent_for_rolled_back_rows(self):
+        layer = RecordingChannelLayer()
+        with mock.patch("utils.notif.CHANNEL_LAYER", layer):
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError):
+                    with transaction.atomic():
+                        self.notify(self.students[0])
+                        raise RuntimeError
+
+        self.assertEqual(layer.sent, [])
+        self.assertFalse(Notification.objects.exists())
+
+    def test_relay_retries_failed_deliveries(self):
+        with mock.patch("utils.notif.CHANNEL_LAYER", RecordingChannelLayer(fail=True)):
+            with self.captureOnCommitCallbacks(execute=True):
+                async_to_sync(notify_users_bulk)(
+                    recipients=self.students,
+                    actor=self.admin,
+                    title="Hi",
+                    description="Hello",
+                )
+
+        pending = Notification.objects.filter(delivered_at__isnull=True)
+        self.assertEqual(pending.count(), 3)
+        self.assertEqual(set(pending.values_list("delivery_attempts", flat=True)), {1})
+
+        layer = RecordingChannelLayer()
+        with mock.patch("utils.notif.CHANNEL_LAYER", layer), mock.patch(
+            "realtime.management.commands.relay_notifications.CHANNEL_LAYER", layer
+        ):
+            call_command("relay_notifications", once=True, grace=0, stdout=mock.Mock())
+
+        self.assertEqual(len(layer.sent), 3)
+        self.assertFalse(Notification.objects.filter(delivered_at__isnull=True).exists())
+
+
+class HandshakeAuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_handshake_cache()
+        self.user = User.objects.create_user("ws@example.com", "Socket", "pw")
+        token = AccessToken.for_user(self.user)
+        cookie = f"theme=dark; access={token}".encode()
+        self.scope = {"headers": [(b"cookie", cookie)]}
+
+    def handshake(self, scope=None):
+        return async_to_sync(get_user_from_scope)(scope or self.scope)
+
+    def test_repeat_handshakes_skip_the_database(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.handshake().id, self.user.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.handshake().id, self.user.id)
+
+    def test_invalidation_from_another_process_reaches_this_one(self):
+        self.handshake()
+        # As a bulk edit in the run_jobs worker would, from its own process
+        with mock.patch("utils.realtimeauth._users", OrderedDict()):
+            invalidate_cached_users([self.user.id])
+            invalidate_handshake_cache([self.user.id])
+
+        with self.assertNumQueries(1):
+            self.handshake()
+        with self.assertNumQueries(0):
+            self.handshake()
+
+    def test_invalid_token_is_anonymous(self):
+        scope = {"headers": [(b"cookie", b"access=not-a-token")]}
+        self.assertTrue(self.handshake(scope).is_anonymous)
+
+    def test_deactivation_drops_the_cached_user(self):
+        self.handshake()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertTrue(self.handshake().is_anonymous)
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class CohortBroadcastTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            "admin@example.com", "Admin", "pw", role="admin"
+        )
+        self.student = User.objects.create_user("ws@example.com", "Socket", "pw")
+
+    async def receive_broadcasts(self, cohort_keys, broadcasts):
+        layer = InMemoryChannelLayer()
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), "/ws/")
+        communicator.scope["user"] = self.student
+        with mock.patch(
+            "realtime.consumers.cohorts_of", return_value=cohort_keys
+        ), mock.patch("channels.layers.channel_layers", {"default": layer}):
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            with mock.patch("utils.notif.CHANNEL_LAYER", layer):
+                await sync_to_async(broadcasts)()
+            received = []
+            while not await communicator.receive_nothing(timeout=0.2):
+                received.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+        return received
+
+    def test_overlapping_cohorts_deliver_once(self):
+        def announce(n):
+            broadcast_to_cohorts(
+                ["grade:11", "class:11A"],
+                announcement_id=n,
+                actor=self.admin,
+                title=f"Announcement {n}",
+                description="-",
+            )
+
+        def broadcasts():
+            with self.captureOnCommitCallbacks(execute=True):
+                announce(1)
+                announce(2)
+
+        received = async_to_sync(self.receive_broadcasts)(
+            ["grade:11", "class:11A"], broadcasts
+        )
+
+        self.assertEqual([r["announcement_id"] for r in received], [1, 2])
+        self.assertNotIn("broadcast_id", received[0])
+
+    def test_failed_cohort_sends_are_logged(self):
+        with mock.patch(
+            "utils.notif.CHANNEL_LAYER", RecordingChannelLayer(fail=True)
+        ), self.assertLogs("utils.notif", "WARNING") as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                broadcast_to_cohorts(
+                    ["grade:11", "field:backend"],
+                    announcement_id=7,
+                    title="Trip",
+                    description="-",
+                )
+
+        self.assertIn("Announcement 7 was not published to 2 of 2", logs.output[0])
@@ -0,0 +1,123 @@
+from django.core.cache import cache
+from django.db.models import Count, Prefetch, Q
+
+from attendance.models import Attendance
+from learning_task.models import LearningTask, TaskReview
+
+USER_DASHBOARD_TIMEOUT = 60 * 10
+RECENT_TASKS = 5
+
+
+def _cache_key(user_id):
+    return f"users:dashboard:{user_id}"
+
+
+def invalidate_user_dashboards(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in set(user_ids) if user_id])
+
+
+def _task_counts(user):
+    return LearningTask.objects.filter(user=user).aggregate(
+        total=Count("id"),
+        rated=Count("id", filter=Q(status="rated")),
+        under_review=Count("id", filter=Q(status="under_review")),
+        draft=Count("id", filter=Q(status="draft")),
+        redo=Count("id", filter=Q(status="redo")),
+    )
+
+
+def _attendance_counts(user):
+    return Attendance.objects.filter(user=user).aggregate(
+        total=Count("id"),
+        present=Count("id", filter=Q(status="present")),
+        late=Count("id", filter=Q(status="late")),
+        absent=Count("id", filter=Q(status="absent")),
+        special_case=Count("id", filter=Q(status="special_case")),
+    )
+
+
+def _recently_reviewed_tasks(user):
+    tasks = (
+        LearningTask.objects.filter(user=user, status="rated")
+        .order_by("-updated_at")
+        .prefetch_related(
+            Prefetch(
+                "reviews",
+                queryset=TaskReview.objects.select_related("user").order_by(
+                    "-created_at"
+                ),
+                to_attr="latest_reviews",
+            ),
+            "languages",
+            "frameworks",
+        )[:RECENT_TASKS]
+    )
+
+    recent = []
+    for task in tasks:
+        review = task.latest_reviews[0] if task.latest_reviews else None
+        recent.append(
+            {
+                "id": task.id,
+                "title": task.title,
+                "description": task.description,
+                "languages": [l.name for l in task.languages.all()],
+                "frameworks": [f.name for f in task.frameworks.all()],
+                "grade": review.rating if review else None,
+                "admin_feedback": review.feedback if review else "",
+                "reviewed_date": task.updated_at.date(),
+                "reviewer": review.user.full_name if review else "Admin",
+            }
+        )
+    return recent
+
+
+def _build_user_dashboard(user):
+    tasks = _task_counts(user)
+    attendance = _attendance_counts(user)
+
+    task_completion = (
+        round((tasks["rated"] / tasks["total"]) * 100, 1) if tasks["total"] else 0
+    )
+    attended = attendance["present"] + attendance["late"]
+    attendance_rate = (
+        round((attended / attendance["total"]) * 100, 1) if attendance["total"] else 0
+    )
+
+    return {
+        "stats": {
+            "attendance_rate": attendance_rate,
+            "attendance_distribution": {
+                "present": attendance["present"],
+                "late": attendance["late"],
+                "absent": attendance["absent"],
+                "special_case": attendance["special_case"],
+            },
+            "total_learning_tasks": tasks["total"],
+            "task_completion_percent": task_completion,
+            "task_score": tasks["rated"] * 5,
+        },
+        "task_status_distribution": {
+            "draft": tasks["draft"],
+            "redo": tasks["redo"],
+            "under_review": tasks["under_review"],
+            "rated": tasks["rated"],
+        },
+        "recently_reviewed_tasks": _recently_reviewed_tasks(user),
+    }
+
+
+def get_user_dashboard(user):
+    """
+    The task and attendance part of a student's dashboard, cached per user and
+    dropped by the users signals whenever one of their tasks, reviews or
+    attendance rows changes, or a reviewer or tag it names is renamed. The
+    score is not included: it is maintained separately (StudentScore) and read
+    fresh by the view.
+    """
+    key = _cache_key(user.id)
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = _build_user_dashboard(user)
+        cache.set(key, dashboard, USER_DASHBOARD_TIMEOUT)
+    return dashboard
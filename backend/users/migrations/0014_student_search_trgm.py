@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Trigram indexes over the expressions Django's `icontains` compiles to on
+# PostgreSQL (UPPER(column::text) LIKE UPPER(%s)), used by the admin student
+# search in management/search.py. Other databases use an in-process index.
+INDEXED_COLUMNS = [
+    ("users_user", "full_name"),
+    ("users_user", "email"),
+    ("users_profile", "section"),
+    ("users_profile", "field"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, column in INDEXED_COLUMNS:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_{column}_trgm_idx ON {table} "
+            f"USING GIN ((UPPER({column}::text)) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, column in INDEXED_COLUMNS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0013_alter_profile_account"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
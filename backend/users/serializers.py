@@ -4,6 +4,7 @@ import cloudinary.uploader
 import cloudinary.utils
 import time
 from .models import Profile
+from utils.get_file import get_private_image_url
 
 User = get_user_model()
 
@@ -105,16 +106,8 @@ class UserInverseSerializer(serializers.ModelSerializer):
         )
         return result["public_id"]
 
-    def get_signed_url(self, public_id, expires_in=30):
-        url, _ = cloudinary.utils.cloudinary_url(
-            public_id,
-            resource_type="image",
-            type="authenticated",
-            sign_url=True,
-            secure=True,
-            expires_at=int(time.time()) + expires_in,
-        )
-        return url
+    def get_signed_url(self, public_id):
+        return get_private_image_url(public_id)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -193,16 +186,8 @@ class UserSerializer(serializers.ModelSerializer):
         )
         return result["public_id"]
 
-    def get_signed_url(self, public_id, expires_in=30):
-        url, _ = cloudinary.utils.cloudinary_url(
-            public_id,
-            resource_type="image",
-            type="authenticated",
-            sign_url=True,
-            secure=True,
-            expires_at=int(time.time()) + expires_in,
-        )
-        return url
+    def get_signed_url(self, public_id):
+        return get_private_image_url(public_id)
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -211,3 +196,21 @@ class ProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ["user", "grade", "section", "field", "account", "phone_number"]
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    """
+    Read-only author card for list payloads. Expects `profile` to be
+    select_related by the caller.
+    """
+
+    profile_pic_url = serializers.SerializerMethodField()
+    grade = serializers.IntegerField(source="profile.grade", read_only=True)
+    section = serializers.CharField(source="profile.section", read_only=True)
+
+    class Meta:
+        model = User
+        fields = ["id", "full_name", "profile_pic_url", "grade", "section"]
+
+    def get_profile_pic_url(self, obj):
+        return get_private_image_url(obj.profile_pic_id)
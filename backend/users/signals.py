@@ -0,0 +1,83 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from attendance.models import Attendance
+from attendance.signals import attendance_changed
+from learning_task.models import LearningTask, TaskReview
+from management.models import Framework, Language
+from utils.auth import invalidate_cached_users
+from utils.realtimeauth import invalidate_handshake_cache
+from .dashboard import invalidate_user_dashboards
+from .models import User
+
+
+def _schedule_invalidation(user_ids):
+    # After commit, so a dashboard rebuilt mid-transaction isn't cached stale
+    transaction.on_commit(partial(invalidate_user_dashboards, user_ids))
+
+
+@receiver(post_save, sender=LearningTask)
+@receiver(post_delete, sender=LearningTask)
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def dashboard_row_changed(sender, instance, **kwargs):
+    _schedule_invalidation([instance.user_id])
+
+
+@receiver(post_save, sender=TaskReview)
+@receiver(post_delete, sender=TaskReview)
+def dashboard_review_changed(sender, instance, **kwargs):
+    # If the task row is already gone, its own post_delete covers the owner
+    user_id = (
+        LearningTask.objects.filter(id=instance.task_id)
+        .values_list("user_id", flat=True)
+        .first()
+    )
+    _schedule_invalidation([user_id])
+
+
+@receiver(attendance_changed)
+def dashboard_attendance_changed(sender, user_ids, **kwargs):
+    _schedule_invalidation(user_ids)
+
+
+@receiver(post_init, sender=User)
+def reviewer_name_loaded(sender, instance, **kwargs):
+    # The name as loaded (None when deferred), to tell renames from other saves
+    instance._dashboard_full_name = instance.__dict__.get("full_name")
+
+
+@receiver(post_save, sender=User)
+def reviewer_renamed(sender, instance, created, update_fields=None, **kwargs):
+    # Dashboards show the name of whoever reviewed the student's tasks
+    if created or (update_fields and "full_name" not in update_fields):
+        return
+    if instance.full_name == instance._dashboard_full_name:
+        return
+    instance._dashboard_full_name = instance.full_name
+    reviewed = TaskReview.objects.filter(user=instance).values_list(
+        "task__user_id", flat=True
+    )
+    _schedule_invalidation(list(reviewed.distinct()))
+
+
+@receiver(post_save, sender=Language)
+@receiver(post_save, sender=Framework)
+def dashboard_tag_renamed(sender, instance, created, **kwargs):
+    # Task tags are shown by name too
+    if not created:
+        owners = instance.learningtask_set.values_list("user_id", flat=True)
+        _schedule_invalidation(list(owners.distinct()))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Deactivated users, role changes and notification settings must reach
+    # the next request and WebSocket handshake rather than wait for the
+    # caches to expire
+    invalidate_cached_users([instance.id])
+    transaction.on_commit(partial(invalidate_handshake_cache, [instance.id]))
@@ -1,3 +1,218 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+import cloudinary
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from attendance.models import Attendance, AttendanceSession
+from learning_task.models import LearningTask, TaskReview
+from management.models import Language
+from utils import get_file
+from utils.auth import JWTCookieAuthentication
+from . import dashboard
+
+User = get_user_model()
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("auth@example.com", "Auth", "pw")
+        self.request = RequestFactory().get("/")
+        self.request.COOKIES["access"] = str(AccessToken.for_user(self.user))
+
+    def authenticate(self):
+        return JWTCookieAuthentication().authenticate(self.request)[0]
+
+    def test_repeat_requests_skip_the_user_query(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.full_name, "Auth")
+        self.assertEqual(user.get_deferred_fields(), {"password"})
+
+    def test_saving_the_cached_user_keeps_the_password(self):
+        self.authenticate()
+        user = self.authenticate()
+        user.full_name = "Renamed"
+        user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.full_name, "Renamed")
+        self.assertTrue(self.user.check_password("pw"))
+
+    def test_updates_reach_the_next_request(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+
+class SignedImageUrlTests(TestCase):
+    BUCKET = get_file.SIGNED_URL_BUCKET_SECONDS
+
+    def setUp(self):
+        cache.clear()
+        get_file._local_cache.clear()
+        self.addCleanup(get_file._local_cache.clear)
+        self.enterContext(
+            mock.patch.object(cloudinary.config(), "auth_token", {"key": "abcd1234"})
+        )
+        self.clock = self.enterContext(mock.patch("utils.get_file.time"))
+        self.sign = self.enterContext(
+            mock.patch("utils.get_file._sign", wraps=get_file._sign)
+        )
+
+    def url_at(self, seconds, public_id="pics/a"):
+        self.clock.time.return_value = seconds
+        return get_file.get_private_image_url(public_id)
+
+    def test_same_url_within_a_bucket(self):
+        start = 1000 * self.BUCKET
+        first = self.url_at(start)
+
+        self.assertEqual(self.url_at(start + self.BUCKET - 1), first)
+        get_file._local_cache.clear()
+        cache.clear()
+        # Signed again from scratch, still the same URL
+        self.assertEqual(self.url_at(start + 1), first)
+        self.assertIn(f"exp={1002 * self.BUCKET}", first)
+
+    def test_new_url_each_bucket(self):
+        first = self.url_at(1000 * self.BUCKET)
+        second = self.url_at(1001 * self.BUCKET)
+
+        self.assertNotEqual(first, second)
+        self.assertIn(f"exp={1003 * self.BUCKET}", second)
+
+    def test_lookups_reuse_the_local_then_the_shared_cache(self):
+        self.clock.time.return_value = 1000 * self.BUCKET
+        with mock.patch.object(
+            get_file.cache, "get_many", wraps=get_file.cache.get_many
+        ) as get_many:
+            urls = get_file.get_private_image_urls(["a", "b", "a", None, ""])
+            self.assertEqual(set(urls), {"a", "b"})
+            self.assertEqual((self.sign.call_count, get_many.call_count), (2, 1))
+
+            # Served by the in-process LRU
+            self.assertEqual(get_file.get_private_image_urls(["a", "b"]), urls)
+            self.assertEqual((self.sign.call_count, get_many.call_count), (2, 1))
+
+            # Another process: one shared cache round trip, nothing signed
+            get_file._local_cache.clear()
+            self.assertEqual(get_file.get_private_image_urls(["a", "b"]), urls)
+            self.assertEqual((self.sign.call_count, get_many.call_count), (2, 2))
+
+    def test_local_cache_is_bounded(self):
+        self.clock.time.return_value = 1000 * self.BUCKET
+        with mock.patch.object(get_file, "LOCAL_CACHE_SIZE", 2):
+            get_file.get_private_image_urls(["a", "b", "c"])
+
+        self.assertEqual(len(get_file._local_cache), 2)
+        self.assertNotIn(get_file._cache_key("a", 1000), get_file._local_cache)
+
+
+class UserDashboardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user("s@example.com", "Student", "pw")
+        cls.reviewer = User.objects.create_user(
+            "admin@example.com", "Admin", "pw", role="admin", is_staff=True
+        )
+        cls.language = Language.objects.create(name="Python")
+        cls.task = LearningTask.objects.create(
+            user=cls.student, title="Task", description="-", status="rated"
+        )
+        cls.task.languages.add(cls.language)
+        TaskReview.objects.create(
+            task=cls.task, user=cls.reviewer, rating=4, feedback="-", is_admin=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.build = self.enterContext(
+            mock.patch(
+                "users.dashboard._build_user_dashboard",
+                wraps=dashboard._build_user_dashboard,
+            )
+        )
+
+    def get(self):
+        return dashboard.get_user_dashboard(self.student)
+
+    def rebuilds_after(self, change):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        data = self.get()
+        return self.build.call_count - 1, data
+
+    def test_repeat_reads_are_cached(self):
+        self.get()
+        with self.assertNumQueries(0):
+            self.get()
+
+        self.client.cookies["access"] = str(AccessToken.for_user(self.student))
+        response = self.client.get("/api/users/data/", secure=True)
+        self.assertEqual(response.json()["stats"]["total_learning_tasks"], 1)
+        self.assertEqual(self.build.call_count, 1)
+
+    def test_task_changes_rebuild(self):
+        rebuilds, data = self.rebuilds_after(
+            lambda: LearningTask.objects.create(
+                user=self.student, title="New", description="-"
+            )
+        )
+
+        self.assertEqual(rebuilds, 1)
+        self.assertEqual(data["stats"]["total_learning_tasks"], 2)
+
+    def test_attendance_changes_rebuild(self):
+        session = AttendanceSession.objects.create(title="Club")
+        rebuilds, data = self.rebuilds_after(
+            lambda: Attendance.objects.create(
+                session=session, user=self.student, status="present"
+            )
+        )
+
+        self.assertEqual(rebuilds, 1)
+        self.assertEqual(data["stats"]["attendance_rate"], 100)
+
+    def test_renamed_reviewers_rebuild(self):
+        def rename():
+            self.reviewer.full_name = "Renamed Admin"
+            self.reviewer.save()
+
+        rebuilds, data = self.rebuilds_after(rename)
+
+        self.assertEqual(rebuilds, 1)
+        self.assertEqual(
+            data["recently_reviewed_tasks"][0]["reviewer"], "Renamed Admin"
+        )
+
+    def test_renamed_tags_rebuild(self):
+        def rename():
+            self.language.name = "Python 3"
+            self.language.save()
+
+        rebuilds, data = self.rebuilds_after(rename)
+
+        self.assertEqual(rebuilds, 1)
+        self.assertEqual(
+            data["recently_reviewed_tasks"][0]["languages"], ["Python 3"]
+        )
+
+    def test_unrelated_user_saves_keep_the_cache(self):
+        def reviewer_logs_in():
+            self.reviewer.last_login = timezone.now()
+            self.reviewer.save(update_fields=["last_login"])
+            self.reviewer.save()
+
+        self.assertEqual(self.rebuilds_after(reviewer_logs_in)[0], 0)
@@ -4,13 +4,13 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.middleware.csrf import get_token
-from learning_task.models import TaskReview
 from .models import VerifyEmail, ChangePasswordViaEmail, Profile
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from utils.mail import send_email
 from django.contrib.auth import authenticate
 from .serializers import UserSerializer, ProfileSerializer, UserInverseSerializer
+from .dashboard import get_user_dashboard
 from django.conf import settings
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_protect
@@ -20,14 +20,13 @@ from axes.utils import reset as axes_reset
 from asgiref.sync import async_to_sync
 from utils.notif import notify_user
 from utils.auth import JWTCookieAuthentication
-from django.db.models import Avg, Sum
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from attendance.serializers import AttendanceSerializer, AttendanceWithSessionSerializer
-from learning_task.models import LearningTask, TaskBonus
-from attendance.models import Attendance, AttendanceSession
+from attendance.serializers import AttendanceWithSessionSerializer
+from learning_task.models import StudentScore
+from attendance.models import Attendance
 from management.models import Setting
 
 
@@ -1032,96 +1031,17 @@ class UserDashboardView(APIView):
 
     def get(self, request):
         user = request.user
-
-        tasks = LearningTask.objects.filter(user=user)
-        total_tasks = tasks.count()
-        rated_tasks = tasks.filter(status="rated").count()
-        under_review_tasks = tasks.filter(status="under_review").count()
-        draft_tasks = tasks.filter(status="draft").count()
-        redo_tasks = tasks.filter(status="redo").count()
-
-        # Compute total grade = sum of all admin task reviews + all bonuses
-        total_admin_reviews = (
-            TaskReview.objects.filter(task__user=user, is_admin=True)
-            .aggregate(total=Sum("rating"))
-            .get("total")
-            or 0
-        )
-
-        total_bonus = (
-            TaskBonus.objects.filter(task__user=user)
-            .aggregate(total=Sum("score"))
-            .get("total")
-            or 0
-        )
-
-        total_grade = total_admin_reviews + total_bonus
-
-        task_completion = (
-            round((rated_tasks / total_tasks) * 100, 1) if total_tasks else 0
-        )
-
-        # Attendance stats
-        attendance_qs = Attendance.objects.filter(user=user)
-        present_count = attendance_qs.filter(status="present").count()
-        late_count = attendance_qs.filter(status="late").count()
-        absent_count = attendance_qs.filter(status="absent").count()
-        special_case_count = attendance_qs.filter(status="special_case").count()
-        total_attendance = attendance_qs.count()
-        attendance_rate = (
-            round(((present_count + late_count) / total_attendance) * 100, 1)
-            if total_attendance
-            else 0
-        )
-
-        # Task status distribution for frontend chart
-        task_status_distribution = {
-            "draft": draft_tasks,
-            "redo": redo_tasks,
-            "under_review": under_review_tasks,
-            "rated": rated_tasks,
+        dashboard = get_user_dashboard(user)
+
+        # Total grade = sum of all admin task reviews + all bonuses
+        score = StudentScore.for_user(user)
+        stats = {
+            **dashboard["stats"],
+            "total_grade": score.score,
+            "total_bonus": score.bonus_total,
         }
 
-        # Recently reviewed tasks
-        recent_tasks = tasks.filter(status="rated").order_by("-updated_at")[:5]
-        recently_reviewed_tasks = []
-        for task in recent_tasks:
-            review = task.reviews.order_by("-created_at").first()
-            recently_reviewed_tasks.append(
-                {
-                    "id": task.id,
-                    "title": task.title,
-                    "description": task.description,
-                    "languages": [l.name for l in task.languages.all()],
-                    "frameworks": [f.name for f in task.frameworks.all()],
-                    "grade": review.rating if review else None,
-                    "admin_feedback": review.feedback if review else "",
-                    "reviewed_date": task.updated_at.date(),
-                    "reviewer": review.user.full_name if review else "Admin",
-                }
-            )
-
-        return Response(
-            {
-                "stats": {
-                    "attendance_rate": attendance_rate,
-                    "attendance_distribution": {
-                        "present": present_count,
-                        "late": late_count,
-                        "absent": absent_count,
-                        "special_case": special_case_count,
-                    },
-                    "total_learning_tasks": total_tasks,
-                    "total_grade": total_grade,  # NEW: sum of admin reviews + bonuses
-                    "task_completion_percent": task_completion,
-                    "total_bonus": total_bonus,
-                    "task_score": rated_tasks * 5,
-                },
-                "task_status_distribution": task_status_distribution,
-                "recently_reviewed_tasks": recently_reviewed_tasks,
-            },
-            status=200,
-        )
+        return Response({**dashboard, "stats": stats}, status=200)
 
 
 class UserAttendanceView(APIView):
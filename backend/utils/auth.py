@@ -1,8 +1,29 @@
+from django.core.cache import cache
+from django.db import router, transaction
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
 from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework.permissions import BasePermission
 
+# How long the authenticated user's row is served from the cache. Saves and
+# deletes drop it straight away (users.signals), so this only bounds changes
+# made behind the ORM's back.
+USER_STATE_TIMEOUT = 60
+# Never cached: the instance defers it and loads it on first access
+UNCACHED_USER_FIELDS = {"password"}
+
+
+def _user_state_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate_cached_users(user_ids):
+    keys = [_user_state_key(user_id) for user_id in set(user_ids)]
+    cache.delete_many(keys)
+    # Again after commit, in case a request re-cached the old row meanwhile
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
 
 class JWTCookieAuthentication(JWTAuthentication):
     cookie_name = "access"
@@ -19,6 +40,38 @@ class JWTCookieAuthentication(JWTAuthentication):
         except (InvalidToken, TokenError):
             raise AuthenticationFailed("Invalid or expired token")
 
+    def get_user(self, validated_token):
+        """
+        The token's user, rebuilt from a short-lived cache of its row so
+        authenticating a request needs no query. The password is left
+        deferred; save() on the instance then writes only the cached fields.
+        """
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        # Revocation checks compare against the password hash: always load
+        if user_id is None or api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        key = _user_state_key(user_id)
+        state = cache.get(key)
+        if state is not None:
+            return self.user_model.from_db(
+                router.db_for_read(self.user_model),
+                list(state),
+                list(state.values()),
+            )
+
+        # Raises for unknown and inactive users, which are never cached
+        user = super().get_user(validated_token)
+        fields = [
+            field.attname
+            for field in self.user_model._meta.concrete_fields
+            if field.attname not in UNCACHED_USER_FIELDS
+        ]
+        cache.set(
+            key, {name: getattr(user, name) for name in fields}, USER_STATE_TIMEOUT
+        )
+        return user
+
 
 class IsSuperUser(BasePermission):
     def has_permission(self, request, view):
@@ -1,13 +1,101 @@
-import cloudinary.utils
+import threading
 import time
+from collections import OrderedDict
+
+import cloudinary.utils
+from django.core.cache import cache
+
+# Signed URLs are issued per expiry bucket: every caller asking for the same
+# image within one bucket gets the same URL, so browsers and the CDN can cache
+# it. With a token key configured (CLOUD_AUTH_TOKEN_KEY), a URL stays valid
+# for at least one full bucket after it is handed out.
+SIGNED_URL_BUCKET_SECONDS = 10 * 60
+LOCAL_CACHE_SIZE = 4096
+
+_local_cache = OrderedDict()
+_local_lock = threading.Lock()
+
 
+def _current_bucket():
+    return int(time.time()) // SIGNED_URL_BUCKET_SECONDS
 
-def get_private_image_url(public_id, expires_in=300):
+
+def _cache_key(public_id, bucket):
+    return f"signed_url:{bucket}:{public_id}"
+
+
+def _sign(public_id, bucket):
+    options = {}
+    # Delivery URLs only expire with token based authentication; a plain
+    # signed URL (no token key configured) stays valid indefinitely
+    if cloudinary.config().auth_token:
+        options["auth_token"] = {"expiration": (bucket + 2) * SIGNED_URL_BUCKET_SECONDS}
     return cloudinary.utils.cloudinary_url(
         public_id,
         resource_type="image",
         type="authenticated",
         sign_url=True,
         secure=True,
-        expires_at=int(time.time()) + expires_in,
+        **options,
     )[0]
+
+
+def _local_get(key):
+    with _local_lock:
+        url = _local_cache.get(key)
+        if url is not None:
+            _local_cache.move_to_end(key)
+        return url
+
+
+def _local_set(key, url):
+    with _local_lock:
+        _local_cache[key] = url
+        _local_cache.move_to_end(key)
+        while len(_local_cache) > LOCAL_CACHE_SIZE:
+            _local_cache.popitem(last=False)
+
+
+def get_private_image_urls(public_ids):
+    """
+    Signed URLs for a batch of authenticated images, as {public_id: url}.
+    Lookups go through an in-process LRU, then the shared cache (one
+    round-trip for the whole batch), and only the misses are signed.
+    """
+    bucket = _current_bucket()
+    urls = {}
+    missing = {}
+
+    for public_id in public_ids:
+        if not public_id or public_id in urls:
+            continue
+        key = _cache_key(public_id, bucket)
+        url = _local_get(key)
+        if url is None:
+            missing[key] = public_id
+        else:
+            urls[public_id] = url
+
+    if missing:
+        shared = cache.get_many(list(missing))
+        to_store = {}
+        for key, public_id in missing.items():
+            url = shared.get(key)
+            if url is None:
+                url = _sign(public_id, bucket)
+                to_store[key] = url
+            _local_set(key, url)
+            urls[public_id] = url
+
+        if to_store:
+            # Keep shared entries only while the bucket is being served
+            remaining = (bucket + 1) * SIGNED_URL_BUCKET_SECONDS - int(time.time())
+            cache.set_many(to_store, max(remaining, 1))
+
+    return urls
+
+
+def get_private_image_url(public_id):
+    if not public_id:
+        return None
+    return get_private_image_urls([public_id])[public_id]
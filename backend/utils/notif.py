@@ -1,13 +1,19 @@
-import time
+import asyncio
+import logging
+import uuid
 from pathlib import Path
 
 import cloudinary
-import cloudinary.utils
 import environ
-from asgiref.sync import sync_to_async
+from asgiref.sync import async_to_sync, sync_to_async
 from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 
+from realtime.cohorts import group_name
 from realtime.models import Notification
+from utils.get_file import get_private_image_url
 
 env = environ.Env()
 BASE_DIR = Path(__file__).resolve().parent
@@ -20,48 +26,192 @@ cloudinary.config(
     secure=True,
 )
 
+logger = logging.getLogger(__name__)
+
 VALID_CODES = {"success", "error", "info", "warning"}
 CHANNEL_LAYER = get_channel_layer()
+# Upper bound on group_send calls in flight during a bulk fan-out, so a large
+# announcement doesn't exhaust the channel layer's Redis connections
+FANOUT_CONCURRENCY = 100
+# Undelivered rows are retried by `relay_notifications` this many times
+MAX_DELIVERY_ATTEMPTS = 5
 
 
-@sync_to_async(thread_sensitive=True)
-def _create_notification(**kwargs):
-    return Notification.objects.create(**kwargs)
+def _serialize_actor(actor, signed_urls):
+    if not actor:
+        return None
+
+    # One signed URL per actor per delivery batch
+    if actor.id not in signed_urls:
+        signed_urls[actor.id] = get_private_image_url(
+            getattr(actor, "profile_pic_id", None)
+        )
+    return {
+        "id": actor.id,
+        "full_name": actor.full_name,
+        "email": actor.email,
+        "profile_pic_url": signed_urls[actor.id],
+    }
 
 
-@sync_to_async(thread_sensitive=True)
-def _bulk_create_notifications(notifications):
-    return Notification.objects.bulk_create(notifications)
+def _message(notification, signed_urls):
+    return {
+        "type": "send_notification",
+        "respond": {
+            "id": notification.id,
+            "title": notification.title,
+            "message": notification.description,
+            "code": notification.code,
+            "url": notification.url,
+            "is_read": notification.is_read,
+            "is_push_notif": notification.is_push_notif,
+            "actor": _serialize_actor(notification.actor, signed_urls),
+            "sent_at": notification.sent_at.isoformat(),
+        },
+    }
 
 
-@sync_to_async
-def _signed_profile_url(public_id: str | None, expires_in: int = 30):
-    if not public_id:
-        return None
+async def _fan_out(messages):
+    """
+    Sends each (group, message) pair and returns whether each send succeeded.
+    The sends run concurrently, at most FANOUT_CONCURRENCY at a time, so the
+    whole fan-out costs a few round-trips rather than one per group.
+    """
+    semaphore = asyncio.Semaphore(FANOUT_CONCURRENCY)
 
-    url, _ = cloudinary.utils.cloudinary_url(
-        public_id,
-        resource_type="image",
-        type="authenticated",
-        sign_url=True,
-        secure=True,
-        expires_at=int(time.time()) + expires_in,
+    async def send(group, message):
+        async with semaphore:
+            try:
+                await CHANNEL_LAYER.group_send(group, message)
+                return True
+            except Exception as exc:
+                print(f"WS notify failed for {group}:", exc)
+                return False
+
+    return await asyncio.gather(*(send(group, message) for group, message in messages))
+
+
+def deliver_notifications(notification_ids):
+    """
+    Pushes the given notifications over the channel layer and marks the ones
+    that went out as delivered; failed sends only count an attempt and are
+    left for `relay_notifications`. Rows already delivered are skipped, so
+    calling this twice for the same ids is harmless.
+    """
+    if not CHANNEL_LAYER or not notification_ids:
+        return 0
+
+    notifications = list(
+        Notification.objects.filter(
+            id__in=notification_ids, delivered_at__isnull=True
+        ).select_related("actor")
     )
-    return url
+    if not notifications:
+        return 0
+
+    signed_urls = {}
+    messages = [
+        (f"user_{notification.recipient_id}", _message(notification, signed_urls))
+        for notification in notifications
+    ]
+    results = async_to_sync(_fan_out)(messages)
+
+    delivered = [n.id for n, ok in zip(notifications, results) if ok]
+    failed = [n.id for n, ok in zip(notifications, results) if not ok]
+    attempts = F("delivery_attempts") + 1
+    if delivered:
+        Notification.objects.filter(id__in=delivered).update(
+            delivered_at=timezone.now(), delivery_attempts=attempts
+        )
+    if failed:
+        Notification.objects.filter(id__in=failed).update(delivery_attempts=attempts)
+    return len(delivered)
 
 
-async def _serialize_actor(actor):
-    if not actor:
-        return None
+def _deliver_on_commit(notifications):
+    # Nothing is pushed for rows that roll back, and the transaction is not
+    # held open while the channel layer is busy
+    ids = [notification.id for notification in notifications]
+    transaction.on_commit(lambda: deliver_notifications(ids))
 
-    return {
-        "id": actor.id,
-        "full_name": actor.full_name,
-        "email": actor.email,
-        "profile_pic_url": await _signed_profile_url(
-            getattr(actor, "profile_pic_id", None)
-        ),
-    }
+
+def broadcast_to_cohorts(
+    cohort_keys,
+    *,
+    announcement_id: int,
+    title: str,
+    description: str,
+    code: str = "info",
+    actor=None,
+    url: str | None = None,
+    is_push_notif: bool = False,
+):
+    """
+    Publishes one message per cohort group once the current transaction
+    commits; NotificationConsumer relays it to every connected member. No
+    per-recipient rows are written: what was sent lives on the announcement.
+    A member of several of the cohorts gets a copy through each group; all
+    copies carry the same `broadcast_id`, so the consumer forwards only one.
+
+    Delivery is best-effort: there is no outbox behind it, so members who
+    are offline, or whose cohort group fails to publish (logged), see the
+    announcement only on the announcements page.
+    """
+    if not title:
+        raise ValueError("Notification title is required")
+
+    if code not in VALID_CODES:
+        code = "info"
+
+    if not CHANNEL_LAYER or not cohort_keys:
+        return
+
+    sent_at = timezone.now().isoformat()
+
+    def publish():
+        message = {
+            "type": "send_announcement",
+            "respond": {
+                "announcement": True,
+                "announcement_id": announcement_id,
+                "broadcast_id": uuid.uuid4().hex,
+                "title": title,
+                "message": description,
+                "code": code,
+                "url": url,
+                "is_read": False,
+                "is_push_notif": is_push_notif,
+                "actor": _serialize_actor(actor, {}),
+                "sent_at": sent_at,
+            },
+        }
+        groups = [group_name(key) for key in cohort_keys]
+        results = async_to_sync(_fan_out)([(group, message) for group in groups])
+        failed = [group for group, ok in zip(groups, results) if not ok]
+        if failed:
+            logger.warning(
+                "Announcement %s was not published to %s of %s cohort groups: %s",
+                announcement_id,
+                len(failed),
+                len(groups),
+                ", ".join(failed),
+            )
+
+    transaction.on_commit(publish)
+
+
+@sync_to_async(thread_sensitive=True)
+def _create_notification(**kwargs):
+    notification = Notification.objects.create(**kwargs)
+    _deliver_on_commit([notification])
+    return notification
+
+
+@sync_to_async(thread_sensitive=True)
+def _bulk_create_notifications(notifications):
+    created = Notification.objects.bulk_create(notifications)
+    _deliver_on_commit(created)
+    return created
 
 
 async def notify_user(
@@ -89,42 +239,16 @@ async def notify_user(
     if actor and actor.id == recipient.id:
         return None
 
-    push_allowed = is_push_notif and recipient.push_notif_enabled
-    actor_data = await _serialize_actor(actor)
-
-    notification = await _create_notification(
+    return await _create_notification(
         recipient=recipient,
         actor=actor,
         title=title,
         description=description,
         code=code,
         url=url,
+        is_push_notif=is_push_notif and recipient.push_notif_enabled,
     )
 
-    if CHANNEL_LAYER:
-        try:
-            await CHANNEL_LAYER.group_send(
-                f"user_{recipient.id}",
-                {
-                    "type": "send_notification",
-                    "respond": {
-                        "id": notification.id,
-                        "title": title,
-                        "message": description,
-                        "code": code,
-                        "url": url,
-                        "is_read": False,
-                        "is_push_notif": push_allowed,
-                        "actor": actor_data,
-                        "sent_at": notification.sent_at.isoformat(),
-                    },
-                },
-            )
-        except Exception as exc:
-            print("WS notify failed:", exc)
-
-    return notification
-
 
 async def live_update(recipient, /, **payload):
     if not recipient or not recipient.id:
@@ -168,7 +292,6 @@ async def notify_users_bulk(
         code = "info"
 
     notifications = []
-    recipient_map = []
 
     for recipient in recipients:
         if not recipient or not recipient.id:
@@ -188,39 +311,11 @@ async def notify_users_bulk(
                 description=description,
                 code=code,
                 url=url,
+                is_push_notif=is_push_notif and recipient.push_notif_enabled,
             )
         )
-        recipient_map.append(recipient)
 
     if not notifications:
         return []
 
-    created_notifications = await _bulk_create_notifications(notifications)
-    actor_data = await _serialize_actor(actor)
-
-    if CHANNEL_LAYER:
-        for recipient, notification in zip(recipient_map, created_notifications):
-            push_allowed = is_push_notif and recipient.push_notif_enabled
-
-            try:
-                await CHANNEL_LAYER.group_send(
-                    f"user_{recipient.id}",
-                    {
-                        "type": "send_notification",
-                        "respond": {
-                            "id": notification.id,
-                            "title": notification.title,
-                            "message": notification.description,
-                            "code": notification.code,
-                            "url": notification.url,
-                            "is_read": False,
-                            "is_push_notif": push_allowed,
-                            "actor": actor_data,
-                            "sent_at": notification.sent_at.isoformat(),
-                        },
-                    },
-                )
-            except Exception as exc:
-                print(f"WS notify failed for user {recipient.id}:", exc)
-
-    return created_notifications
+    return await _bulk_create_notifications(notifications)
@@ -0,0 +1,166 @@
+import datetime
+import hashlib
+import json
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+CURSOR_SALT = "utils.pagination.cursor"
+COUNT_CACHE_TIMEOUT = 60
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder drops microseconds, which would make the cursor
+        # land before its own row when sorting on a timestamp
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorSerializer:
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":"), cls=CursorEncoder).encode(
+            "latin-1"
+        )
+
+    def loads(self, data):
+        return json.loads(data.decode("latin-1"))
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) pagination over a queryset ordered by one column plus the
+    primary key as a tie breaker. Each page is a `WHERE (col, id) > (...)`
+    range scan instead of an OFFSET, so deep pages cost the same as the first.
+
+    Views opt in by sending a `cursor` query param (empty for the first page);
+    the response carries `next_cursor` until the last page is reached.
+    """
+
+    def __init__(
+        self,
+        queryset,
+        sort_field="id",
+        descending=False,
+        page_size=10,
+        max_page_size=100,
+    ):
+        self.queryset = queryset
+        self.sort_field = sort_field
+        self.descending = descending
+        self.page_size = max(1, min(int(page_size), max_page_size))
+        self.cursor = None
+        self.include_total = False
+        self.next_cursor = None
+        self.has_more = False
+
+    @staticmethod
+    def requested(request):
+        return "cursor" in request.query_params
+
+    @classmethod
+    def from_request(
+        cls, request, queryset, sort_field="id", descending=False, default_page_size=10
+    ):
+        try:
+            page_size = int(request.query_params.get("page_size", default_page_size))
+        except ValueError:
+            page_size = default_page_size
+
+        paginator = cls(
+            queryset,
+            sort_field=sort_field,
+            descending=descending,
+            page_size=page_size,
+        )
+        paginator.cursor = request.query_params.get("cursor") or None
+        paginator.include_total = request.query_params.get("include_total") in (
+            "1",
+            "true",
+        )
+        return paginator
+
+    def _ordered(self):
+        prefix = "-" if self.descending else ""
+        if self.sort_field in ("id", "pk"):
+            return self.queryset.order_by(f"{prefix}pk")
+        return self.queryset.order_by(f"{prefix}{self.sort_field}", f"{prefix}pk")
+
+    def _after(self, queryset, cursor):
+        try:
+            value, last_pk = signing.loads(
+                cursor, salt=CURSOR_SALT, serializer=CursorSerializer
+            )
+        except (signing.BadSignature, ValueError, TypeError):
+            raise InvalidCursor("Invalid pagination cursor.")
+
+        op = "lt" if self.descending else "gt"
+        if self.sort_field in ("id", "pk"):
+            return queryset.filter(**{f"pk__{op}": last_pk})
+        return queryset.filter(
+            Q(**{f"{self.sort_field}__{op}": value})
+            | Q(**{self.sort_field: value, f"pk__{op}": last_pk})
+        )
+
+    def _value_of(self, obj):
+        if self.sort_field in ("id", "pk"):
+            return obj.pk
+        value = obj
+        for part in self.sort_field.split("__"):
+            value = getattr(value, part)
+        return value
+
+    def paginate(self, cursor=None):
+        cursor = cursor if cursor is not None else self.cursor
+        queryset = self._ordered()
+        if cursor:
+            queryset = self._after(queryset, cursor)
+
+        items = list(queryset[: self.page_size + 1])
+        self.has_more = len(items) > self.page_size
+        items = items[: self.page_size]
+
+        self.next_cursor = None
+        if self.has_more:
+            last = items[-1]
+            self.next_cursor = signing.dumps(
+                [self._value_of(last), last.pk],
+                salt=CURSOR_SALT,
+                serializer=CursorSerializer,
+                compress=True,
+            )
+        return items
+
+    def total_count(self):
+        """
+        Row count of the unpaginated queryset, cached for a short while so
+        paging through a large table does not re-run the count on every page.
+        """
+        query = self.queryset.order_by().query
+        sql, params = query.sql_with_params()
+        digest = hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+        key = f"pagination:count:{digest}"
+
+        total = cache.get(key)
+        if total is None:
+            total = self.queryset.order_by().count()
+            cache.set(key, total, COUNT_CACHE_TIMEOUT)
+        return total
+
+    def pagination_data(self):
+        data = {
+            "mode": "cursor",
+            "page_size": self.page_size,
+            "next_cursor": self.next_cursor,
+            "has_more": self.has_more,
+        }
+        if self.include_total:
+            data["total_count"] = self.total_count()
+        return data
@@ -1,37 +1,176 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
+from django.core.cache import cache
+from django.http.cookie import parse_cookie
 
+logger = logging.getLogger(__name__)
 
-@database_sync_to_async
-def get_user_from_scope(scope):
-    from django.contrib.auth.models import AnonymousUser
-    from utils.auth import JWTCookieAuthentication
+# Users resolved for a token are reused by later handshakes with the same
+# token (reconnects, several tabs) until it expires, and for no longer than
+# HANDSHAKE_CACHE_SECONDS so account changes still reach new connections.
+# Each entry also records the user's version in the shared cache; a change
+# made by any process (web server or run_jobs worker) bumps that version,
+# which invalidates the entries of every process.
+HANDSHAKE_CACHE_SECONDS = 5 * 60
+HANDSHAKE_CACHE_SIZE = 10000
+# A summary of handshake latencies is logged every this many handshakes
+STATS_WINDOW = 500
+
+_users = OrderedDict()
+_users_lock = threading.Lock()
+
+
+def _version_key(user_id):
+    return f"realtime:handshake:user:{user_id}"
+
+
+def _cached_user(key, version):
+    with _users_lock:
+        entry = _users.get(key)
+        if entry is None:
+            return None
+        user, expires_at, cached_version = entry
+        if expires_at <= time.time() or cached_version != version:
+            del _users[key]
+            return None
+        _users.move_to_end(key)
+        return user
+
+
+def _cache_user(key, user, token_exp, version):
+    expires_at = min(token_exp, time.time() + HANDSHAKE_CACHE_SECONDS)
+    with _users_lock:
+        _users[key] = (user, expires_at, version)
+        _users.move_to_end(key)
+        while len(_users) > HANDSHAKE_CACHE_SIZE:
+            _users.popitem(last=False)
+
+
+def invalidate_handshake_cache(user_ids=None):
+    """
+    Makes the next handshake of the given users reload them, in every
+    process. With no ids, only this process's cache is cleared.
+    """
+    with _users_lock:
+        if user_ids is None:
+            _users.clear()
+            return
+        # Token claims carry the id as a string
+        user_ids = {str(user_id) for user_id in user_ids}
+        for key in [key for key in _users if key[0] in user_ids]:
+            del _users[key]
+    # Outlives any entry cached under the old version
+    cache.set_many(
+        {_version_key(user_id): time.time_ns() for user_id in user_ids},
+        HANDSHAKE_CACHE_SECONDS,
+    )
+
+
+class HandshakeStats:
+    """
+    In-process counters for WebSocket handshake authentication. A summary
+    line (hit rate and latency percentiles) is logged every STATS_WINDOW
+    handshakes.
+    """
 
-    # Extract cookies from headers
-    cookies = {}
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total = 0
+        self.cache_hits = 0
+        self.anonymous = 0
+        self.latencies = deque(maxlen=STATS_WINDOW)
+
+    def record(self, started, outcome):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.total += 1
+            if outcome == "hit":
+                self.cache_hits += 1
+            elif outcome == "anonymous":
+                self.anonymous += 1
+            self.latencies.append(elapsed_ms)
+            if self.total % STATS_WINDOW == 0:
+                logger.info("WebSocket handshakes: %s", self._summary())
+
+    def _summary(self):
+        latencies = sorted(self.latencies)
+        return {
+            "total": self.total,
+            "cache_hit_rate": round(self.cache_hits / self.total, 3),
+            "anonymous": self.anonymous,
+            "p50_ms": round(latencies[len(latencies) // 2], 2),
+            "p95_ms": round(latencies[int(len(latencies) * 0.95)], 2),
+            "max_ms": round(latencies[-1], 2),
+        }
+
+    def snapshot(self):
+        with self.lock:
+            return self._summary() if self.total else {"total": 0}
+
+
+stats = HandshakeStats()
+
+
+def _access_token(scope):
     for name, value in scope["headers"]:
         if name == b"cookie":
-            raw = value.decode()
-            parts = raw.split(";")
-            for part in parts:
-                key, _, val = part.strip().partition("=")
-                cookies[key] = val
+            token = parse_cookie(value.decode("latin-1")).get("access")
+            if token:
+                return token
+    return None
 
-    # Build a fake request object
-    request = type("Request", (), {"COOKIES": cookies})()
 
-    # Use your class exactly as-is
+async def get_user_from_scope(scope):
+    """
+    The user of the `access` cookie on a WebSocket handshake, or
+    AnonymousUser. The token is validated without touching the database;
+    only a token not seen within its cache window, or whose user changed
+    since, loads the user. Each handshake costs one shared cache read.
+    """
+    from django.contrib.auth.models import AnonymousUser
+    from rest_framework_simplejwt.settings import api_settings
+    from utils.auth import JWTCookieAuthentication
+
+    started = time.perf_counter()
     auth = JWTCookieAuthentication()
 
+    raw_token = _access_token(scope)
     try:
-        user_tuple = auth.authenticate(request)
-        if user_tuple:
-            user, _ = user_tuple
-            return user
+        token = auth.get_validated_token(raw_token) if raw_token else None
+    except Exception:
+        token = None
+    if token is None:
+        stats.record(started, "anonymous")
         return AnonymousUser()
-    except:
+
+    key = (
+        str(token.get(api_settings.USER_ID_CLAIM)),
+        token.get(api_settings.JTI_CLAIM),
+    )
+    # Read before loading the user, so a change racing the load still counts
+    version = await cache.aget(_version_key(key[0]), 0)
+    user = _cached_user(key, version)
+    if user is not None:
+        stats.record(started, "hit")
+        # Each connection gets its own instance to hang state on
+        return copy.copy(user)
+
+    try:
+        user = await database_sync_to_async(auth.get_user)(token)
+    except Exception:
+        stats.record(started, "anonymous")
         return AnonymousUser()
 
+    _cache_user(key, user, token["exp"], version)
+    stats.record(started, "miss")
+    return copy.copy(user)
+
 
 class JWTAuthMiddleware(BaseMiddleware):
     async def __call__(self, scope, receive, send):
@@ -0,0 +1,101 @@
+import io
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import (
+    SimpleDocTemplate,
+    Table,
+    TableStyle,
+    Paragraph,
+    Spacer,
+)
+
+FONT_NAME = "Helvetica"
+FONT_SIZE = 10
+CELL_PADDING = 4
+# Roughly one A4 page of rows; small tables are much cheaper for reportlab to
+# lay out and split than one table holding the whole report.
+ROWS_PER_TABLE = 40
+
+BASE_TABLE_STYLE = [
+    ("FONTNAME", (0, 0), (-1, -1), FONT_NAME),
+    ("FONTSIZE", (0, 0), (-1, -1), FONT_SIZE),
+    ("LEADING", (0, 0), (-1, -1), FONT_SIZE * 1.2),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e0e0e0")),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("LEFTPADDING", (0, 0), (-1, -1), CELL_PADDING),
+    ("RIGHTPADDING", (0, 0), (-1, -1), CELL_PADDING),
+    ("TOPPADDING", (0, 0), (-1, -1), 3),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+]
+
+
+def _cell(value, width):
+    text = "" if value is None else str(value)
+    available = width - 2 * CELL_PADDING
+    if stringWidth(text, FONT_NAME, FONT_SIZE) <= available:
+        return text
+    # Overflowing text is pre-wrapped into lines; tables lay out multi-line
+    # strings far faster than Paragraph flowables.
+    return "\n".join(simpleSplit(text, FONT_NAME, FONT_SIZE, available))
+
+
+def render_table_report(
+    title,
+    metadata_lines,
+    headers,
+    rows,
+    col_fractions,
+    table_style=(),
+    table_width_ratio=0.9,
+):
+    """
+    Renders a titled PDF report with a metadata block and one table, and
+    returns its bytes. `col_fractions` are the column widths as fractions of
+    the table width; `table_style` adds commands on top of the base style
+    (row indexes count the header as row 0).
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=30,
+        leftMargin=30,
+        topMargin=30,
+        bottomMargin=30,
+    )
+    styles = getSampleStyleSheet()
+    normal_style = styles["Normal"]
+
+    elements = [
+        Paragraph(f"<b>{escape(title)}</b>", styles["Title"]),
+        Spacer(1, 0.2 * inch),
+    ]
+    for line in metadata_lines:
+        elements.append(Paragraph(escape(line), normal_style))
+    elements.append(Spacer(1, 0.4 * inch))
+
+    table_width = doc.width * table_width_ratio
+    col_widths = [table_width * fraction for fraction in col_fractions]
+    style = TableStyle(BASE_TABLE_STYLE + list(table_style))
+
+    def render_row(row):
+        return [_cell(value, width) for value, width in zip(row, col_widths)]
+
+    header = render_row(headers)
+    rows = list(rows)
+    for start in range(0, max(len(rows), 1), ROWS_PER_TABLE):
+        chunk = [render_row(row) for row in rows[start : start + ROWS_PER_TABLE]]
+        table = Table([header] + chunk, repeatRows=1, colWidths=col_widths)
+        table.hAlign = "CENTER"
+        table.setStyle(style)
+        elements.append(table)
+
+    doc.build(elements)
+    return buffer.getvalue()
@@ -0,0 +1,15 @@
+from asgiref.sync import sync_to_async
+
+# Daphne reads a sync streaming iterator to the end before sending anything,
+# so files are streamed from async generators instead.
+FILE_STREAM_BLOCK = 64 * 1024
+
+
+async def stream_file(file):
+    """Yields the rest of `file` in FILE_STREAM_BLOCK blocks, then closes it."""
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        while block := await read(FILE_STREAM_BLOCK):
+            yield block
+    finally:
+        file.close()
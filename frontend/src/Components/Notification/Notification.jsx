@@ -41,7 +41,11 @@ export default function Notification() {
                     "sent_at": data?.sent_at,
                     "actor": data?.actor,
                 }
-                addNotifications([notif])
+                // Cohort announcements have no notification row; they are
+                // listed on the announcements page instead
+                if (!data?.announcement) {
+                    addNotifications([notif])
+                }
                 switch (data.code) {
                     case "success":
                         neonToast.success(data.message);
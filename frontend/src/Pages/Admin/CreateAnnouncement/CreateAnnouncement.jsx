@@ -179,6 +179,21 @@ export default function CreateAnnouncement() {
         setSearchTerm("");
     };
 
+    // When the whole filtered list is selected, the audience is a cohort
+    // ("grade:11", "class:11A", ...) and is sent as one broadcast instead of
+    // one notification per student. Returns null for any other selection.
+    const selectedCohort = () => {
+        if (searchTerm.trim() || filteredUsers.length === 0) return null;
+        if (formData.targets.length !== filteredUsers.length) return null;
+
+        const { field, grade, section } = filters;
+        if (!field && !grade && !section) return "role:user";
+        if (field && !grade && !section) return `field:${field}`;
+        if (!field && grade && !section) return `grade:${grade}`;
+        if (!field && grade && section) return `class:${grade}${section}`;
+        return null;
+    };
+
     const handleSubmit = async (e) => {
         e.preventDefault();
         setError("");
@@ -204,10 +219,12 @@ export default function CreateAnnouncement() {
 
         try {
             // Build payload – only include announcement_date if it has a value
+            const cohort = selectedCohort();
             const payload = {
                 title: formData.title,
                 content: formData.content,
-                targets: formData.targets,
+                targets: cohort ? [] : formData.targets,
+                cohorts: cohort ? [cohort] : [],
                 is_important: formData.is_important
             };
 
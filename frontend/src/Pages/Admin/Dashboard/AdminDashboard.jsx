@@ -137,27 +137,19 @@ const AdminDashboard = () => {
         }
     };
 
-    const processedLearningTasks = dashboardData.top_learning_tasks.map(task => {
-        let averageRating = 0;
-        if (task.reviews && task.reviews.length > 0) {
-            averageRating = task.reviews.reduce((sum, review) => sum + review.rating, 0) / task.reviews.length;
-        }
-
-        return {
-            id: task.id,
-            title: task.title || "Untitled Task",
-            student: {
-                fullName: task.user?.full_name || "Unknown Student",
-                grade: task.profile?.grade || "N/A",
-                profile_pic_url: task.user?.profile_pic_url || null,
-            },
-            rating: averageRating,
-            likes_count: task.likes_count || 0,
-            languages: task.languages || [],
-            frameworks: task.frameworks || [],
-            status: task.status || "rated"
-        };
-    });
+    const processedLearningTasks = dashboardData.top_learning_tasks.map(task => ({
+        id: task.id,
+        title: task.title || "Untitled Task",
+        student: {
+            fullName: task.author?.full_name || "Unknown Student",
+            grade: task.author?.grade || "N/A",
+            profile_pic_url: task.author?.profile_pic_url || null,
+        },
+        rating: task.admin_rating || 0,
+        likes_count: task.likes_count || 0,
+        languages: task.languages || [],
+        status: task.status || "rated"
+    }));
 
     const CustomTooltip = ({ active, payload, label }) => {
         if (active && payload && payload.length) {
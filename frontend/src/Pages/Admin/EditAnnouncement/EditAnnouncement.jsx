@@ -31,7 +31,8 @@ export default function EditAnnouncement() {
         content: "",
         announcement_date: "",
         is_important: false,
-        targets: [] // array of user IDs
+        targets: [], // array of user IDs
+        cohorts: [] // cohort keys such as "grade:11", kept as they are
     });
     const { updatePageTitle } = useNotifContext()
     useEffect(() => {
@@ -80,7 +81,8 @@ export default function EditAnnouncement() {
                     content: announcementData.content || "",
                     announcement_date: announcementData.announcement_date || "",
                     is_important: announcementData.is_important || false,
-                    targets: announcementData.users?.map(u => u.id) || []
+                    targets: announcementData.users?.map(u => u.id) || [],
+                    cohorts: announcementData.cohorts || []
                 });
 
             } catch (error) {
@@ -228,7 +230,7 @@ export default function EditAnnouncement() {
             return;
         }
 
-        if (formData.targets.length === 0) {
+        if (formData.targets.length === 0 && formData.cohorts.length === 0) {
             setError("Please select at least one recipient");
             return;
         }
@@ -323,7 +325,7 @@ export default function EditAnnouncement() {
                                 type="submit"
                                 form="editAnnouncementForm"
                                 className={styles.primaryBtn}
-                                disabled={submitting || formData.targets.length === 0}
+                                disabled={submitting || (formData.targets.length === 0 && formData.cohorts.length === 0)}
                             >
                                 <FaSave />
                                 <span>{submitting ? "Saving..." : "Save Changes"}</span>
@@ -511,7 +513,10 @@ export default function EditAnnouncement() {
                                 <div className={styles.selectionActions}>
                                     <div className={styles.selectedCount}>
                                         <FaCheck />
-                                        <span>{formData.targets.length} selected</span>
+                                        <span>
+                                            {formData.targets.length} selected
+                                            {formData.cohorts.length > 0 && ` + ${formData.cohorts.join(", ")}`}
+                                        </span>
                                     </div>
                                     <button
                                         type="button"